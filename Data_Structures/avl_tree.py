@@ -1,99 +1,1492 @@
 import ds_statistics as ds_stats
 import numpy as np
+from bisect import bisect_left, bisect_right
+from bulk_load import sorted_keys, should_rebuild, merge_items
+from duplicates import ALLOW, IGNORE, REPLACE, check_policy, drop_duplicates
+import snapshot
+from frozen import Frozen_Tree
+from metrics import tree_metrics
 # Implementation of an AVL Tree
 
 # Node for AVL Tree
 class AVL_Node:
-    def __init__(self, key): # Constructor
+    def __init__(self, key, value=None): # Constructor
         self.key = key # Key of the node
+        self.value = value # Value stored with the key
         self.left = None # Left child
         self.right = None # Right child
         self.height = 1 # Height of the node
+        self.size = 1 # Number of nodes in the subtree (only kept up to date with order statistics)
+
+# Slotted node for the compact storage mode of the AVL Tree
+class Compact_AVL_Node:
+    __slots__ = ("key", "value", "left", "right", "height", "size") # No per-instance dictionary
+    __init__ = AVL_Node.__init__ # Same constructor as AVL_Node
 
 # AVL Tree
 class AVL_Tree:
-    def __init__(self):
+    def __init__(self, order_statistics=False, compact=False, statistics=None, append_mode=False, duplicates=ALLOW):
         self.root = None
-        self.statistics = ds_stats.Statistics()  # Keeps track of the statistics
+        self.count = 0 # Number of keys in the tree
+        self.leaves = 0 # Number of leaves, kept up to date by every insert, delete and rotation
+        self.statistics = ds_stats.Statistics() if statistics is None else statistics # Keeps track of the statistics
         self.rotations = 0
+        self.order_statistics = order_statistics # Whether subtree sizes are kept for rank and select
+        self.node_class = Compact_AVL_Node if compact else AVL_Node # Slotted nodes use less memory per key
+        self.append_mode = append_mode # Whether keys at or above the maximum are appended along the right spine
+        self.spine = None # Nodes on the right spine from the root down to the maximum, None when out of date
+        self.duplicates = check_policy(duplicates) # What insert does with a key that is already in the tree (see duplicates.py)
+
+    # Bulk-load constructors
+    @classmethod
+    def from_sorted(cls, iterable, **options):
+
+        """
+
+        Function to build a perfectly balanced AVL Tree from keys in ascending order in O(n).
+
+        Parameters:
+            iterable (iterable): The keys in ascending order (list, generator or NumPy array).
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            AVL_Tree: The new AVL Tree.
+
+        """
+
+        tree = cls(**options) # Create an empty tree
+        tree.build_from_sorted(sorted_keys(iterable, presorted=True)) # Build the tree from the sorted keys
+        return tree
+
+    @classmethod
+    def from_iterable(cls, iterable, **options):
+
+        """
+
+        Function to build a perfectly balanced AVL Tree from keys in any order.
+
+        The keys are sorted once in O(n log n) and the tree is then built in O(n).
+
+        Parameters:
+            iterable (iterable): The keys to be inserted (list, generator or NumPy array).
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            AVL_Tree: The new AVL Tree.
+
+        """
+
+        tree = cls(**options) # Create an empty tree
+        tree.build_from_sorted(sorted_keys(iterable)) # Sort the keys once and build the tree
+        return tree
+
+    def build_from_sorted(self, keys, values=None):
+
+        """
+
+        Function to replace the contents of the tree with a perfectly balanced tree of sorted keys.
+
+        Duplicate keys are kept or dropped following the duplicate policy. The height and the
+        number of leaves are recorded in the statistics.
+
+        Parameters:
+            keys (list): The keys in ascending order.
+            values (list): The value of each key, or None to store no values.
+
+        """
+
+        keys, values = drop_duplicates(keys, values, self.duplicates) # Apply the duplicate policy
+        self.root = self.build_balanced(keys, 0, len(keys) - 1, values) # Build the tree from the middle outwards
+        self.count = len(keys) # Number of keys in the tree
+        self.spine = None # The right spine has changed
+        self.leaves = tree_metrics(self.root)["leaves"] # Count the leaves of the new tree once
+        self.record_metrics() # Set the height and the number of leaves in the statistics
+
+    def build_balanced(self, keys, low, high, values=None):
+
+        """
+
+        Recursive function to build a perfectly balanced subtree from a slice of sorted keys.
+
+        Parameters:
+            keys (list): The keys in ascending order.
+            low (int): The index of the first key in the subtree.
+            high (int): The index of the last key in the subtree.
+            values (list): The value of each key, or None to store no values.
+
+        Returns:
+            AVL_Node: The root of the subtree.
+
+        """
+
+        if low > high: # If the slice is empty, there is no subtree
+            return None
+
+        middle = (low + high) // 2 # The middle key becomes the root of the subtree
+        node = self.node_class(keys[middle], None if values is None else values[middle]) # Create the root of the subtree
+        node.left = self.build_balanced(keys, low, middle - 1, values) # Build the left subtree
+        node.right = self.build_balanced(keys, middle + 1, high, values) # Build the right subtree
+        self.update_height(node) # Update the height of the root
+        self.update_size(node) # Update the size of the subtree
+
+        return node
+
+    # Snapshots
+    def save(self, path):
+
+        """
+
+        Function to save the AVL Tree to a snapshot file (see snapshot.py).
+
+        The keys are stored in order with the height, the depth and the value of each node.
+
+        Parameters:
+            path (str): The path of the file.
+
+        """
+
+        keys = [] # Keys in order
+        values = [] # Value of each node
+        heights = [] # Height of each node
+        depths = [] # Depth of each node
+        stack = [] # Nodes whose left subtree is being visited, with their depths
+        node = self.root
+        depth = 0
+        while stack or node is not None: # In-order traversal without recursion
+            while node is not None: # Go down to the leftmost node
+                stack.append((node, depth))
+                node = node.left
+                depth += 1
+            node, depth = stack.pop()
+            keys.append(node.key)
+            values.append(node.value)
+            heights.append(node.height)
+            depths.append(depth)
+            node = node.right # Visit the right subtree next
+            depth += 1
+
+        snapshot.write_snapshot(path, "AVL_Tree", keys, heights, depths, values=values, duplicates=self.duplicates)
+
+    @classmethod
+    def load(cls, path, mmap=True, **options):
+
+        """
+
+        Function to load an AVL Tree from a snapshot file in O(n), without calling insert.
+
+        The tree gets the duplicate policy it was saved with, unless duplicates is passed.
+
+        Parameters:
+            path (str): The path of the file.
+            mmap (bool): If True, the file is memory-mapped while the tree is rebuilt.
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            AVL_Tree: The AVL Tree saved in the file.
+
+        Raises:
+            ValueError: If the file is not a snapshot of an AVL Tree.
+
+        """
+
+        data = snapshot.read_snapshot(path, "AVL_Tree", mmap)
+        if data.duplicates is not None: # Keep the policy the tree was saved with
+            options.setdefault("duplicates", data.duplicates)
+        tree = cls(**options) # Create an empty tree
+        tree.build_from_snapshot(data)
+        return tree
+
+    def build_from_snapshot(self, data):
+
+        """
+
+        Function to replace the contents of the tree with the nodes of a snapshot.
+
+        Parameters:
+            data (snapshot.Snapshot): The snapshot of an AVL Tree.
+
+        """
+
+        values = data.value_list()
+        if values is None: # No key has a value
+            nodes = [self.node_class(key) for key in data.keys.tolist()] # Create the nodes in order
+        else:
+            nodes = [self.node_class(key, value) for key, value in zip(data.keys.tolist(), values)]
+        for node, height in zip(nodes, data.aux.tolist()): # The heights are stored, not recomputed
+            node.height = height
+        self.root = snapshot.link_tree(nodes, data.depths.tolist(), sizes=self.order_statistics) # Link the nodes
+        self.count = len(nodes) # Number of keys in the tree
+        self.spine = None # The right spine has changed
+        self.leaves = tree_metrics(self.root)["leaves"] # Count the leaves of the new tree once
+        self.record_metrics() # Set the height and the number of leaves in the statistics
+
+    def freeze(self):
+
+        """
+
+        Function to make a read-only copy of the AVL Tree for vectorised batch lookups.
+
+        The copy does not follow later changes to the tree.
+
+        Returns:
+            Frozen_Tree: The keys of the tree in Eytzinger layout (see frozen.py).
+
+        """
+
+        return Frozen_Tree(np.asarray(list(self))) # The in-order walk gives the keys in ascending order
+
+    # Function to insert a key into the AVL Tree 
+    def insert(self, key, value=None, duplicates=None):
+
+        """
+
+        Function to insert a key into the AVL Tree.
+
+        The insertion walks down iteratively, keeping the visited nodes on a path stack,
+        and then rebalances on the way back up.
+
+        In append mode, a key at or above the current maximum is attached below the maximum
+        directly (see append).
+
+        Parameters:
+            key (int): The key to be inserted.
+            value (object): The value stored with the key.
+            duplicates (str): The policy for a key that is already in the tree, or None for the tree's policy.
+
+        Returns:
+            AVL_Node: The node holding the key.
+    
+        """
+
+        if duplicates is None: # Use the policy of the tree
+            duplicates = self.duplicates
+        if self.append_mode and self.root is not None: # Check for a key at or above the maximum
+            spine = self.right_spine()
+            if key >= spine[-1].key:
+                return self.append(key, spine, value, duplicates)
+        self.spine = None # A rotation below may change the right spine
+
+        if self.root is None: # If the tree is empty, create a new node and add the key
+            self.root = self.node_class(key, value)
+            self.count += 1 # One more key in the tree
+            self.leaves = 1 # The root is the only leaf
+            self.statistics.add_step(1) # Add the number of steps
+            self.statistics.add_rotation(0) # Add the number of rotations
+            return self.root
+
+        steps = 0 # Initialise the number of steps
+        path = [] # Stack of the nodes visited on the way down
+        node = self.root # Start searching at the root
+
+        # Search for the correct position to insert the new node
+        while node is not None:
+            steps += 1 # Increment the number of steps
+            path.append(node) # Remember the node
+            if key < node.key: # If the key is less than the current node's key
+                node = node.left # Move to the left
+            else: # If the key is greater than or equal to the current node's key
+                node = node.right # Move to the right
+
+        if duplicates != ALLOW: # Check whether the key is in the tree already
+            existing = self.find_duplicate(path, key)
+            if existing is not None:
+                return self.keep_duplicate(existing, value, duplicates, steps)
+
+        new_node, rotated = self.attach_leaf(path, key, value) # Attach the new node and rebalance the tree on the way back up
+
+        self.statistics.add_step(steps) # Add the number of steps
+        self.statistics.add_rotation(0 if rotated is None else 1) # Add the number of rotations
+        return new_node
+
+    def find_duplicate(self, path, key):
+
+        """
+
+        Function to find the node that already holds a key on the insertion path of that key.
+
+        The copies of the key on the path are ancestors of the new node's position where the
+        walk went right. The first of them from the root is the node that search returns, so
+        that is the copy IGNORE and REPLACE act on. No copy can be above a node of the path
+        with a smaller key, so the walk back up stops there.
+
+        Parameters:
+            path (list): The nodes from the root down to the parent of the new node.
+            key (int): The key to be inserted.
+
+        Returns:
+            AVL_Node: The node holding the key, or None if the key is not in the tree.
+
+        """
+
+        found = None # Highest copy of the key seen so far
+        for node in reversed(path):
+            if node.key < key:
+                break
+            if node.key == key:
+                found = node
+        return found
+
+    def keep_duplicate(self, node, value, duplicates, steps):
+
+        """
+
+        Function to apply the IGNORE or REPLACE policy to the node that already holds a key.
+
+        Parameters:
+            node (AVL_Node): The node holding the key.
+            value (object): The value that was to be inserted.
+            duplicates (str): The duplicate policy.
+            steps (int): The number of steps of the insertion.
+
+        Returns:
+            AVL_Node: The node.
+
+        """
+
+        if duplicates == REPLACE: # Update the value in place
+            node.value = value
+        self.statistics.add_step(steps) # Add the number of steps
+        self.statistics.add_rotation(0) # Nothing was linked, so nothing was rotated
+        return node
+
+    def right_spine(self):
+
+        """
+
+        Function to get the nodes on the right spine of the AVL Tree, from the root down to the maximum.
+
+        The spine is cached between appends and found again in O(log n) after any other change.
+
+        Returns:
+            list: The nodes on the right spine.
+
+        """
+
+        if self.spine is None: # Walk down the right spine again
+            self.spine = []
+            node = self.root
+            while node is not None:
+                self.spine.append(node)
+                node = node.right
+        return self.spine
+
+    def append(self, key, spine, value=None, duplicates=ALLOW):
+
+        """
+
+        Function to insert a key at or above the maximum of the AVL Tree without a search from the root.
+
+        The right spine is the insertion path of such a key, so the new node is attached below
+        the maximum and only the spine is rebalanced. The only rotation that can happen is a
+        left rotation at a spine node, which moves that node off the spine.
+
+        Parameters:
+            key (int): The key to be inserted.
+            spine (list): The nodes on the right spine, from right_spine.
+            value (object): The value stored with the key.
+            duplicates (str): The policy for a key equal to the maximum.
+
+        Returns:
+            AVL_Node: The node holding the key.
+
+        """
+
+        if duplicates != ALLOW and spine[-1].key == key: # The maximum holds the key already
+            return self.keep_duplicate(self.find_duplicate(spine, key), value, duplicates, 1) # The spine is the path of the key
+
+        new_node, rotated = self.attach_leaf(spine, key, value) # Attach the new node below the maximum and rebalance the spine
+        if rotated is not None: # The rotated node is now the left child of the next spine node
+            del spine[rotated]
+        spine.append(new_node) # The new node is the new maximum
+
+        self.statistics.add_step(1) # Only the maximum was visited
+        self.statistics.add_rotation(0 if rotated is None else 1) # Add the number of rotations
+        return new_node
+
+    def attach_leaf(self, path, key, value=None):
+
+        """
+
+        Function to attach a new leaf below the last node of a path and rebalance the path.
+
+        Parameters:
+            path (list): The nodes from the root down to the parent of the new node.
+            key (int): The key to be inserted.
+            value (object): The value stored with the key.
+
+        Returns:
+            AVL_Node: The new node.
+            int: The position in the path of the node that was rotated, or None if there was no rotation.
+
+        """
+
+        if self.order_statistics: # Every node on the path gains one node in its subtree
+            for node in path:
+                node.size += 1
+        self.count += 1 # One more key in the tree
+
+        new_node = self.node_class(key, value) # Create the new node
+        parent = path[-1] # The last node of the path is the parent of the new node
+        if key < parent.key: # Attach the new node to the correct side of the parent
+            if parent.right is not None: # The parent was not a leaf, so there is one more leaf
+                self.leaves += 1
+            parent.left = new_node
+        else:
+            if parent.left is not None: # The parent was not a leaf, so there is one more leaf
+                self.leaves += 1
+            parent.right = new_node
+
+        return new_node, self.rebalance_path(path, key)
+
+    def rebalance_path(self, path, key):
+
+        """
+
+        Function to rebalance the nodes on an insertion path from the bottom up.
+
+        An insertion needs at most one (single or double) rotation, after which the subtree is
+        back to its old height, so the walk stops there or as soon as a height stops changing.
+
+        Parameters:
+            path (list): The nodes from the root down to the parent of the inserted node.
+            key (int): The key that was inserted.
+
+        Returns:
+            int: The position in the path of the node that was rotated, or None if there was no rotation.
+
+        """
+
+        for i in range(len(path) - 1, -1, -1): # Walk back up the path
+            node = path[i]
+            old_height = node.height # Remember the height before the insertion
+            self.update_height(node) # Update the height of the current node
+            balance = self.balance_factor(node) # Get the balance factor of the current node
+
+            # Perform rotations if necessary
+            if balance > 1: # If the tree is left heavy
+                if key < node.left.key: # If the key is less than the key of the left child
+                    new_root = self.right_rotation(node) # Perform a right rotation
+                else: # If the key is greater than or equal to the key of the left child
+                    new_root = self.left_right_rotation(node) # Perform a left-right rotation
+            elif balance < -1: # If the tree is right heavy
+                if key >= node.right.key: # If the key is greater than or equal to the key of the right child
+                    new_root = self.left_rotation(node) # Perform a left rotation
+                else: # If the key is less than the key of the right child
+                    new_root = self.right_left_rotation(node) # Perform a right-left rotation
+            else: # If the node is balanced
+                if node.height == old_height: # If the height did not change, the ancestors are unaffected
+                    return None
+                continue
+
+            # Attach the rotated subtree to the parent of the node
+            if i == 0: # If the node was the root
+                self.root = new_root
+            elif path[i - 1].left is node: # If the node was a left child
+                path[i - 1].left = new_root
+            else: # If the node was a right child
+                path[i - 1].right = new_root
+            return i # The rotated subtree has its old height again
+
+        return None
+
+    def insert_many(self, keys, rebuild=None):
+
+        """
+
+        Function to insert a batch of keys into the AVL Tree.
+
+        The batch is sorted once. Small batches are inserted in ascending order, and each key
+        starts its search from the path of the previous key instead of from the root: the walk
+        only goes back up to the lowest ancestor whose range still holds the key. The steps and
+        rotations of every key are recorded as for insert, so the steps count only the nodes
+        actually visited. Large batches (see bulk_load.REBUILD_FRACTION) are merged with the
+        keys and values of the tree and the tree is rebuilt in O(n + m) without per-key statistics.
+
+        The batch has no values: new keys hold None, and under REPLACE (as under IGNORE) a key
+        that is already stored keeps its value. Use [] or insert to change values.
+
+        Parameters:
+            keys (iterable): The keys to be inserted (list, generator or NumPy array).
+            rebuild (bool): True to always rebuild, False to never rebuild, None to decide from the sizes.
+
+        """
+
+        keys = sorted_keys(keys) # Sort the batch once
+        self.spine = None # Rotations below may change the right spine
+        if should_rebuild(len(keys), self.count, rebuild): # Merge the batch in and rebuild the tree
+            self.build_from_sorted(*merge_items(self, keys))
+            return
+
+        path = [] # Nodes from the root down to the parent of the previous key
+        bounds = [] # Key that bounds the subtree of each node on the path from above (None if unbounded)
+
+        for key in keys:
+            if self.root is None: # The first key of an empty tree becomes the root
+                self.insert(key)
+                continue
+
+            steps = 0 # Initialise the number of steps
+            while bounds and bounds[-1] is not None and key >= bounds[-1]: # Climb while the key is outside the subtree
+                path.pop()
+                bounds.pop()
+                steps += 1 # Increment the number of steps
+
+            if path: # Continue below the lowest node whose subtree still holds the key
+                node = path[-1]
+                if key < node.key: # Move to the left
+                    bound = node.key
+                    node = node.left
+                else: # Move to the right
+                    bound = bounds[-1]
+                    node = node.right
+            else: # Start again from the root
+                node = self.root
+                bound = None
+
+            # Search for the correct position to insert the new node
+            while node is not None:
+                steps += 1 # Increment the number of steps
+                path.append(node) # Remember the node
+                bounds.append(bound) # Remember the bound of its subtree
+                if key < node.key: # If the key is less than the current node's key
+                    bound = node.key # Keys in the left subtree are less than the node's key
+                    node = node.left # Move to the left
+                else: # If the key is greater than or equal to the current node's key
+                    node = node.right # Move to the right
+
+            if self.duplicates != ALLOW: # Check whether the key is in the tree already
+                existing = self.find_duplicate(path, key)
+                if existing is not None:
+                    self.keep_duplicate(existing, None, IGNORE, steps) # The batch has no value to replace the stored one with
+                    continue
+
+            new_node, rotated = self.attach_leaf(path, key) # Attach the new node and rebalance the tree
+
+            if rotated is None: # The path is unchanged, so the new node extends it
+                path.append(new_node)
+                bounds.append(bound)
+            else: # The nodes below the rotated node have moved, so the path is cut above it
+                del path[rotated:]
+                del bounds[rotated:]
+
+            self.statistics.add_step(steps) # Add the number of steps
+            self.statistics.add_rotation(0 if rotated is None else 1) # Add the number of rotations
+
+    def insert_using_recursion(self, key, value=None):
+
+        """
+
+        Function to insert a key into the AVL Tree using the recursive insertion.
+
+        Records the same statistics as insert and is kept as a reference for benchmarks.
+
+        Parameters:
+            key (int): The key to be inserted.
+            value (object): The value stored with the key.
+
+        """
+
+        if self.duplicates != ALLOW: # Check whether the key is in the tree already
+            existing, steps = self.find_node(key)
+            if existing is not None:
+                self.keep_duplicate(existing, value, self.duplicates, steps)
+                return
+
+        self.count += 1 # One more key in the tree
+        self.spine = None # Rotations below may change the right spine
+        if self.root is None: # If the tree is empty, create a new node and add the key
+            self.root = self.node_class(key, value)
+            self.leaves = 1 # The root is the only leaf
+            self.statistics.add_step(1) # Add the number of steps
+            self.statistics.add_rotation(0) # Add the number of rotations
+        else: # If the tree is not empty, call the recursive function to insert the key
+            steps = 0 # Initialise the number of steps
+            rotations = 0 # Initialise the number of rotations
+            self.root, rotations = self.insert_recursive(self.root, key, steps, rotations, value)
+            self.statistics.add_rotation(self.rotations) # Add the number of rotations
+            self.rotations = 0 # Reset the number of rotations
+
+    def insert_recursive(self, node, key, steps, rotations, value=None):
+
+        """
+
+        Recursive function to insert a key into the AVL Tree.
+
+        Parameters:
+            node (AVL_Node): The current node being considered.
+            key (int): The key to be inserted.
+            steps (int): The number of steps taken to reach the current node.
+            rotations (int): The number of rotations performed.
+            value (object): The value stored with the key.
+
+        Returns:
+            AVL_Node: The new root of the subtree.
+            rotations (int): The number of rotations performed.
+
+        """
+        
+        # Base case
+        if node is None: # If the position of the key is found 
+            self.statistics.add_step(steps) # Add the number of steps
+            return self.node_class(key, value), rotations # Create a new node with the key
+        
+        steps += 1 # Increment the number of steps
+        if self.order_statistics: # The subtree gains one node
+            node.size += 1
+
+        if key < node.key: # If the key is less than the current node's key
+            if node.left is None and node.right is not None: # The new leaf hangs below a node that was not a leaf
+                self.leaves += 1
+            node.left, rotations_left = self.insert_recursive(node.left, key, steps, rotations, value) # Insert it into the left subtree recursively
+            rotations += rotations_left
+        else: # If the key is greater than the current node's key
+            if node.right is None and node.left is not None: # The new leaf hangs below a node that was not a leaf
+                self.leaves += 1
+            node.right, rotations_right = self.insert_recursive(node.right, key, steps, rotations, value) # Insert it into the right subtree recursively
+            rotations += rotations_right
+
+        # Update the height of the current node
+        self.update_height(node)
+
+        # Get the balance factor of the current node
+        balance = self.balance_factor(node)
+
+         # Perform rotations if necessary
+        if balance > 1: # If the tree is left heavy
+            if key < node.left.key: # If the key is less than the key of the left child
+                self.rotations += 1 # Increment the number of rotations
+                node = self.right_rotation(node) # Perform a right rotation
+            else: # If the key is greater than or equal to the key of the left child
+                self.rotations += 1 # Increment the number of rotations
+                node = self.left_right_rotation(node) # Perform a left-right rotation
+        elif balance < -1: # If the tree is right heavy
+            if key >= node.right.key: # If the key is greater than or equal to the key of the right child
+                self.rotations += 1 # Increment the number of rotations
+                node =  self.left_rotation(node) # Perform a left rotation
+            else: # If the key is less than the key of the right child
+                self.rotations += 1 # Increment the number of rotations
+                node = self.right_left_rotation(node) # Perform a right-left rotation
+        return node, rotations # Return the current node and the number of rotations
+
+    # Search
+    def search(self, key):
+
+        """
+
+        Function to search for a key in the AVL Tree.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            AVL_Node: The node holding the key, or None if the key is not in the tree.
+
+        """
+
+        steps = 0 # Initialise the number of steps
+        node = self.root # Start searching at the root
+
+        while node is not None: # While the key has not been found
+            steps += 1 # Increment the number of steps
+            if key == node.key: # If the key is found
+                break
+            elif key < node.key: # If the key is less than the current node's key
+                node = node.left # Move to the left
+            else: # If the key is greater than the current node's key
+                node = node.right # Move to the right
+
+        self.statistics.add_search_step(steps) # Add the number of steps
+        return node
+
+    def __contains__(self, key):
+
+        """
+
+        Function to check whether a key is in the AVL Tree.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            bool: True if the key is in the tree.
+
+        """
+
+        return self.search(key) is not None
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of keys in the AVL Tree.
+
+        Returns:
+            int: The number of keys.
+
+        """
+
+        return self.count
+
+    def find_node(self, key):
+
+        """
+
+        Function to find the node holding a key without recording any statistics.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            AVL_Node: The node holding the key, or None if the key is not in the tree.
+            int: The number of steps taken.
+
+        """
+
+        steps = 0 # Initialise the number of steps
+        node = self.root # Start searching at the root
+
+        while node is not None: # While the key has not been found
+            steps += 1 # Increment the number of steps
+            if key == node.key: # If the key is found
+                break
+            elif key < node.key: # If the key is less than the current node's key
+                node = node.left # Move to the left
+            else: # If the key is greater than the current node's key
+                node = node.right # Move to the right
+
+        return node, steps
+
+    # Ordered map
+    def __getitem__(self, key):
+
+        """
+
+        Function to get the value stored with a key.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            object: The value of the key.
+
+        Raises:
+            KeyError: If the key is not in the tree.
+
+        """
+
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
+    def __setitem__(self, key, value):
+
+        """
+
+        Function to store a value with a key, updating it in place if the key is in the tree already.
+
+        Parameters:
+            key (int): The key.
+            value (object): The value to be stored.
+
+        """
+
+        self.insert(key, value, REPLACE)
+
+    def __delitem__(self, key):
+
+        """
+
+        Function to delete a key and its value.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Raises:
+            KeyError: If the key is not in the tree.
+
+        """
+
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+
+        """
+
+        Function to get the value stored with a key, or a default if the key is not in the tree.
+
+        Parameters:
+            key (int): The key to be searched for.
+            default (object): The value returned if the key is not in the tree.
+
+        Returns:
+            object: The value of the key, or the default.
+
+        """
+
+        node = self.search(key)
+        return default if node is None else node.value
+
+    def setdefault(self, key, default=None):
+
+        """
+
+        Function to get the value stored with a key, inserting the key with a default value first if it is not in the tree.
+
+        Only one walk down the tree is needed in both cases.
+
+        Parameters:
+            key (int): The key.
+            default (object): The value stored if the key is not in the tree.
+
+        Returns:
+            object: The value of the key.
+
+        """
+
+        return self.insert(key, default, IGNORE).value
+
+    def items(self, low=None, high=None):
+
+        """
+
+        Function to iterate over the keys between two bounds and their values in ascending order of key.
+
+        Parameters:
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+
+        Returns:
+            generator: The (key, value) pairs.
+
+        """
+
+        return self.walk(low, high, False, True)
+
+    def values(self):
+
+        """
+
+        Function to iterate over the values in ascending order of key.
+
+        Returns:
+            generator: The values.
+
+        """
+
+        return (value for _, value in self.items())
+
+    # Batch lookups
+    def search_many(self, queries):
+
+        """
+
+        Function to search for every key of an array in the AVL Tree.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: The node holding each key, or None if the key is not in the tree (object array).
+
+        """
+
+        nodes, _ = self.find_many(queries)
+        return nodes
+
+    def contains_many(self, queries):
+
+        """
+
+        Function to check whether every key of an array is in the AVL Tree.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: True for every key that is in the tree.
+
+        """
+
+        _, found = self.find_many(queries)
+        return found
+
+    def find_many(self, queries):
+
+        """
+
+        Function to search for a batch of keys with one traversal of the tree.
+
+        The queries are sorted once and walk down together: every node splits the sorted
+        queries that reach it into the ones below, equal to and above its key, so each node is
+        visited at most once for the whole batch. Each query still records the number of nodes
+        on its own path, as search would, and the steps are added to the statistics as one array.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: The node holding each key, or None (object array).
+            numpy.ndarray: True for every key that is in the tree.
+
+        """
+
+        queries = np.asarray(queries).ravel()
+        order = np.argsort(queries, kind="stable") # Position of each query in sorted order
+        sorted_queries = queries[order].tolist() # Python scalars are faster to bisect
+        count = len(sorted_queries)
+        sorted_nodes = [None] * count # Node found for each query, in sorted order
+        sorted_steps = [0] * count # Number of steps of each query, in sorted order
+
+        stack = [(self.root, 0, count, 1)] # Subtree, range of sorted queries that reach it, and its depth
+        while stack:
+            node, low, high, depth = stack.pop()
+            if node is None: # The queries fell off the tree after depth - 1 nodes
+                sorted_steps[low:high] = [depth - 1] * (high - low)
+                continue
+
+            first = bisect_left(sorted_queries, node.key, low, high) # First query not less than the key
+            last = bisect_right(sorted_queries, node.key, first, high) # First query greater than the key
+            if first < last: # The queries equal to the key stop here
+                sorted_nodes[first:last] = [node] * (last - first)
+                sorted_steps[first:last] = [depth] * (last - first)
+            if low < first: # The smaller queries continue on the left
+                stack.append((node.left, low, first, depth + 1))
+            if last < high: # The larger queries continue on the right
+                stack.append((node.right, last, high, depth + 1))
+
+        # Put the results back in the order of the queries
+        nodes = np.empty(count, dtype=object)
+        nodes[order] = sorted_nodes
+        steps = np.empty(count, dtype=np.int64)
+        steps[order] = sorted_steps
+        self.statistics.add_search_steps(steps) # Add the number of steps of every query
+        return nodes, np.not_equal(nodes, None)
+
+    # Deletion
+    def delete(self, key):
+
+        """
+
+        Function to delete one occurrence of a key from the AVL Tree.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Returns:
+            bool: True if the key was found and deleted.
+
+        """
+
+        steps = 0 # Initialise the number of steps
+        path = [] # Stack of the ancestors of the node to be deleted
+        node = self.root # Start searching at the root
+
+        while node is not None: # While the key has not been found
+            steps += 1 # Increment the number of steps
+            if key == node.key: # If the key is found
+                break
+            path.append(node) # Remember the node
+            if key < node.key: # If the key is less than the current node's key
+                node = node.left # Move to the left
+            else: # If the key is greater than the current node's key
+                node = node.right # Move to the right
+
+        if node is None: # If the key is not in the tree
+            self.statistics.add_delete_step(steps) # Add the number of steps
+            self.statistics.add_delete_rotation(0) # Add the number of rotations
+            return False
+
+        extra_steps, rotations = self.remove_node(path, node) # Remove the node and rebalance the tree
+        self.statistics.add_delete_step(steps + extra_steps) # Add the number of steps
+        self.statistics.add_delete_rotation(rotations) # Add the number of rotations
+        return True
+
+    def pop_min(self):
+
+        """
+
+        Function to remove and return the smallest key in the AVL Tree.
+
+        Returns:
+            int: The smallest key.
+
+        Raises:
+            KeyError: If the tree is empty.
+
+        """
+
+        return self.pop_end("left")
+
+    def pop_max(self):
+
+        """
+
+        Function to remove and return the largest key in the AVL Tree.
+
+        Returns:
+            int: The largest key.
+
+        Raises:
+            KeyError: If the tree is empty.
+
+        """
+
+        return self.pop_end("right")
+
+    def pop_end(self, side):
+
+        """
 
-    # Function to insert a key into the AVL Tree 
-    def insert(self, key):
+        Function to remove and return the key at the far left or far right of the AVL Tree.
+
+        Parameters:
+            side (str): "left" for the smallest key or "right" for the largest key.
+
+        Returns:
+            int: The key that was removed.
+
+        Raises:
+            KeyError: If the tree is empty.
 
         """
 
-        Function to insert a key into the AVL Tree.
+        if self.root is None: # If the tree is empty, there is nothing to remove
+            raise KeyError("pop from an empty tree")
+
+        steps = 1 # Initialise the number of steps
+        path = [] # Stack of the ancestors of the node to be deleted
+        node = self.root # Start at the root
+        while getattr(node, side) is not None: # Follow the left or right spine down
+            steps += 1 # Increment the number of steps
+            path.append(node) # Remember the node
+            node = getattr(node, side)
+
+        key = node.key # Remember the key before the node is removed
+        extra_steps, rotations = self.remove_node(path, node) # Remove the node and rebalance the tree
+        self.statistics.add_delete_step(steps + extra_steps) # Add the number of steps
+        self.statistics.add_delete_rotation(rotations) # Add the number of rotations
+        return key
+
+    def remove_node(self, path, node):
+
+        """
+
+        Function to unlink a node from the AVL Tree and rebalance its ancestors.
+
+        A node with two children takes the key of its in-order successor, which is then
+        unlinked instead.
 
         Parameters:
-            key (int): The key to be inserted.
-    
+            path (list): The nodes from the root down to the parent of the node.
+            node (AVL_Node): The node to be removed.
+
+        Returns:
+            int: The number of extra steps taken to find the successor.
+            int: The number of rotations performed.
+
         """
 
-        if self.root is None: # If the tree is empty, create a new node and add the key
-            self.root = AVL_Node(key)
-            self.statistics.add_step(1) # Add the number of steps
-            self.statistics.add_rotation(0) # Add the number of rotations
-        else: # If the tree is not empty, call the recursive function to insert the key
-            steps = 0 # Initialise the number of steps
-            rotations = 0 # Initialise the number of rotations
-            self.root, rotations = self.insert_recursive(self.root, key, steps, rotations) 
+        steps = 0 # Initialise the number of extra steps
+
+        if node.left is not None and node.right is not None: # If the node has two children
+            path.append(node) # The node stays in the tree and takes the successor's key
+            successor = node.right # The successor is the leftmost node of the right subtree
+            steps += 1 # Increment the number of steps
+            while successor.left is not None:
+                path.append(successor) # Remember the node
+                successor = successor.left
+                steps += 1 # Increment the number of steps
+            node.key = successor.key # Copy the successor's key into the node
+            node.value = successor.value # And its value
+            node = successor # The successor is unlinked instead
+
+        child = node.left if node.left is not None else node.right # The only child of the node, if any
+
+        # Replace the node with its child
+        if not path: # If the node is the root
+            self.root = child
+        elif path[-1].left is node: # If the node is a left child
+            path[-1].left = child
+        else: # If the node is a right child
+            path[-1].right = child
+
+        if child is None: # The node was a leaf
+            self.leaves -= 1
+            if path and path[-1].left is None and path[-1].right is None: # Its parent is a leaf now
+                self.leaves += 1
+
+        if self.order_statistics: # Every node on the path loses one node from its subtree
+            for ancestor in path:
+                ancestor.size -= 1
+        self.count -= 1 # One key less in the tree
+        self.spine = None # The right spine may have changed
+
+        return steps, self.rebalance_after_delete(path)
 
-    def insert_recursive(self, node, key, steps, rotations):
+    def rebalance_after_delete(self, path):
 
         """
 
-        Recursive function to insert a key into the AVL Tree.
+        Function to rebalance the nodes on a deletion path from the bottom up.
+
+        Unlike an insertion, a deletion can need one rotation on every level, so the walk only
+        stops once the height of a subtree is unchanged.
 
         Parameters:
-            node (AVL_Node): The current node being considered.
-            key (int): The key to be inserted.
-            steps (int): The number of steps taken to reach the current node.
-            rotations (int): The number of rotations performed.
+            path (list): The nodes from the root down to the parent of the removed node.
 
         Returns:
-            AVL_Node: The new root of the subtree.
-            rotations (int): The number of rotations performed.
+            int: The number of rotations performed.
 
         """
-        
-        # Base case
-        if node is None: # If the positicccon of the key is found 
-            self.statistics.add_step(steps) # Add the number of steps
-            self.statistics.add_rotation(self.rotations) # Add the number of rotations
-            self.rotations = 0 # Reset the number of rotations
-            return AVL_Node(key), rotations # Create a new node with the key
-        
-        steps += 1 # Increment the number of steps
 
-        if key < node.key: # If the key is less than the current node's key
-            node.left, rotations_left = self.insert_recursive(node.left, key, steps, rotations) # Insert it into the left subtree recursively
-            rotations += rotations_left
-        else: # If the key is greater than the current node's key
-            node.right, rotations_right = self.insert_recursive(node.right, key, steps, rotations) # Insert it into the right subtree recursively
-            rotations += rotations_right
+        rotations = 0 # Initialise the number of rotations
 
-        # Update the height of the current node
-        self.update_height(node)
+        for i in range(len(path) - 1, -1, -1): # Walk back up the path
+            node = path[i]
+            old_height = node.height # Remember the height before the deletion
+            self.update_height(node) # Update the height of the current node
+            balance = self.balance_factor(node) # Get the balance factor of the current node
+            new_root = node
 
-        # Get the balance factor of the current node
-        balance = self.balance_factor(node)
+            # Perform rotations if necessary
+            if balance > 1: # If the tree is left heavy
+                if self.balance_factor(node.left) >= 0: # If the left child is not right heavy
+                    new_root = self.right_rotation(node) # Perform a right rotation
+                else:
+                    new_root = self.left_right_rotation(node) # Perform a left-right rotation
+                rotations += 1 # Increment the number of rotations
+            elif balance < -1: # If the tree is right heavy
+                if self.balance_factor(node.right) <= 0: # If the right child is not left heavy
+                    new_root = self.left_rotation(node) # Perform a left rotation
+                else:
+                    new_root = self.right_left_rotation(node) # Perform a right-left rotation
+                rotations += 1 # Increment the number of rotations
 
-         # Perform rotations if necessary
-        if balance > 1: # If the tree is left heavy
-            if key < node.left.key: # If the key is less than the key of the left child
-                self.rotations += 1 # Increment the number of rotations
-                node = self.right_rotation(node) # Perform a right rotation
-            elif key > node.left.key: # If the key is greater than the key of the left child
-                self.rotations += 1 # Increment the number of rotations
-                node = self.left_right_rotation(node) # Perform a left-right rotation
-        elif balance < -1: # If the tree is right heavy
-            if key > node.right.key: # If the key is greater than the key of the right child
-                self.rotations += 1 # Increment the number of rotations
-                node =  self.left_rotation(node) # Perform a left rotation
-            elif key < node.right.key: # If the key is less than the key of the right child
-                self.rotations += 1 # Increment the number of rotations
-                node = self.right_left_rotation(node) # Perform a right-left rotation
-        return node, rotations # Return the current node and the number of rotations
+            if new_root is not node: # Attach the rotated subtree to the parent of the node
+                if i == 0: # If the node was the root
+                    self.root = new_root
+                elif path[i - 1].left is node: # If the node was a left child
+                    path[i - 1].left = new_root
+                else: # If the node was a right child
+                    path[i - 1].right = new_root
+
+            if new_root.height == old_height: # If the height did not change, the ancestors are unaffected
+                break
+
+        return rotations
+
+    # Ordered iteration
+    def __iter__(self):
+
+        """
+
+        Function to iterate over the keys in ascending order.
+
+        Returns:
+            generator: The keys in ascending order.
+
+        """
+
+        return self.range()
+
+    def __reversed__(self):
+
+        """
+
+        Function to iterate over the keys in descending order.
+
+        Returns:
+            generator: The keys in descending order.
+
+        """
+
+        return self.walk(None, None, True)
+
+    def range(self, low=None, high=None):
+
+        """
+
+        Function to iterate over the keys between two bounds in ascending order.
+
+        The keys are produced lazily in O(log n + k) time and with O(log n) memory.
+
+        Parameters:
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+
+        Returns:
+            generator: The keys between the bounds in ascending order.
+
+        """
+
+        return self.walk(low, high, False)
+
+    def walk(self, low, high, reverse, items=False):
+
+        """
+
+        Generator for an in-order walk of the keys between two bounds, using a stack instead of recursion.
+
+        Only the nodes on the path to the first key are pushed, so a consumer that stops early
+        does not pay for the rest of the tree.
+
+        Parameters:
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+            reverse (bool): If True, the keys are produced in descending order.
+            items (bool): If True, (key, value) pairs are produced instead of keys.
+
+        Yields:
+            int: The next key, or the next (key, value) pair.
+
+        """
+
+        if reverse: # Walk from the largest key, swapping the roles of the children and bounds
+            first_side, second_side, start, stop = "right", "left", high, low
+            before = lambda key: start is not None and key > start # The key comes before the start of the walk
+            after = lambda key: stop is not None and key < stop # The key comes after the end of the walk
+        else:
+            first_side, second_side, start, stop = "left", "right", low, high
+            before = lambda key: start is not None and key < start
+            after = lambda key: stop is not None and key > stop
+
+        stack = [] # Nodes whose key and second subtree are still to be produced
+        node = self.root
+
+        while True:
+            # Go down towards the start of the walk, remembering the nodes that are inside it
+            while node is not None:
+                if before(node.key): # The node and its first subtree come before the start
+                    node = getattr(node, second_side)
+                else:
+                    stack.append(node)
+                    node = getattr(node, first_side)
+
+            if not stack: # Every key has been produced
+                return
+
+            node = stack.pop() # The next node in order
+            if after(node.key): # The walk has gone past its end
+                return
+            yield (node.key, node.value) if items else node.key
+            node = getattr(node, second_side) # Continue with the second subtree of the node
+
+    def floor(self, key):
+
+        """
+
+        Function to find the largest key less than or equal to a key.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The largest key less than or equal to the key, or None if there is none.
+
+        """
+
+        best = None # Best key found so far
+        node = self.root # Start searching at the root
+        while node is not None:
+            if node.key <= key: # The node is a candidate, look for a larger one on the right
+                best = node.key
+                node = node.right
+            else: # The node is too large, look on the left
+                node = node.left
+        return best
+
+    def ceiling(self, key):
+
+        """
+
+        Function to find the smallest key greater than or equal to a key.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The smallest key greater than or equal to the key, or None if there is none.
+
+        """
+
+        best = None # Best key found so far
+        node = self.root # Start searching at the root
+        while node is not None:
+            if node.key >= key: # The node is a candidate, look for a smaller one on the left
+                best = node.key
+                node = node.left
+            else: # The node is too small, look on the right
+                node = node.right
+        return best
+
+    # Order statistics
+    def rank(self, key):
+
+        """
+
+        Function to count the keys less than a key in O(log n).
+
+        Parameters:
+            key (int): The key to be ranked.
+
+        Returns:
+            int: The number of keys less than the key.
+
+        """
+
+        return self.count_below(key, False)
+
+    def select(self, k):
+
+        """
+
+        Function to find the k-th smallest key in O(log n).
+
+        Parameters:
+            k (int): The position of the key in ascending order, starting from 0.
+
+        Returns:
+            int: The k-th smallest key.
+
+        Raises:
+            IndexError: If k is out of range.
+
+        """
+
+        self.check_order_statistics()
+        if k < 0 or k >= self.subtree_size(self.root): # If there is no k-th key
+            raise IndexError("select index out of range")
+
+        node = self.root # Start searching at the root
+        while True:
+            left_size = self.subtree_size(node.left) # Number of keys smaller than the node in its subtree
+            if k < left_size: # The key is in the left subtree
+                node = node.left
+            elif k == left_size: # The key is in the node
+                return node.key
+            else: # The key is in the right subtree
+                k -= left_size + 1
+                node = node.right
+
+    def count_range(self, low, high):
+
+        """
+
+        Function to count the keys between two bounds in O(log n).
+
+        Parameters:
+            low (int): The smallest key to be counted (inclusive).
+            high (int): The largest key to be counted (inclusive).
+
+        Returns:
+            int: The number of keys between the bounds.
+
+        """
+
+        return max(self.count_below(high, True) - self.count_below(low, False), 0)
+
+    def count_below(self, key, inclusive):
+
+        """
+
+        Function to count the keys less than (or equal to) a key using the subtree sizes.
+
+        Parameters:
+            key (int): The key to be compared against.
+            inclusive (bool): If True, keys equal to the key are counted too.
+
+        Returns:
+            int: The number of keys below the key.
+
+        """
+
+        self.check_order_statistics()
+        count = 0 # Number of keys below the key found so far
+        node = self.root # Start searching at the root
+        while node is not None:
+            if node.key < key or (inclusive and node.key == key): # The node and its left subtree are below the key
+                count += self.subtree_size(node.left) + 1
+                node = node.right
+            else: # Only keys in the left subtree can be below the key
+                node = node.left
+        return count
+
+    def check_order_statistics(self):
+
+        """
+
+        Function to check that the tree keeps subtree sizes.
+
+        Raises:
+            RuntimeError: If the tree was created without order statistics.
+
+        """
+
+        if not self.order_statistics:
+            raise RuntimeError("order statistics are disabled; create the tree with order_statistics=True")
+
+    # Invariants
+    def check_invariants(self):
+
+        """
+
+        Function to check that the AVL Tree is a valid, balanced binary search tree.
+
+        The keys must be in order, every stored height must be right, the heights of the two
+        subtrees of every node must differ by at most one, the subtree sizes must be right (with
+        order statistics) and the number of nodes and leaves must match the counters.
+
+        Raises:
+            RuntimeError: If an invariant does not hold.
+
+        """
+
+        _, size = self.check_subtree(self.root, None, None)
+        if size != self.count:
+            raise RuntimeError(f"the tree has {size} nodes but counts {self.count} keys")
+        leaves = tree_metrics(self.root)["leaves"]
+        if leaves != self.leaves:
+            raise RuntimeError(f"the tree has {leaves} leaves but counts {self.leaves}")
+
+    def check_subtree(self, node, low, high):
+
+        """
+
+        Recursive function to check the invariants of a subtree.
+
+        Parameters:
+            node (AVL_Node): The root of the subtree.
+            low (int): The smallest key allowed in the subtree, or None.
+            high (int): The largest key allowed in the subtree, or None.
+
+        Returns:
+            int: The height of the subtree.
+            int: The number of nodes in the subtree.
+
+        Raises:
+            RuntimeError: If an invariant does not hold.
+
+        """
+
+        if node is None: # An empty subtree is valid
+            return 0, 0
+
+        if (low is not None and node.key < low) or (high is not None and node.key > high):
+            raise RuntimeError(f"key {node.key} is out of order")
+        left_height, left_size = self.check_subtree(node.left, low, node.key) # Check the left subtree
+        right_height, right_size = self.check_subtree(node.right, node.key, high) # Check the right subtree
+
+        if node.height != 1 + max(left_height, right_height):
+            raise RuntimeError(f"wrong height at key {node.key}")
+        if abs(left_height - right_height) > 1:
+            raise RuntimeError(f"unbalanced at key {node.key}")
+        if self.order_statistics and node.size != 1 + left_size + right_size:
+            raise RuntimeError(f"wrong subtree size at key {node.key}")
+
+        return node.height, 1 + left_size + right_size
 
     # Rotations
     def left_rotation(self, node):
@@ -115,10 +1508,16 @@ class AVL_Tree:
 
         new_root.left = node
         node.right = left_node
+        if left_node is None: # The node may become a leaf, and the new root may stop being one
+            self.leaves += (node.left is None) - (new_root.right is None)
 
         node.height = 1 + max(self.height(node.left), self.height(node.right))
         new_root.height = 1 + max(self.height(new_root.left), self.height(new_root.right))
 
+        if self.order_statistics: # Update the subtree sizes, the lower node first
+            self.update_size(node)
+            self.update_size(new_root)
+
         return new_root
     
     def right_rotation(self, node):
@@ -140,10 +1539,16 @@ class AVL_Tree:
 
         new_root.right = node
         node.left = right_node
+        if right_node is None: # The node may become a leaf, and the new root may stop being one
+            self.leaves += (node.right is None) - (new_root.left is None)
 
         node.height = 1 + max(self.height(node.left), self.height(node.right))
         new_root.height = 1 + max(self.height(new_root.left), self.height(new_root.right))
 
+        if self.order_statistics: # Update the subtree sizes, the lower node first
+            self.update_size(node)
+            self.update_size(new_root)
+
         return new_root
     
     def left_right_rotation(self, node):
@@ -238,6 +1643,38 @@ class AVL_Tree:
         # Update the height of the node
         node.height = 1 + max(self.height(node.left), self.height(node.right)) # The height of the node is 1 plus the maximum height of the left and right subtrees
 
+    def subtree_size(self, node):
+
+        """
+
+        Function to get the number of nodes in the subtree of a node.
+
+        Parameters:
+            node (AVL_Node): The root of the subtree.
+
+        Returns:
+            int: The number of nodes in the subtree.
+
+        """
+
+        if node is None: # If the node is none, the subtree is empty
+            return 0
+
+        return node.size # Return the size of the subtree
+
+    def update_size(self, node):
+
+        """
+
+        Function to update the number of nodes in the subtree of a node.
+
+        Parameters:
+            node (AVL_Node): The node whose subtree size is to be updated.
+
+        """
+
+        node.size = 1 + self.subtree_size(node.left) + self.subtree_size(node.right) # The node plus the sizes of its subtrees
+
     def get_leaves(self, node):
 
         """
@@ -261,4 +1698,32 @@ class AVL_Tree:
             return 1 # Return 1
         
         # Recursively calculate the number of leaves in the left and right subtrees
-        return self.get_leaves(node.left) + self.get_leaves(node.right) 
\ No newline at end of file
+        return self.get_leaves(node.left) + self.get_leaves(node.right) 
+
+    # Structural metrics
+    def metrics(self):
+
+        """
+
+        Function to measure the tree in one iterative traversal (see metrics.tree_metrics).
+
+        Returns:
+            dict: The number of nodes, the height, the number of leaves and the distribution of the balance factors.
+
+        """
+
+        return tree_metrics(self.root)
+
+    def record_metrics(self):
+
+        """
+
+        Function to set the height and the number of leaves in the statistics in O(1).
+
+        The height is stored in the root and the number of leaves is kept up to date by every
+        change to the tree, so no traversal is needed.
+
+        """
+
+        self.statistics.set_height(self.height(self.root)) # Set the height of the tree
+        self.statistics.set_leaves(self.leaves) # Set the number of leaves in the tree
@@ -0,0 +1,324 @@
+"""
+
+Runs many seeded insert trials of the data structures in parallel and writes the results.
+
+Every trial inserts one workload into one empty structure, like main.py, and measures the
+wall-clock time, the throughput and the peak memory next to the steps, rotations and promotions
+of the structure's statistics. The trials are spread over a process pool, and the statistics
+of the trials with the same structure, size and workload are merged into one summary.
+
+Run `python benchmark_runner.py --sizes 1000 10000 --seeds 5 --csv results.csv`, or call
+run_benchmarks from Python.
+
+"""
+
+import argparse
+import csv
+import json
+import math
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from avl_tree import AVL_Tree
+from red_black_tree import RB_Tree
+from skip_list import Skip_List
+import workloads
+import ds_statistics as ds_stats
+
+STRUCTURES = ("AVL_Tree", "RB_Tree", "Skip_List") # Structures that can be benchmarked
+SERIES = ("steps", "rotations", "promotions") # Series of the statistics written for every trial
+
+# Creates an empty structure
+def make_structure(name, size):
+
+    """
+
+    Function to create an empty structure for a trial.
+
+    Parameters:
+        name (str): One of STRUCTURES.
+        size (int): The number of keys that will be inserted, which sets the levels of a Skip List.
+
+    Returns:
+        object: The empty structure.
+
+    Raises:
+        ValueError: If the name is unknown.
+
+    """
+
+    statistics = ds_stats.Statistics(streaming=True) # Summaries can be sent back and merged in O(1) memory per trial
+    if name == "AVL_Tree":
+        return AVL_Tree(statistics=statistics)
+    if name == "RB_Tree":
+        return RB_Tree(statistics=statistics)
+    if name == "Skip_List":
+        return Skip_List(math.ceil(math.log2(max(size, 2))), 0.5, statistics=statistics) # Same sizing as main.py
+    raise ValueError(f"unknown structure: {name} (expected one of {', '.join(STRUCTURES)})")
+
+# Inserts every key of a workload
+def insert_all(name, keys):
+
+    """
+
+    Function to insert keys one by one into a new structure.
+
+    Parameters:
+        name (str): One of STRUCTURES.
+        keys (list): The keys to be inserted.
+
+    Returns:
+        object: The structure holding the keys.
+
+    """
+
+    structure = make_structure(name, len(keys))
+    for key in keys:
+        structure.insert(key)
+    return structure
+
+# Runs one trial
+def run_trial(structure, size, seed, workload="random", memory=True):
+
+    """
+
+    Function to insert one seeded workload into one structure and measure it.
+
+    The timed run and the memory run are separate, because tracemalloc slows every allocation
+    down and would distort the time.
+
+    Parameters:
+        structure (str): One of STRUCTURES.
+        size (int): The number of keys.
+        seed (int): The seed of the workload.
+        workload (str): The shape of the workload (see workloads.WORKLOADS).
+        memory (bool): If True, the peak memory is measured in a second run.
+
+    Returns:
+        tuple: The row of results and the streaming statistics of the timed run.
+
+    """
+
+    keys = workloads.make_workload(workload, size, seed).tolist() # Python integers, like main.py after the shuffle
+
+    start = time.perf_counter()
+    built = insert_all(structure, keys) # Timed run
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory: # Peak memory of the same inserts
+        tracemalloc.start()
+        insert_all(structure, keys)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    statistics = built.statistics
+    built.record_metrics() # Set the height and leaves of a tree, or the levels of a Skip List
+    stats = statistics.calculate_statistics()
+
+    row = {
+        "structure": structure,
+        "workload": workload,
+        "size": size,
+        "keys": len(built), # Keys stored: fewer than size if the structure drops duplicates
+        "seed": seed,
+        "seconds": seconds,
+        "ops/sec": size / seconds if seconds else math.inf,
+        "peak bytes": peak,
+        "height": stats["height"],
+        "leaves": stats["leaves"],
+        "levels": stats["levels"],
+    }
+    for name in SERIES: # Average and maximum of each series, as plain numbers
+        row[f"avg {name}"] = None if stats[name]["avg"] is None else float(stats[name]["avg"])
+        row[f"max {name}"] = None if stats[name]["max"] is None else int(stats[name]["max"])
+    return row, statistics
+
+# Runs one trial from a tuple of arguments
+def run_trial_arguments(arguments):
+
+    """
+
+    Function to run a trial from a tuple, for ProcessPoolExecutor.map.
+
+    Parameters:
+        arguments (tuple): The arguments of run_trial.
+
+    Returns:
+        tuple: The result of run_trial.
+
+    """
+
+    return run_trial(*arguments)
+
+# Lists the trials of a run
+def plan_trials(structures, sizes, seeds, shapes, memory=True):
+
+    """
+
+    Function to list every combination of structure, size, seed and workload.
+
+    Parameters:
+        structures (list): The structures to be benchmarked.
+        sizes (list): The numbers of keys.
+        seeds (list): The seeds of the workloads.
+        shapes (list): The shapes of the workloads.
+        memory (bool): Whether the peak memory is measured.
+
+    Returns:
+        list: The arguments of run_trial for each trial, largest sizes first so that the pool stays busy.
+
+    """
+
+    trials = [(structure, size, seed, shape, memory)
+              for size in sorted(sizes, reverse=True)
+              for structure in structures
+              for shape in shapes
+              for seed in seeds]
+    return trials
+
+# Summarises the merged statistics of each group of trials
+def summarise(rows, statistics_list):
+
+    """
+
+    Function to group the trials by structure, workload and size and summarise each group.
+
+    Parameters:
+        rows (list): The rows of results of the trials.
+        statistics_list (list): The statistics of the trials, in the same order as the rows.
+
+    Returns:
+        list: One summary row per group, sorted by structure, workload and size.
+
+    """
+
+    groups = {} # Indexes of the trials of each group, in order of first appearance
+    for index, row in enumerate(rows):
+        groups.setdefault((row["structure"], row["workload"], row["size"]), []).append(index)
+
+    summary = []
+    for (structure, workload, size), indexes in groups.items():
+        merged = ds_stats.Statistics(streaming=True)
+        for index in indexes: # Combine the summaries of the trials
+            merged.merge(statistics_list[index])
+        stats = merged.calculate_statistics()
+        seconds = [rows[index]["seconds"] for index in indexes]
+        peaks = [rows[index]["peak bytes"] for index in indexes if rows[index]["peak bytes"] is not None]
+        entry = {
+            "structure": structure,
+            "workload": workload,
+            "size": size,
+            "trials": len(indexes),
+            "seconds": sum(seconds) / len(seconds), # Mean over the trials
+            "ops/sec": size * len(seconds) / sum(seconds) if sum(seconds) else math.inf,
+            "peak bytes": max(peaks) if peaks else None,
+            "height": stats["height"],
+            "leaves": stats["leaves"],
+            "levels": stats["levels"],
+        }
+        for name in SERIES:
+            entry[f"avg {name}"] = None if stats[name]["avg"] is None else float(stats[name]["avg"])
+            entry[f"max {name}"] = None if stats[name]["max"] is None else int(stats[name]["max"])
+        summary.append(entry)
+    summary.sort(key=lambda entry: (entry["structure"], entry["workload"], entry["size"]))
+    return summary
+
+# Runs every trial on a process pool
+def run_benchmarks(structures=STRUCTURES, sizes=(1000,), seeds=(0,), shapes=("random",), workers=None, memory=True):
+
+    """
+
+    Function to run every trial on a process pool and summarise the results.
+
+    Parameters:
+        structures (list): The structures to be benchmarked.
+        sizes (list): The numbers of keys.
+        seeds (list): The seeds of the workloads.
+        shapes (list): The shapes of the workloads.
+        workers (int): The number of processes, or None for one per CPU.
+        memory (bool): Whether the peak memory is measured.
+
+    Returns:
+        tuple: The rows of results of the trials and one summary row per structure, workload and size.
+
+    """
+
+    for structure in structures: # Check the names before starting the processes
+        if structure not in STRUCTURES:
+            raise ValueError(f"unknown structure: {structure} (expected one of {', '.join(STRUCTURES)})")
+    for shape in shapes:
+        if shape not in workloads.WORKLOADS:
+            raise ValueError(f"unknown workload: {shape} (expected one of {', '.join(workloads.WORKLOADS)})")
+
+    trials = plan_trials(structures, sizes, seeds, shapes, memory)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_trial_arguments, trials))
+    rows = [row for row, _ in results]
+    statistics_list = [statistics for _, statistics in results]
+    return rows, summarise(rows, statistics_list)
+
+# Writes rows to a CSV file
+def write_csv(rows, path):
+
+    """
+
+    Function to write rows of results to a CSV file, one column per field.
+
+    Parameters:
+        rows (list): The rows of results.
+        path (str): The path of the file.
+
+    """
+
+    with open(path, "w", newline="") as file:
+        if not rows: # Nothing to write
+            return
+        writer = csv.DictWriter(file, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+# Writes the results to a JSON file
+def write_json(rows, summary, path):
+
+    """
+
+    Function to write the rows of results and the summary to a JSON file.
+
+    Parameters:
+        rows (list): The rows of results of the trials.
+        summary (list): The summary rows.
+        path (str): The path of the file.
+
+    """
+
+    with open(path, "w") as file:
+        json.dump({"trials": rows, "summary": summary}, file, indent=2)
+
+if __name__ == "__main__":
+    from benchmarks import print_results
+
+    parser = argparse.ArgumentParser(description="Run seeded insert trials of the data structures on a process pool.")
+    parser.add_argument("--structures", nargs="+", default=list(STRUCTURES), help="Structures: " + ", ".join(STRUCTURES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000], help="Numbers of keys")
+    parser.add_argument("--seeds", type=int, default=3, help="Number of seeds per size, structure and workload")
+    parser.add_argument("--first-seed", type=int, default=2024, help="First seed")
+    parser.add_argument("--workloads", nargs="+", default=["random"], help="Workloads: " + ", ".join(workloads.WORKLOADS))
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (default: one per CPU)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory measurement")
+    parser.add_argument("--csv", help="Path of the CSV file of the trials")
+    parser.add_argument("--json", help="Path of the JSON file of the trials and the summary")
+    arguments = parser.parse_args()
+
+    seeds = range(arguments.first_seed, arguments.first_seed + arguments.seeds)
+    try:
+        rows, summary = run_benchmarks(arguments.structures, arguments.sizes, seeds, arguments.workloads,
+                                       arguments.workers, not arguments.no_memory)
+    except ValueError as error:
+        parser.error(str(error))
+
+    print_results(summary)
+    if arguments.csv:
+        write_csv(rows, arguments.csv)
+    if arguments.json:
+        write_json(rows, summary, arguments.json)
@@ -0,0 +1,1074 @@
+"""
+
+Micro-benchmarks for the data structures.
+
+Run `python benchmarks.py` to run every benchmark, or `python benchmarks.py avl_insert`
+to run a single one.
+
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import numpy as np
+from avl_tree import AVL_Tree
+from red_black_tree import RB_Tree
+from skip_list import Skip_List
+from knuth_shuffle import knuth_shuffle
+from concurrent_tree import Concurrent_Tree
+from concurrent_skip_list import Concurrent_Skip_List
+import workloads
+import snapshot
+from profiling import Profiler
+from duplicates import POLICIES
+import ds_statistics as ds_stats
+
+# Times a function
+def best_time(function, repeat):
+
+    """
+
+    Function to time a function and keep the best of several runs.
+
+    Parameters:
+        function (callable): The function to be timed. It is called without arguments.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The best wall-clock time in seconds.
+        object: The value returned by the last run.
+
+    """
+
+    best = float("inf") # Best time so far
+    result = None # Value returned by the last run
+    for _ in range(repeat):
+        start = time.perf_counter() # Start the timer
+        result = function()
+        best = min(best, time.perf_counter() - start) # Keep the best time
+    return best, result
+
+# Generates the keys for a benchmark
+def make_keys(size, seed, order="random"):
+
+    """
+
+    Function to generate the keys for a benchmark.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): The seed of the random number generator.
+        order (str): The name of a workload in workloads.WORKLOADS, such as "random" or "sorted".
+
+    Returns:
+        list: The keys.
+
+    """
+
+    return workloads.make_workload(order, size, seed).tolist()
+
+# Compares the iterative and recursive AVL insertion
+def benchmark_avl_insert(size, seed, repeat):
+
+    """
+
+    Function to compare the iterative AVL insert with the recursive insertion.
+
+    Parameters:
+        size (int): The number of keys to insert.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per insertion path and key order.
+
+    """
+
+    def build(method_name, keys): # Builds a tree with the given insertion method
+        tree = AVL_Tree()
+        insert = getattr(tree, method_name)
+        for key in keys:
+            insert(key)
+        return tree
+
+    rows = []
+    for order in ("random", "sorted"):
+        keys = make_keys(size, seed, order)
+        results = {}
+        for name, method_name in (("recursive", "insert_using_recursion"), ("iterative", "insert")):
+            seconds, tree = best_time(lambda: build(method_name, keys), repeat)
+            results[name] = tree.statistics.data
+            stats = tree.statistics.calculate_statistics()
+            rows.append({
+                "benchmark": "avl_insert",
+                "variant": name,
+                "order": order,
+                "size": size,
+                "ops/sec": size / seconds,
+                "avg steps": stats["steps"]["avg"],
+                "avg rotations": stats["rotations"]["avg"],
+            })
+        # Both insertion paths must record exactly the same statistics
+        assert results["recursive"]["steps"] == results["iterative"]["steps"]
+        assert results["recursive"]["rotations"] == results["iterative"]["rotations"]
+    return rows
+
+# Measures the Red-Black Tree hot paths
+def benchmark_rb_insert(size, seed, repeat):
+
+    """
+
+    Function to measure the insert throughput of the Red-Black Tree and the cost of its height and leaf counts.
+
+    Parameters:
+        size (int): The number of keys to insert.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per operation.
+
+    """
+
+    keys = make_keys(size, seed)
+
+    def build(): # Builds a tree with single inserts
+        tree = RB_Tree()
+        for key in keys:
+            tree.insert(key)
+        return tree
+
+    seconds, tree = best_time(build, repeat)
+    stats = tree.statistics.calculate_statistics()
+    rows = [{
+        "benchmark": "rb_insert",
+        "operation": "insert",
+        "size": size,
+        "ops/sec": size / seconds,
+        "avg steps": stats["steps"]["avg"],
+        "avg rotations": stats["rotations"]["avg"],
+        "result": None,
+    }]
+
+    metrics = { # Whole-tree metrics, iterative and recursive, then all of them in one pass and the kept counter
+        "get_height": tree.get_height,
+        "get_height_recursive": lambda: tree.get_height_recursive(tree.root),
+        "get_leaves": tree.get_leaves,
+        "get_leaves_recursive": lambda: tree.get_leaves_recursive(tree.root),
+        "metrics": lambda: tree.metrics()["leaves"],
+        "leaves": lambda: tree.leaves,
+    }
+    for operation, function in metrics.items():
+        seconds, value = best_time(function, repeat)
+        rows.append({
+            "benchmark": "rb_insert",
+            "operation": operation,
+            "size": size,
+            "ops/sec": 1 / seconds,
+            "avg steps": None,
+            "avg rotations": None,
+            "result": value,
+        })
+    return rows
+
+# Measures the cost of the statistics in the insert hot paths
+def benchmark_instrumentation(size, seed, repeat):
+
+    """
+
+    Function to measure the insert throughput of each structure with each statistics mode.
+
+    Parameters:
+        size (int): The number of keys to insert.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per structure and mode.
+
+    """
+
+    keys = make_keys(size, seed)
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+    structures = {
+        "AVL_Tree": lambda statistics: AVL_Tree(statistics=statistics),
+        "RB_Tree": lambda statistics: RB_Tree(statistics=statistics),
+        "Skip_List": lambda statistics: Skip_List(max_level, 0.5, statistics=statistics),
+    }
+    modes = {
+        "full": lambda: ds_stats.Statistics(),
+        "streaming": lambda: ds_stats.Statistics(streaming=True),
+        "sampled 1/100": lambda: ds_stats.Sampled_Statistics(100),
+        "off": lambda: ds_stats.Null_Statistics(),
+    }
+
+    rows = []
+    for name, create in structures.items():
+        baseline = None # Throughput with every sample recorded
+        for mode, make_statistics in modes.items():
+            def build(): # Builds the structure with single inserts
+                structure = create(make_statistics())
+                for key in keys:
+                    structure.insert(key)
+                return structure
+            seconds, _ = best_time(build, repeat)
+            baseline = baseline or seconds
+            rows.append({
+                "benchmark": "instrumentation",
+                "structure": name,
+                "mode": mode,
+                "size": size,
+                "ops/sec": size / seconds,
+                "time vs full": seconds / baseline,
+            })
+    return rows
+
+# Compares single inserts with batched inserts into a populated structure
+def benchmark_insert_many(size, seed, repeat):
+
+    """
+
+    Function to compare single inserts, insert_many with the search finger and insert_many with a rebuild.
+
+    Each structure is bulk loaded with size keys and then a batch of size // 10 random keys is applied.
+
+    Parameters:
+        size (int): The number of keys already in the structure.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per structure and method.
+
+    """
+
+    keys = make_keys(size, seed) # Keys already in the structure
+    batch = (workloads.make_workload("random", max(size // 10, 1), seed + 1) * 10 + 5).tolist() # New keys between the old ones
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+    structures = {
+        "AVL_Tree": lambda: AVL_Tree.from_iterable(keys),
+        "RB_Tree": lambda: RB_Tree.from_iterable(keys),
+        "Skip_List": lambda: Skip_List.from_iterable(keys, max_level, 0.5),
+    }
+
+    def single(structure): # Inserts the batch one key at a time
+        for key in batch:
+            structure.insert(key)
+
+    methods = {
+        "insert": single,
+        "insert_many": lambda structure: structure.insert_many(batch, rebuild=False),
+        "rebuild": lambda structure: structure.insert_many(batch, rebuild=True),
+    }
+
+    rows = []
+    for name, create in structures.items():
+        for method, apply in methods.items():
+            best = float("inf") # Best time so far, without the time to build the structure
+            for _ in range(repeat):
+                structure = create()
+                start = time.perf_counter() # Start the timer
+                apply(structure)
+                best = min(best, time.perf_counter() - start)
+            steps = structure.statistics.data["steps"]
+            rows.append({
+                "benchmark": "insert_many",
+                "structure": name,
+                "method": method,
+                "batch": len(batch),
+                "keys/sec": len(batch) / best,
+                "avg steps": sum(steps) / len(steps) if len(steps) else None,
+            })
+    return rows
+
+# Compares the trees with and without append mode
+def benchmark_append(size, seed, repeat):
+
+    """
+
+    Function to compare the insert throughput of the trees with and without append mode on sorted and random keys.
+
+    Parameters:
+        size (int): The number of keys to insert.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per tree, key order and mode.
+
+    """
+
+    structures = {
+        "AVL_Tree": AVL_Tree,
+        "RB_Tree": RB_Tree,
+    }
+
+    rows = []
+    for order in ("sorted", "random"):
+        keys = make_keys(size, seed, order)
+        for name, tree_class in structures.items():
+            for mode, append_mode in (("insert", False), ("append", True)):
+                def build(): # Builds a tree with single inserts
+                    tree = tree_class(append_mode=append_mode)
+                    for key in keys:
+                        tree.insert(key)
+                    return tree
+                seconds, tree = best_time(build, repeat)
+                stats = tree.statistics.calculate_statistics()
+                rows.append({
+                    "benchmark": "append",
+                    "structure": name,
+                    "order": order,
+                    "mode": mode,
+                    "size": size,
+                    "ops/sec": size / seconds,
+                    "avg steps": stats["steps"]["avg"],
+                    "avg rotations": stats["rotations"]["avg"],
+                })
+    return rows
+
+# Compares lookups in the live trees with lookups in frozen copies
+def benchmark_freeze(size, seed, repeat):
+
+    """
+
+    Function to compare one search per key in the live trees with vectorised lookups in frozen copies.
+
+    Parameters:
+        size (int): The number of keys in the tree and the number of queries.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per tree and lookup method.
+
+    """
+
+    keys = make_keys(size, seed) # Keys 1..size in random order
+    queries = workloads.make_workload("random", size, seed + 1, start=size // 2) # Half of the queries are hits
+    query_list = queries.tolist()
+    structures = {
+        "AVL_Tree": AVL_Tree.from_iterable(keys, order_statistics=True, statistics=ds_stats.Null_Statistics()),
+        "RB_Tree": RB_Tree.from_iterable(keys, order_statistics=True, statistics=ds_stats.Null_Statistics()),
+    }
+
+    rows = []
+    for name, tree in structures.items():
+        frozen = tree.freeze()
+        methods = {
+            "live contains": lambda: [key in tree for key in query_list],
+            "frozen contains": lambda: frozen.contains(queries),
+            "live rank": lambda: [tree.rank(key) for key in query_list],
+            "frozen rank": lambda: frozen.rank(queries),
+        }
+        seconds, _ = best_time(tree.freeze, repeat)
+        rows.append({"benchmark": "freeze", "structure": name, "method": "freeze", "size": size, "queries/sec": None, "seconds": seconds})
+        for method, function in methods.items():
+            seconds, _ = best_time(function, repeat)
+            rows.append({"benchmark": "freeze", "structure": name, "method": method, "size": size, "queries/sec": size / seconds, "seconds": seconds})
+    return rows
+
+# Compares one search per key with the batch lookups
+def benchmark_batch_lookup(size, seed, repeat):
+
+    """
+
+    Function to compare one search per query with contains_many on each structure.
+
+    Parameters:
+        size (int): The number of keys in the structure and the number of queries.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per structure and lookup method.
+
+    """
+
+    keys = make_keys(size, seed) # Keys 1..size in random order
+    queries = workloads.make_workload("random", size, seed + 1, start=size // 2) # Half of the queries are hits
+    query_list = queries.tolist()
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+    structures = {
+        "AVL_Tree": AVL_Tree.from_iterable(keys),
+        "RB_Tree": RB_Tree.from_iterable(keys),
+        "Skip_List": Skip_List.from_iterable(keys, max_level, 0.5),
+    }
+
+    rows = []
+    for name, structure in structures.items():
+        methods = {
+            "search per key": lambda: [key in structure for key in query_list],
+            "contains_many": lambda: structure.contains_many(queries),
+        }
+        for method, function in methods.items():
+            structure.statistics.reset() # Only keep the steps of this method
+            seconds, _ = best_time(function, repeat)
+            stats = structure.statistics.calculate_statistics()
+            rows.append({
+                "benchmark": "batch_lookup",
+                "structure": name,
+                "method": method,
+                "size": size,
+                "queries/sec": size / seconds,
+                "avg search steps": stats["search_steps"]["avg"],
+            })
+    return rows
+
+# Compares Skip List searches from the head and from the finger
+def benchmark_finger(size, seed, repeat):
+
+    """
+
+    Function to compare the Skip List with and without finger search on time-ordered and random keys.
+
+    Parameters:
+        size (int): The number of keys to insert and then search for.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per key order and mode.
+
+    """
+
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+
+    rows = []
+    for order in ("nearly_sorted", "random"):
+        keys = make_keys(size, seed, order)
+        for mode, finger in (("head", False), ("finger", True)):
+            def build(): # Inserts the keys and then searches for them in the same order
+                skip_list = Skip_List(max_level, 0.5, finger=finger)
+                for key in keys:
+                    skip_list.insert(key)
+                for key in keys:
+                    skip_list.search(key)
+                return skip_list
+            seconds, skip_list = best_time(build, repeat)
+            stats = skip_list.statistics.calculate_statistics()
+            rows.append({
+                "benchmark": "finger",
+                "order": order,
+                "mode": mode,
+                "size": size,
+                "ops/sec": 2 * size / seconds,
+                "avg steps": stats["steps"]["avg"],
+                "avg search steps": stats["search_steps"]["avg"],
+                "avg saved steps": stats["saved_steps"]["avg"],
+            })
+    return rows
+
+# Compares Skip List level generators, probabilities and a fixed or growing maximum level
+def benchmark_levels(size, seed, repeat):
+
+    """
+
+    Function to measure how the Skip List draws its levels and how the probability and the maximum level affect it.
+
+    The generator rows time the coin-flipping loop against the batched random_level. The
+    probability rows insert and then search for the keys with a list sized for them, showing
+    the trade-off between the steps (fewer with a higher probability) and the promotions (more
+    with a higher probability). The max_level rows insert the keys into a list sized for 1/64
+    of them, with a fixed maximum level and with grow=True.
+
+    Parameters:
+        size (int): The number of keys to insert and then search for.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per generator, probability and sizing.
+
+    """
+
+    keys = make_keys(size, seed)
+    probabilities = (0.5, 1 / math.e, 0.25, 0.125) # Probabilities of the lists that are built
+    # The generators are also timed at 0.75, where the loop flips four coins per node on
+    # average, to show how its cost grows with the probability. A list is not built at 0.75,
+    # because 1 / 0.75 rounds to 1 node per node on the level above, which sizes it like 1/2.
+    generator_probabilities = (0.5, 1 / math.e, 0.25, 0.75)
+    rows = []
+
+    for probability in generator_probabilities:
+        skip_list = Skip_List(math.ceil(math.log2(max(size, 2))), probability)
+        for generator in ("loop", "batch"):
+            draw = skip_list.random_level_loop if generator == "loop" else skip_list.random_level
+            def draw_all(): # Draws one level per key
+                total = 0
+                for _ in range(size):
+                    total += draw()[0]
+                return total
+            random.seed(seed)
+            seconds, total = best_time(draw_all, repeat)
+            rows.append({
+                "benchmark": "levels",
+                "test": "generator",
+                "probability": probability,
+                "mode": generator,
+                "size": size,
+                "ops/sec": size / seconds,
+                "avg steps": None,
+                "avg search steps": None,
+                "avg promotions": total / size,
+                "max level": skip_list.max_level,
+                "levels": None,
+            })
+
+    def build(probability, max_level, grow): # Inserts the keys and then searches for them
+        skip_list = Skip_List(max_level, probability, grow=grow)
+        for key in keys:
+            skip_list.insert(key)
+        for key in keys:
+            skip_list.search(key)
+        return skip_list
+
+    def measure(test, probability, mode, max_level, grow):
+        random.seed(seed)
+        seconds, skip_list = best_time(lambda: build(probability, max_level, grow), repeat)
+        stats = skip_list.statistics.calculate_statistics()
+        rows.append({
+            "benchmark": "levels",
+            "test": test,
+            "probability": probability,
+            "mode": mode,
+            "size": size,
+            "ops/sec": 2 * size / seconds,
+            "avg steps": stats["steps"]["avg"],
+            "avg search steps": stats["search_steps"]["avg"],
+            "avg promotions": stats["promotions"]["avg"],
+            "max level": skip_list.max_level,
+            "levels": skip_list.level,
+        })
+
+    for probability in probabilities:
+        base = max(round(1 / probability), 2) # Same sizing as Skip_List.build_new
+        measure("probability", probability, "sized", max(math.ceil(math.log(max(size, 2), base)), 1), False)
+
+    planned = math.ceil(math.log2(max(size // 64, 2))) # Sized for 1/64 of the keys
+    measure("max_level", 0.5, "fixed", planned, False)
+    measure("max_level", 0.5, "grow", planned, True)
+    return rows
+
+# Compares replaying inserts with loading a snapshot
+def benchmark_snapshot(size, seed, repeat):
+
+    """
+
+    Function to compare rebuilding each structure by replaying inserts with saving and loading a snapshot.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per structure and operation.
+
+    """
+
+    keys = make_keys(size, seed)
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+    structures = {
+        "AVL_Tree": (AVL_Tree, lambda: AVL_Tree()),
+        "RB_Tree": (RB_Tree, lambda: RB_Tree()),
+        "Skip_List": (Skip_List, lambda: Skip_List(max_level, 0.5)),
+    }
+
+    def replay(create): # Rebuilds a structure with single inserts, like main.py
+        structure = create()
+        for key in keys:
+            structure.insert(key)
+        return structure
+
+    def query(view): # Looks up every key in a read-only view
+        for key in keys:
+            key in view
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (structure_class, create) in structures.items():
+            path = os.path.join(directory, name + ".snapshot")
+            operations = {
+                "replay inserts": lambda: replay(create),
+                "save": lambda: structure.save(path),
+                "load": lambda: structure_class.load(path),
+                "view lookups": lambda: query(snapshot.Snapshot_View(path)),
+            }
+            structure = replay(create)
+            for operation, function in operations.items():
+                seconds, _ = best_time(function, repeat)
+                rows.append({
+                    "benchmark": "snapshot",
+                    "structure": name,
+                    "operation": operation,
+                    "size": size,
+                    "seconds": seconds,
+                    "file bytes": os.path.getsize(path) if operation != "replay inserts" else None,
+                })
+    return rows
+
+# Measures the memory used per key
+def benchmark_memory(size, seed, repeat):
+
+    """
+
+    Function to measure the bytes per key of each structure with the object and the compact node layout.
+
+    The structures are bulk loaded so that only the nodes (and not the per-insert statistics) are measured.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): The seed of the random number generator (unused, the keys are 1..size).
+        repeat (int): The number of runs per measurement (unused, memory does not vary between runs).
+
+    Returns:
+        list: One row of results per structure and layout.
+
+    """
+
+    keys = make_keys(size, seed, "sorted")
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+    builders = {
+        "AVL_Tree": lambda compact: AVL_Tree.from_sorted(keys, compact=compact),
+        "RB_Tree": lambda compact: RB_Tree.from_sorted(keys, compact=compact),
+        "Skip_List": lambda compact: Skip_List.from_sorted(keys, max_level, 0.5, compact=compact),
+    }
+
+    rows = []
+    for name, build in builders.items():
+        for layout, compact in (("object", False), ("compact", True)):
+            tracemalloc.start() # Only count the memory allocated while building
+            structure = build(compact)
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            rows.append({
+                "benchmark": "memory",
+                "structure": name,
+                "layout": layout,
+                "size": size,
+                "bytes/key": current / size,
+            })
+            del structure
+    return rows
+
+# Measures the ordered map mode against a structure with a separate dictionary of values
+def benchmark_map(size, seed, repeat):
+
+    """
+
+    Function to measure each structure used as an ordered map, with the values stored in the
+    nodes, against the same structure holding the keys with the values in a separate dict.
+
+    Every key is stored with a value and then looked up once; the memory is that of the stores.
+    Before the timings, each structure is filled with repeated keys under every duplicate
+    policy to check that iterating in reverse gives the keys in the opposite order, and that
+    a value set with [] is the one read back with [] even when the key has several copies.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per structure and storage.
+
+    Raises:
+        RuntimeError: If reversed iteration does not mirror forward iteration, or [] reads a
+        different copy of a key than the one it set.
+
+    """
+
+    keys = make_keys(size, seed)
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+    classes = {
+        "AVL_Tree": lambda duplicates: AVL_Tree(duplicates=duplicates),
+        "RB_Tree": lambda duplicates: RB_Tree(duplicates=duplicates),
+        "Skip_List": lambda duplicates: Skip_List(max_level, 0.5, duplicates=duplicates),
+    }
+    makers = {name: (lambda create=create: create("replace")) for name, create in classes.items()}
+
+    repeated = keys[:1000] + keys[:500] + keys[:100] # Some keys once, some twice and some three times
+    for name, create in classes.items():
+        for duplicates in POLICIES:
+            structure = create(duplicates)
+            for key in repeated:
+                structure.insert(key)
+            if list(reversed(structure)) != list(structure)[::-1]:
+                raise RuntimeError(f"reversed iteration of {name} with duplicates={duplicates} is not the forward order reversed")
+            for key in keys[:100]: # Keys with three copies under ALLOW
+                structure[key] = -key
+                if structure[key] != -key:
+                    raise RuntimeError(f"{name} with duplicates={duplicates} reads a different copy of {key} than the one it set")
+
+    rows = []
+    for name, make in makers.items():
+        def store_in_nodes(): # Values in the nodes
+            structure = make()
+            for key in keys:
+                structure[key] = key
+            return structure
+
+        def store_in_dict(): # Keys in the structure, values in a dict
+            structure = make()
+            values = {}
+            for key in keys:
+                structure.insert(key)
+                values[key] = key
+            return structure, values
+
+        def lookup_in_nodes(structure):
+            for key in keys:
+                structure[key]
+
+        def lookup_in_dict(pair):
+            structure, values = pair
+            for key in keys:
+                if key in structure: # The structure answers membership, the dict holds the value
+                    values[key]
+
+        for storage, store, lookup in (("nodes", store_in_nodes, lookup_in_nodes), ("dict", store_in_dict, lookup_in_dict)):
+            store_seconds, stored = best_time(store, repeat)
+            lookup_seconds, _ = best_time(lambda: lookup(stored), repeat)
+            tracemalloc.start() # Only count the memory of one more store
+            kept = store()
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del kept
+            rows.append({
+                "benchmark": "map",
+                "structure": name,
+                "storage": storage,
+                "size": size,
+                "store ops/sec": size / store_seconds,
+                "lookup ops/sec": size / lookup_seconds,
+                "bytes/key": current / size,
+            })
+    return rows
+
+# Measures the Knuth shuffle
+def benchmark_shuffle(size, seed, repeat):
+
+    """
+
+    Function to measure the Knuth shuffle on a NumPy array and on a Python list.
+
+    Parameters:
+        size (int): The number of keys to shuffle.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per kind of array.
+
+    """
+
+    rows = []
+    for name, make_array in (("numpy", lambda: np.arange(size)), ("list", lambda: list(range(size)))):
+        seconds, _ = best_time(lambda: knuth_shuffle(make_array(), seed), repeat)
+        rows.append({
+            "benchmark": "shuffle",
+            "array": name,
+            "size": size,
+            "keys/sec": size / seconds,
+        })
+    return rows
+
+# Measures the trees shared between threads
+def benchmark_concurrency(size, seed, repeat):
+
+    """
+
+    Function to run mixed readers and writers on a shared tree with 1, 4 and 16 threads.
+
+    Every thread does 90% lookups and range scans and 10% inserts and deletes. Readers check
+    that the tree is valid while they hold the read lock, and the tree is checked again at
+    the end, so the benchmark doubles as a stress test of the locking.
+
+    Parameters:
+        size (int): The number of keys in the tree before the threads start.
+        seed (int): The seed of the random number generator.
+        repeat (int): Unused; every thread count runs once, for a fixed number of operations.
+
+    Returns:
+        list: One row of results per tree and number of threads.
+
+    Raises:
+        RuntimeError: If a thread finds the tree in an invalid state.
+
+    """
+
+    operations = max(size // 10, 1000) # Operations shared out between the threads
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)() # Free-threaded builds can run readers in parallel
+
+    rows = []
+    for name, tree_class in (("AVL_Tree", AVL_Tree), ("RB_Tree", RB_Tree)):
+        for threads in (1, 4, 16):
+            tree = Concurrent_Tree(tree_class.from_iterable(make_keys(size, seed)))
+            errors = [] # Exceptions raised in the threads
+
+            def work(thread_seed, count):
+                random = np.random.default_rng(thread_seed)
+                choices = random.random(count) # Which operation to run
+                keys = random.integers(1, 2 * size, count).tolist() # Half of the keys are in the tree
+                try:
+                    for choice, key in zip(choices, keys):
+                        if choice < 0.8: # Lookup
+                            key in tree
+                        elif choice < 0.9: # Range scan, checked under the same read lock
+                            with tree.reading() as shared:
+                                found = list(shared.range(key, key + 100))
+                                if found != sorted(found):
+                                    raise RuntimeError("range scan returned keys out of order")
+                                if choice < 0.801: # Now and then, check the whole tree
+                                    shared.check_invariants()
+                        elif choice < 0.95: # Insert
+                            tree.insert(key)
+                        else: # Delete
+                            tree.delete(key)
+                except Exception as error:
+                    errors.append(error)
+
+            workers = [threading.Thread(target=work, args=(seed + index, operations // threads)) for index in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            seconds = time.perf_counter() - start
+
+            if errors:
+                raise errors[0]
+            with tree.reading() as shared:
+                shared.check_invariants()
+            rows.append({
+                "benchmark": "concurrency",
+                "structure": name,
+                "threads": threads,
+                "size": size,
+                "ops/sec": (operations // threads) * threads / seconds,
+                "gil": gil,
+            })
+    return rows
+
+# Measures the cost of the profiler
+def benchmark_profiling(size, seed, repeat):
+
+    """
+
+    Function to measure the insert throughput of each structure with no profiler, after a
+    profiler was attached and detached again, and with a profiler attached.
+
+    Parameters:
+        size (int): The number of keys to insert.
+        seed (int): The seed of the random number generator.
+        repeat (int): The number of runs per measurement.
+
+    Returns:
+        list: One row of results per structure and mode, with the overhead against no profiler.
+
+    """
+
+    keys = make_keys(size, seed) # Keys 1..size in random order
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+    makers = {
+        "AVL_Tree": lambda: AVL_Tree(),
+        "RB_Tree": lambda: RB_Tree(),
+        "Skip_List": lambda: Skip_List(max_level, 0.5),
+    }
+
+    rows = []
+    for name, make in makers.items():
+        def run(mode):
+            structure = make()
+            profiler = Profiler()
+            if mode != "off":
+                profiler.attach(structure)
+            if mode == "detached":
+                profiler.detach()
+            for key in keys:
+                structure.insert(key)
+            profiler.detach() # Does nothing unless the profiler is still attached
+            return profiler
+
+        modes = ("off", "detached", "attached")
+        best = dict.fromkeys(modes, float("inf")) # Best time of each mode
+        profilers = {}
+        for _ in range(repeat): # The modes take turns, so that drift in the machine's speed hits them all alike
+            for mode in modes:
+                seconds, profilers[mode] = best_time(lambda: run(mode), 1)
+                best[mode] = min(best[mode], seconds)
+
+        baseline = best["off"]
+        for mode in modes:
+            seconds = best[mode]
+            phases = profilers[mode].report()["phases"]
+            rows.append({
+                "benchmark": "profiling",
+                "structure": name,
+                "mode": mode,
+                "size": size,
+                "inserts/sec": size / seconds,
+                "overhead %": 100 * (seconds / baseline - 1),
+                "insert self %": 100 * phases["insert"]["self_ns"] / phases["insert"]["total_ns"] if phases else None,
+            })
+    return rows
+
+# Compares the lazily locked Skip List with a Skip List behind one readers-writer lock
+def benchmark_concurrent_skip_list(size, seed, repeat):
+
+    """
+
+    Function to run parallel inserts, deletes and lookups on the concurrent Skip List and on a
+    Skip List behind a readers-writer lock, with 1, 4 and 16 threads.
+
+    Every thread does 50% inserts, 10% deletes and 40% lookups on keys drawn from twice the
+    size. The GIL column tells whether the interpreter is a free-threaded build, the only
+    kind on which the per-node locks can let threads run at the same time.
+
+    Parameters:
+        size (int): The number of operations shared out between the threads.
+        seed (int): The seed of the random number generator.
+        repeat (int): Unused; every thread count runs once.
+
+    Returns:
+        list: One row of results per structure and number of threads.
+
+    Raises:
+        RuntimeError: If the list is invalid after the threads finish.
+
+    """
+
+    max_level = math.ceil(math.log2(max(size, 2))) # Same sizing as main.py
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)() # False on a free-threaded build with the GIL off
+    structures = {
+        "Concurrent_Skip_List": lambda: Concurrent_Skip_List(max_level, 0.5),
+        "Skip_List + RW_Lock": lambda: Concurrent_Tree(Skip_List(max_level, 0.5)),
+    }
+
+    rows = []
+    for name, make in structures.items():
+        for threads in (1, 4, 16):
+            structure = make()
+            errors = [] # Exceptions raised in the threads
+
+            def work(thread_seed, count):
+                random = np.random.default_rng(thread_seed)
+                choices = random.random(count).tolist() # Which operation to run
+                keys = random.integers(1, 2 * size, count).tolist()
+                try:
+                    for choice, key in zip(choices, keys):
+                        if choice < 0.5: # Insert
+                            structure.insert(key)
+                        elif choice < 0.6: # Delete
+                            structure.delete(key)
+                        else: # Lookup
+                            key in structure
+                except Exception as error:
+                    errors.append(error)
+
+            workers = [threading.Thread(target=work, args=(seed + index, size // threads)) for index in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            seconds = time.perf_counter() - start
+
+            if errors:
+                raise errors[0]
+            if isinstance(structure, Concurrent_Skip_List):
+                structure.check_invariants()
+                stats = structure.statistics.calculate_statistics()
+            else:
+                stats = structure.tree.statistics.calculate_statistics()
+            rows.append({
+                "benchmark": "concurrent_skip_list",
+                "structure": name,
+                "threads": threads,
+                "size": size,
+                "ops/sec": (size // threads) * threads / seconds,
+                "avg promotions": stats["promotions"]["avg"],
+                "gil": gil,
+            })
+    return rows
+
+# Prints the rows of results
+def print_results(rows):
+
+    """
+
+    Function to print the rows of results as a table.
+
+    Parameters:
+        rows (list): The rows of results.
+
+    """
+
+    if not rows: # Nothing to print
+        return
+    columns = list(rows[0].keys()) # Columns of the table
+    cells = [[format_cell(row.get(column)) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+
+def format_cell(value):
+
+    """
+
+    Function to format a value for printing.
+
+    Parameters:
+        value (object): The value to be formatted.
+
+    Returns:
+        str: The formatted value.
+
+    """
+
+    if isinstance(value, float): # Round floating-point numbers
+        return f"{value:,.2f}"
+    return str(value)
+
+# Available benchmarks
+BENCHMARKS = {
+    "append": benchmark_append,
+    "avl_insert": benchmark_avl_insert,
+    "batch_lookup": benchmark_batch_lookup,
+    "concurrent_skip_list": benchmark_concurrent_skip_list,
+    "concurrency": benchmark_concurrency,
+    "finger": benchmark_finger,
+    "freeze": benchmark_freeze,
+    "insert_many": benchmark_insert_many,
+    "instrumentation": benchmark_instrumentation,
+    "map": benchmark_map,
+    "levels": benchmark_levels,
+    "memory": benchmark_memory,
+    "profiling": benchmark_profiling,
+    "rb_insert": benchmark_rb_insert,
+    "shuffle": benchmark_shuffle,
+    "snapshot": benchmark_snapshot,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the data structure benchmarks.")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run: " + ", ".join(BENCHMARKS) + " (default: all)")
+    parser.add_argument("--size", type=int, default=100000, help="Number of keys")
+    parser.add_argument("--seed", type=int, default=2024, help="Seed of the random number generator")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per measurement")
+    arguments = parser.parse_args()
+    for name in arguments.names: # Check the names of the benchmarks
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+
+    for name in arguments.names or list(BENCHMARKS):
+        print_results(BENCHMARKS[name](arguments.size, arguments.seed, arguments.repeat))
+        print()
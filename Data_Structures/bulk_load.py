@@ -0,0 +1,107 @@
+"""
+
+    Contains helper functions shared by the bulk-load constructors of the data structures.
+
+"""
+
+import numpy as np
+from duplicates import ALLOW
+
+# A batch at least this large relative to the structure is merged and rebuilt instead of inserted key by key
+REBUILD_FRACTION = 1.0
+
+# Converts an iterable of keys into a sorted list of keys
+def sorted_keys(iterable, presorted=False):
+
+    """
+
+    Function to turn an iterable of keys into a sorted Python list.
+
+    NumPy arrays are sorted with np.sort and converted with tolist(), which is much faster
+    than sorting a list of NumPy scalars.
+
+    Parameters:
+        iterable (iterable): The keys to be sorted (list, tuple, generator or NumPy array).
+        presorted (bool): If True, the keys are assumed to already be in ascending order.
+
+    Returns:
+        list: The keys in ascending order.
+
+    Raises:
+        ValueError: If presorted is True but the keys are not in ascending order.
+
+    """
+
+    if isinstance(iterable, np.ndarray): # If the keys are stored in a NumPy array
+        array = iterable.ravel() # Flatten the array
+        if not presorted: # If the array still has to be sorted
+            array = np.sort(array, kind="stable") # Sort the array once
+        elif array.size > 1 and np.any(array[1:] < array[:-1]): # If the array claims to be sorted but is not
+            raise ValueError("from_sorted expects keys in ascending order")
+        return array.tolist() # Convert the NumPy scalars to Python scalars
+
+    keys = list(iterable) # Materialise the iterable
+    if not presorted: # If the keys still have to be sorted
+        keys.sort() # Sort the keys once
+    else: # If the keys are already sorted, check that they are
+        for i in range(1, len(keys)):
+            if keys[i] < keys[i - 1]:
+                raise ValueError("from_sorted expects keys in ascending order")
+    return keys
+
+# Decides whether a batch is applied by rebuilding the structure
+def should_rebuild(batch_size, size, rebuild=None):
+
+    """
+
+    Function to decide whether insert_many should merge a batch and rebuild the structure.
+
+    Parameters:
+        batch_size (int): The number of keys in the batch.
+        size (int): The number of keys already in the structure.
+        rebuild (bool): True or False to force a choice, or None to decide from the sizes.
+
+    Returns:
+        bool: True if the structure should be rebuilt.
+
+    """
+
+    if rebuild is not None: # The caller has already decided
+        return rebuild
+    return batch_size > 0 and batch_size >= REBUILD_FRACTION * size
+
+# Merges the keys and values of a structure with a sorted batch of keys
+def merge_items(structure, batch):
+
+    """
+
+    Function to merge the keys and values of a structure with a batch of new keys in O(n + m).
+
+    Both sequences are already sorted, so Python's stable sort merges them in one pass and
+    keeps a key of the structure before the same key from the batch. The values of the
+    structure are carried over to the rebuilt structure. Unless the structure allows
+    duplicates, the keys of the batch that are already stored are left out: the batch has no
+    values, so they would only replace the stored values with None.
+
+    Parameters:
+        structure (object): The structure, whose items() are in ascending order of key.
+        batch (list): The new keys in ascending order, without values.
+
+    Returns:
+        list: All the keys in ascending order.
+        list: The value of each key (None for the keys of the batch), or None if no key has a value.
+
+    """
+
+    items = list(structure.items())
+    keys = [key for key, _ in items]
+    values = [value for _, value in items]
+    if all(value is None for value in values): # Only keys are stored
+        return sorted(keys + batch), None
+    if structure.duplicates != ALLOW: # Keep the stored values of the keys of the batch
+        stored = set(keys)
+        batch = [key for key in batch if key not in stored]
+    keys += batch
+    order = sorted(range(len(keys)), key=keys.__getitem__) # Positions of the keys in merged order
+    values += [None] * len(batch)
+    return [keys[index] for index in order], [values[index] for index in order]
@@ -0,0 +1,354 @@
+# Implementation of a concurrent Skip List with lazy per-node locking (Herlihy and Shavit)
+import random
+import threading
+import time
+import ds_statistics as ds_stats
+from concurrent_tree import Synchronised_Statistics
+
+class Concurrent_Skip_Node:
+    # Node for the concurrent Skip List
+    __slots__ = ("key", "level", "forward", "lock", "marked", "fully_linked")
+
+    def __init__(self, key, level): # Constructor
+        self.key = key # Key of the node
+        self.level = level # Level of the node
+        self.forward = [None] * (level + 1) # Forward pointers for the node
+        self.lock = threading.Lock() # Held while the node's forward pointers are changed
+        self.marked = False # Set when the node is being deleted, before it is unlinked
+        self.fully_linked = False # Set once the node is linked on every one of its levels
+
+class Concurrent_Skip_List:
+    # Skip List that several threads can insert into, delete from and search at the same time
+    def __init__(self, max_level, probability, statistics=None):
+        self.max_level = max_level # Maximum level of the Skip List
+        self.probability = probability # Probability of a node having a higher level
+        self.level = 0 # Highest level any node has reached (only recorded in the statistics)
+        self.count = 0 # Number of keys in the Skip List
+        self.count_lock = threading.Lock() # Guards count and level
+        self.head = Concurrent_Skip_Node(None, max_level) # Head node of the Skip List
+        self.head.fully_linked = True
+        statistics = ds_stats.Statistics() if statistics is None else statistics
+        self.statistics = Synchronised_Statistics(statistics) # Keeps track of the statistics of every thread
+
+    # Search
+    def find(self, key):
+
+        """
+
+        Function to find the nodes around a key on every level, without taking any locks.
+
+        Marked nodes are not skipped: a node that is being deleted is still a valid place to
+        pass through, and the writers check that their neighbours are unmarked once they have
+        locked them.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            tuple: The node before the key on each level, the node after it on each level,
+            the highest level on which a node holds the key (or -1) and the number of steps.
+
+        """
+
+        steps = 1 # Initialise the number of steps
+        found = -1 # Highest level on which the key was found
+        preds = [None] * (self.max_level + 1) # Last node before the key on each level
+        succs = [None] * (self.max_level + 1) # First node not before the key on each level
+        current = self.head
+
+        # Start from the highest level and move downwards; empty levels cost one comparison
+        for i in range(self.max_level, -1, -1):
+            following = current.forward[i]
+            # Move forward while the next node's key is less than the key
+            while following is not None and following.key < key:
+                current = following
+                following = current.forward[i]
+                steps += 1
+            if found == -1 and following is not None and following.key == key:
+                found = i
+            preds[i] = current # Remember the nodes at this level
+            succs[i] = following
+        return preds, succs, found, steps
+
+    def search(self, key):
+
+        """
+
+        Function to search for a key in the Skip List without taking any locks.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            Concurrent_Skip_Node: The node holding the key, or None if the key is not in the list.
+
+        """
+
+        _, succs, found, steps = self.find(key)
+        self.statistics.add_search_step(steps) # Add the number of steps
+        if found == -1:
+            return None
+        node = succs[found]
+        if node.fully_linked and not node.marked: # Half-inserted and half-deleted nodes are not in the list
+            return node
+        return None
+
+    def __contains__(self, key):
+
+        """
+
+        Function to check whether a key is in the Skip List.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            bool: True if the key is in the list.
+
+        """
+
+        return self.search(key) is not None
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of keys in the Skip List.
+
+        Returns:
+            int: The number of keys.
+
+        """
+
+        return self.count
+
+    # Insertion
+    def insert(self, key):
+
+        """
+
+        Function to insert a key into the Skip List.
+
+        The nodes before the key are found without locks, then locked from the bottom level up
+        and checked: if one of them was deleted, or a node was linked in after it, the search
+        is retried. The new node is linked bottom-up and only counts as inserted once it is
+        fully linked, so readers never need a lock.
+
+        Parameters:
+            key (int): The key to be inserted.
+
+        Returns:
+            bool: True if the key was inserted, False if it was already in the list.
+
+        """
+
+        new_level, promotions = self.random_level() # Determine the level for the new node
+        total_steps = 0 # Steps of every attempt
+
+        while True:
+            preds, succs, found, steps = self.find(key)
+            total_steps += steps
+
+            if found != -1: # A node holds the key already
+                node = succs[found]
+                if not node.marked: # It is not being deleted
+                    while not node.fully_linked: # Wait for its insert to finish
+                        time.sleep(0)
+                    self.statistics.add_step(total_steps)
+                    self.statistics.add_promotion(0)
+                    return False
+                continue # It is being deleted: retry once it is gone
+
+            locked = [] # Nodes locked by this attempt
+            try:
+                valid = True
+                for i in range(new_level + 1):
+                    pred = preds[i]
+                    succ = succs[i]
+                    if not locked or locked[-1] is not pred: # The same node can be before the key on several levels
+                        pred.lock.acquire()
+                        locked.append(pred)
+                    valid = not pred.marked and (succ is None or not succ.marked) and pred.forward[i] is succ
+                    if not valid:
+                        break
+                if not valid: # The list changed around the key
+                    continue
+
+                new_node = Concurrent_Skip_Node(key, new_level) # Create the new node
+                for i in range(new_level + 1):
+                    new_node.forward[i] = succs[i]
+                for i in range(new_level + 1): # Link it in bottom-up
+                    preds[i].forward[i] = new_node
+                new_node.fully_linked = True # The key is in the list now
+            finally:
+                for node in locked:
+                    node.lock.release()
+
+            with self.count_lock:
+                self.count += 1 # One more key in the list
+                if new_level > self.level:
+                    self.level = new_level
+                    self.statistics.set_levels(self.level) # Set the number of levels in the Skip List
+
+            # Update the statistics
+            self.statistics.add_step(total_steps)
+            self.statistics.add_promotion(promotions)
+            return True
+
+    # Deletion
+    def delete(self, key):
+
+        """
+
+        Function to delete a key from the Skip List.
+
+        The node is locked and marked first, which removes it logically, and is then unlinked
+        from the top level down while the nodes before it are locked. Like insert, it takes the
+        locks in descending order of key, so the two cannot deadlock.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Returns:
+            bool: True if the key was found and deleted.
+
+        """
+
+        victim = None # Node being deleted
+        total_steps = 0 # Steps of every attempt
+
+        while True:
+            preds, succs, found, steps = self.find(key)
+            total_steps += steps
+
+            if victim is None: # Mark the node first
+                node = succs[found] if found != -1 else None
+                if node is None or not node.fully_linked or node.level != found or node.marked: # Not in the list
+                    self.statistics.add_delete_step(total_steps) # Add the number of steps
+                    self.statistics.add_demotion(0) # Add the number of demotions
+                    return False
+                node.lock.acquire() # Held until the node is unlinked
+                if node.marked: # Another thread deleted it first
+                    node.lock.release()
+                    self.statistics.add_delete_step(total_steps)
+                    self.statistics.add_demotion(0)
+                    return False
+                node.marked = True
+                victim = node
+
+            locked = [] # Nodes locked by this attempt
+            try:
+                valid = True
+                for i in range(victim.level + 1):
+                    pred = preds[i]
+                    if not locked or locked[-1] is not pred:
+                        pred.lock.acquire()
+                        locked.append(pred)
+                    valid = not pred.marked and pred.forward[i] is victim
+                    if not valid:
+                        break
+                if not valid: # The list changed around the node
+                    continue
+
+                for i in range(victim.level, -1, -1): # Unlink it top-down
+                    preds[i].forward[i] = victim.forward[i]
+            finally:
+                for node in locked:
+                    node.lock.release()
+            victim.lock.release()
+
+            with self.count_lock:
+                self.count -= 1 # One key less in the list
+
+            self.statistics.add_delete_step(total_steps) # Add the number of steps
+            self.statistics.add_demotion(victim.level) # Every level above the bottom one is a demotion
+            return True
+
+    # Ordered iteration
+    def __iter__(self):
+
+        """
+
+        Function to iterate over the keys in ascending order.
+
+        Returns:
+            generator: The keys in ascending order.
+
+        """
+
+        return self.range()
+
+    def range(self, low=None, high=None):
+
+        """
+
+        Function to iterate over the keys between two bounds in ascending order, without locks.
+
+        Keys inserted or deleted while the generator runs may or may not be produced, but the
+        keys that are produced are always in ascending order.
+
+        Parameters:
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+
+        Yields:
+            int: The next key.
+
+        """
+
+        node = self.head.forward[0] if low is None else self.find(low)[1][0] # First node at least as large as the lower bound
+        while node is not None and (high is None or node.key <= high): # Walk along the bottom level
+            if node.fully_linked and not node.marked:
+                yield node.key
+            node = node.forward[0]
+
+    def check_invariants(self):
+
+        """
+
+        Function to check that the Skip List is valid while no thread is changing it.
+
+        Raises:
+            RuntimeError: If a level is out of order, a node is missing from a level below its
+            top one, a deleted node is still linked, or the count is wrong.
+
+        """
+
+        below = None # Nodes of the level below
+        for i in range(self.max_level + 1):
+            nodes = set()
+            previous = None
+            node = self.head.forward[i]
+            while node is not None:
+                if previous is not None and previous.key >= node.key:
+                    raise RuntimeError(f"level {i} is out of order at key {node.key}")
+                if node.marked or not node.fully_linked:
+                    raise RuntimeError(f"key {node.key} is half inserted or half deleted")
+                if node.level < i or (below is not None and node not in below):
+                    raise RuntimeError(f"key {node.key} is linked on the wrong levels")
+                nodes.add(node)
+                previous = node
+                node = node.forward[i]
+            if i == 0 and len(nodes) != self.count:
+                raise RuntimeError(f"count is {self.count} but the list holds {len(nodes)} keys")
+            below = nodes
+
+    # Utility functions
+    def random_level(self):
+
+        """
+
+        Function to generate a random level for a node.
+
+        Returns:
+            int: Random level for the node.
+            int: Number of promotions of the node.
+
+        """
+
+        level = 0 # Count the level of the node
+        promotions = 0 # Count the number of promotions
+        while random.random() < self.probability and level < self.max_level:
+            level += 1
+            promotions += 1
+        return level, promotions
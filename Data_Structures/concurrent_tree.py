@@ -0,0 +1,566 @@
+"""
+
+    Contains a readers-writer lock and a wrapper that lets one AVL Tree or Red-Black Tree be
+    shared between threads: any number of readers at a time, or one writer on its own.
+
+"""
+
+import threading
+from contextlib import contextmanager
+
+# Readers-writer lock
+class RW_Lock:
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock()) # Guards the counters below
+        self.readers = 0 # Number of threads holding the lock for reading
+        self.writer = False # Whether a thread holds the lock for writing
+        self.waiting_writers = 0 # Number of writers waiting, which keeps new readers out
+
+    def acquire_read(self):
+
+        """
+
+        Function to acquire the lock for reading.
+
+        New readers wait while a writer holds or is waiting for the lock, so a steady stream of
+        readers cannot starve the writer.
+
+        """
+
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+
+        """
+
+        Function to release the lock after reading.
+
+        """
+
+        with self.condition:
+            self.readers -= 1
+            if self.readers == 0: # The last reader lets a writer in
+                self.condition.notify_all()
+
+    def acquire_write(self):
+
+        """
+
+        Function to acquire the lock for writing, waiting until every reader has left.
+
+        """
+
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+
+        """
+
+        Function to release the lock after writing.
+
+        """
+
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all() # Let the waiting readers and writers in
+
+    @contextmanager
+    def read_locked(self):
+
+        """
+
+        Context manager that holds the lock for reading.
+
+        """
+
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+
+        """
+
+        Context manager that holds the lock for writing.
+
+        """
+
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+# Statistics shared by several threads
+class Synchronised_Statistics:
+    def __init__(self, statistics):
+        self.statistics = statistics # Statistics being wrapped
+        self.lock = threading.Lock() # Serialises the add_* and set_* calls
+
+        # Readers record their search steps while holding only the read lock, so every method
+        # that changes the statistics takes the mutex
+        for name in dir(statistics):
+            if name.startswith(("add_", "set_")):
+                setattr(self, name, self.locked(getattr(statistics, name)))
+
+    def locked(self, method):
+
+        """
+
+        Function to wrap a method of the statistics so that it runs under the mutex.
+
+        Parameters:
+            method (callable): The method to be wrapped.
+
+        Returns:
+            callable: The wrapped method.
+
+        """
+
+        def call(*args):
+            with self.lock:
+                return method(*args)
+        return call
+
+    def __getattr__(self, name):
+
+        """
+
+        Function to forward every other attribute (data, calculate_statistics, ...) to the statistics.
+
+        Parameters:
+            name (str): The name of the attribute.
+
+        Returns:
+            object: The attribute of the statistics.
+
+        """
+
+        return getattr(self.statistics, name)
+
+# Tree shared between threads
+class Concurrent_Tree:
+    def __init__(self, tree):
+        if getattr(tree, "use_finger", False): # Finger searches move the finger, so they are not reads
+            raise ValueError("finger search changes the structure on every search; use a Skip_List without finger")
+        self.tree = tree # Tree being shared
+        self.lock = RW_Lock() # Readers share the tree, a writer has it to itself
+        tree.statistics = Synchronised_Statistics(tree.statistics) # Readers record statistics concurrently
+
+    @contextmanager
+    def reading(self):
+
+        """
+
+        Context manager that gives the tree to a reader, for several reads on one consistent state.
+
+        Yields:
+            object: The tree, which must not be changed inside the block.
+
+        """
+
+        with self.lock.read_locked():
+            yield self.tree
+
+    @contextmanager
+    def writing(self):
+
+        """
+
+        Context manager that gives the tree to a writer, for several changes applied together.
+
+        Yields:
+            object: The tree.
+
+        """
+
+        with self.lock.write_locked():
+            yield self.tree
+
+    # Reads
+    def search(self, key):
+
+        """
+
+        Function to search for a key under the read lock.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            object: The node holding the key, or None.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree.search(key)
+
+    def __contains__(self, key):
+
+        """
+
+        Function to check whether a key is in the tree under the read lock.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            bool: True if the key is in the tree.
+
+        """
+
+        with self.lock.read_locked():
+            return key in self.tree
+
+    def contains_many(self, queries):
+
+        """
+
+        Function to check a batch of keys under one read lock.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for.
+
+        Returns:
+            numpy.ndarray: True for every key that is in the tree.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree.contains_many(queries)
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of keys in the tree.
+
+        Returns:
+            int: The number of keys.
+
+        """
+
+        with self.lock.read_locked():
+            return len(self.tree)
+
+    def range(self, low=None, high=None):
+
+        """
+
+        Function to get the keys between two bounds under the read lock.
+
+        The keys are copied into a list before the lock is released, because a generator
+        would otherwise keep the lock (and every writer) waiting for as long as it is alive.
+
+        Parameters:
+            low (int): The smallest key (inclusive), or None for no lower bound.
+            high (int): The largest key (inclusive), or None for no upper bound.
+
+        Returns:
+            list: The keys between the bounds in ascending order.
+
+        """
+
+        with self.lock.read_locked():
+            return list(self.tree.range(low, high))
+
+    def floor(self, key):
+
+        """
+
+        Function to find the largest key less than or equal to a key under the read lock.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The largest key less than or equal to the key, or None.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree.floor(key)
+
+    def ceiling(self, key):
+
+        """
+
+        Function to find the smallest key greater than or equal to a key under the read lock.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The smallest key greater than or equal to the key, or None.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree.ceiling(key)
+
+    def rank(self, key):
+
+        """
+
+        Function to count the keys less than a key under the read lock.
+
+        Parameters:
+            key (int): The key to be ranked.
+
+        Returns:
+            int: The number of keys less than the key.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree.rank(key)
+
+    def select(self, k):
+
+        """
+
+        Function to find the k-th smallest key under the read lock.
+
+        Parameters:
+            k (int): The position of the key in ascending order, starting from 0.
+
+        Returns:
+            int: The k-th smallest key.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree.select(k)
+
+    def count_range(self, low, high):
+
+        """
+
+        Function to count the keys between two bounds under the read lock.
+
+        Parameters:
+            low (int): The smallest key to be counted (inclusive).
+            high (int): The largest key to be counted (inclusive).
+
+        Returns:
+            int: The number of keys in the range.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree.count_range(low, high)
+
+    # Writes
+    def insert(self, key, value=None, duplicates=None):
+
+        """
+
+        Function to insert a key-value pair under the write lock.
+
+        Parameters:
+            key (int): The key to be inserted.
+            value (object): The value stored with the key.
+            duplicates (str): The policy for a key that is already in the tree, or None for the tree's policy.
+
+        Returns:
+            object: The node holding the key.
+
+        """
+
+        with self.lock.write_locked():
+            return self.tree.insert(key, value, duplicates)
+
+    def insert_many(self, keys, rebuild=None):
+
+        """
+
+        Function to insert a batch of keys under one write lock.
+
+        Parameters:
+            keys (iterable): The keys to be inserted.
+            rebuild (bool): Passed to insert_many of the tree.
+
+        """
+
+        with self.lock.write_locked():
+            self.tree.insert_many(keys, rebuild)
+
+    def delete(self, key):
+
+        """
+
+        Function to delete a key under the write lock.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Returns:
+            bool: True if the key was found and deleted.
+
+        """
+
+        with self.lock.write_locked():
+            return self.tree.delete(key)
+
+    def pop_min(self):
+
+        """
+
+        Function to remove and return the smallest key under the write lock.
+
+        Returns:
+            int: The smallest key.
+
+        """
+
+        with self.lock.write_locked():
+            return self.tree.pop_min()
+
+    def pop_max(self):
+
+        """
+
+        Function to remove and return the largest key under the write lock.
+
+        Returns:
+            int: The largest key.
+
+        """
+
+        with self.lock.write_locked():
+            return self.tree.pop_max()
+
+    # Map
+    def __getitem__(self, key):
+
+        """
+
+        Function to get the value stored with a key under the read lock.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            object: The value of the key.
+
+        Raises:
+            KeyError: If the key is not in the tree.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree[key]
+
+    def get(self, key, default=None):
+
+        """
+
+        Function to get the value stored with a key, or a default, under the read lock.
+
+        Parameters:
+            key (int): The key to be searched for.
+            default (object): The value returned if the key is not in the tree.
+
+        Returns:
+            object: The value of the key, or the default.
+
+        """
+
+        with self.lock.read_locked():
+            return self.tree.get(key, default)
+
+    def items(self, low=None, high=None):
+
+        """
+
+        Function to get the keys between two bounds and their values under the read lock.
+
+        The pairs are copied into a list before the lock is released, like in range.
+
+        Parameters:
+            low (int): The smallest key (inclusive), or None for no lower bound.
+            high (int): The largest key (inclusive), or None for no upper bound.
+
+        Returns:
+            list: The (key, value) pairs in ascending order of key.
+
+        """
+
+        with self.lock.read_locked():
+            return list(self.tree.items(low, high))
+
+    def values(self):
+
+        """
+
+        Function to get the values in ascending order of key under the read lock.
+
+        Returns:
+            list: The values.
+
+        """
+
+        with self.lock.read_locked():
+            return list(self.tree.values())
+
+    def __setitem__(self, key, value):
+
+        """
+
+        Function to store a value with a key under the write lock.
+
+        Parameters:
+            key (int): The key.
+            value (object): The value to be stored.
+
+        """
+
+        with self.lock.write_locked():
+            self.tree[key] = value
+
+    def __delitem__(self, key):
+
+        """
+
+        Function to delete a key and its value under the write lock.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Raises:
+            KeyError: If the key is not in the tree.
+
+        """
+
+        with self.lock.write_locked():
+            del self.tree[key]
+
+    def setdefault(self, key, default=None):
+
+        """
+
+        Function to get the value stored with a key, inserting the key with a default value
+        first if it is not in the tree, under the write lock (the check and the insert are one step).
+
+        Parameters:
+            key (int): The key.
+            default (object): The value stored if the key is not in the tree.
+
+        Returns:
+            object: The value of the key.
+
+        """
+
+        with self.lock.write_locked():
+            return self.tree.setdefault(key, default)
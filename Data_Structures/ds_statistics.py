@@ -1,17 +1,328 @@
+import math
 import numpy as np
 
+# Streaming accumulator for one series of statistics
+class Running_Stats:
+    def __init__(self, keep_samples=False):
+        self.count = 0 # Number of samples
+        self.mean = 0.0 # Running mean (Welford)
+        self.m2 = 0.0 # Running sum of squared differences from the mean (Welford)
+        self.minimum = None # Smallest sample
+        self.maximum = None # Largest sample
+        self.histogram = {} # Number of times each value was seen, used for the median
+        self.samples = [] if keep_samples else None # Raw samples, only kept on request
+
+    def append(self, value):
+
+        """
+
+        Function to add a sample in O(1) time and memory.
+
+        The counts are small integers, so the histogram only has one bucket per distinct value
+        and stays tiny however many samples are added.
+
+        Parameters:
+            value (int): The sample to be added.
+
+        """
+
+        self.count += 1
+        delta = value - self.mean # Welford's update of the mean and the sum of squares
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if self.minimum is None or value < self.minimum: # Update the minimum
+            self.minimum = value
+        if self.maximum is None or value > self.maximum: # Update the maximum
+            self.maximum = value
+
+        self.histogram[value] = self.histogram.get(value, 0) + 1 # Count the value
+
+        if self.samples is not None: # Keep the raw sample if requested
+            self.samples.append(value)
+
+    def extend(self, values):
+
+        """
+
+        Function to add an array of samples at once.
+
+        The mean and the sum of squares of the array are merged with the running ones
+        (Chan et al.), so the cost is a few NumPy operations instead of one append per sample.
+
+        Parameters:
+            values (numpy.ndarray): The samples to be added.
+
+        """
+
+        values = np.asarray(values)
+        if values.size == 0: # Nothing to add
+            return
+
+        count = values.size
+        mean = values.mean().item()
+        m2 = ((values - mean) ** 2).sum().item()
+        total = self.count + count
+        delta = mean - self.mean # Merge the two means and sums of squares
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+        minimum = values.min().item()
+        maximum = values.max().item()
+        if self.minimum is None or minimum < self.minimum: # Update the minimum
+            self.minimum = minimum
+        if self.maximum is None or maximum > self.maximum: # Update the maximum
+            self.maximum = maximum
+
+        unique, counts = np.unique(values, return_counts=True) # Count the values
+        for value, times in zip(unique.tolist(), counts.tolist()):
+            self.histogram[value] = self.histogram.get(value, 0) + times
+
+        if self.samples is not None: # Keep the raw samples if requested
+            self.samples.extend(values.tolist())
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of samples.
+
+        Returns:
+            int: The number of samples.
+
+        """
+
+        return self.count
+
+    def median(self):
+
+        """
+
+        Function to get the median of the samples from the histogram.
+
+        Returns:
+            float: The median, the mean of the two middle samples when the count is even.
+
+        """
+
+        lower_index = (self.count - 1) // 2 # Index of the lower middle sample
+        upper_index = self.count // 2 # Index of the upper middle sample
+        lower = upper = None
+        seen = 0 # Number of samples in the buckets visited so far
+        for value in sorted(self.histogram):
+            seen += self.histogram[value]
+            if lower is None and seen > lower_index:
+                lower = value
+            if seen > upper_index:
+                upper = value
+                break
+        return (lower + upper) / 2
+
+    def summary(self):
+
+        """
+
+        Function to summarise the samples like summarise_list.
+
+        Returns:
+            dict: The minimum, maximum, average, median and standard deviation.
+
+        """
+
+        if self.samples is not None: # Exact statistics from the raw samples
+            return summarise_list(self.samples)
+
+        if self.count == 0: # No samples
+            return {"min": None, "max": None, "avg": None, "median": None, "std": None}
+
+        return {
+            "min": self.minimum,
+            "max": self.maximum,
+            "avg": self.mean,
+            "median": self.median(),
+            "std": math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan, # Sample standard deviation
+        }
+
+    def merge(self, other):
+
+        """
+
+        Function to add the samples summarised by another accumulator, without the samples themselves.
+
+        The counts, means and sums of squares are combined like in extend (Chan et al.), and the
+        histograms are added bucket by bucket, so the result is the same as if every sample had
+        been appended to one accumulator.
+
+        Parameters:
+            other (Running_Stats): The accumulator to be merged in.
+
+        Returns:
+            Running_Stats: This accumulator.
+
+        """
+
+        if other.count == 0: # Nothing to add
+            return self
+
+        total = self.count + other.count
+        delta = other.mean - self.mean # Merge the two means and sums of squares
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+        if self.minimum is None or other.minimum < self.minimum: # Update the minimum
+            self.minimum = other.minimum
+        if self.maximum is None or other.maximum > self.maximum: # Update the maximum
+            self.maximum = other.maximum
+
+        for value, times in other.histogram.items(): # Add the buckets
+            self.histogram[value] = self.histogram.get(value, 0) + times
+
+        if self.samples is not None: # Raw samples only survive if both sides kept them
+            self.samples = self.samples + other.samples if other.samples is not None else None
+        return self
+
+    def to_dict(self):
+
+        """
+
+        Function to convert the accumulator to a dictionary of plain numbers that can be written as JSON.
+
+        Returns:
+            dict: The count, sum, sum of squares, minimum, maximum and histogram of the samples.
+
+        """
+
+        return {
+            "count": self.count,
+            "sum": self.mean * self.count,
+            "sum_squares": self.m2 + self.mean * self.mean * self.count, # Sum of the squared samples
+            "min": self.minimum,
+            "max": self.maximum,
+            "values": list(self.histogram), # Histogram as two parallel lists, since JSON keys are strings
+            "counts": list(self.histogram.values()),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+
+        """
+
+        Function to rebuild an accumulator from the dictionary of to_dict.
+
+        Parameters:
+            data (dict): The dictionary returned by to_dict.
+
+        Returns:
+            Running_Stats: The accumulator, without raw samples.
+
+        """
+
+        running = cls()
+        running.count = data["count"]
+        if running.count:
+            running.mean = data["sum"] / running.count
+            running.m2 = max(data["sum_squares"] - data["sum"] * running.mean, 0.0) # Rounding can make it slightly negative
+        running.minimum = data["min"]
+        running.maximum = data["max"]
+        running.histogram = dict(zip(data["values"], data["counts"]))
+        return running
+
+    def __getstate__(self):
+
+        """
+
+        Function to get the state of the accumulator for pickling, with the histogram as two NumPy arrays.
+
+        Returns:
+            dict: The state of the accumulator.
+
+        """
+
+        state = self.__dict__.copy()
+        state["histogram"] = (compact_array(list(self.histogram)), compact_array(list(self.histogram.values())))
+        if self.samples is not None:
+            state["samples"] = compact_array(self.samples)
+        return state
+
+    def __setstate__(self, state):
+
+        """
+
+        Function to restore the state of the accumulator after unpickling.
+
+        Parameters:
+            state (dict): The state returned by __getstate__.
+
+        """
+
+        values, counts = state["histogram"]
+        state["histogram"] = dict(zip(values.tolist(), counts.tolist()))
+        if state["samples"] is not None:
+            state["samples"] = state["samples"].tolist()
+        self.__dict__.update(state)
+
+# Stores a list of numbers in the smallest NumPy type that holds them
+def compact_array(values):
+
+    """
+
+    Function to convert a list of numbers to a NumPy array of the smallest type that holds them.
+
+    Most samples are small counts, so they fit in one byte instead of a whole Python integer.
+
+    Parameters:
+        values (list): The numbers.
+
+    Returns:
+        numpy.ndarray: The numbers.
+
+    """
+
+    array = np.asarray(values)
+    if array.size and array.dtype.kind in "iu": # Integers: as few bytes as the range allows
+        array = array.astype(np.result_type(np.min_scalar_type(array.min()), np.min_scalar_type(array.max())))
+    return array
+
+# Summarises a list of samples
+def summarise_list(data):
+
+    """
+
+    Function to calculate the statistics of a list of samples.
+
+    Parameters:
+        data (list): The samples.
+
+    Returns:
+        dict: The minimum, maximum, average, median and standard deviation, or None for each if the list is empty.
+
+    """
+
+    if data:  # Checks if the list is not empty
+        return { # If the list is not empty
+            "min": np.min(data), # Calculate the minimum value
+            "max": np.max(data), # Calculate the maximum value
+            "avg": np.mean(data), # Calculate the average value
+            "median": np.median(data), # Calculate the median value
+            "std": np.std(data, ddof=1)  # Calculate the standard deviation
+        }
+    else: # If the list is empty
+        return { # Return None as a default value
+            "min": None,
+            "max": None,
+            "avg": None,
+            "median": None,
+            "std": None
+        }
+
 # Calcaulates statistics for AVL trees, RBT and Skip lists
 class Statistics:
-    def __init__(self):
-        # Data dictionary to store the statistics
-        self.data = {
-            "steps": [], # Number of steps for insertion
-            "rotations": [], # Number of rotations for insertion (AVL Trees and RBT)
-            "height": None, # Height of the tree (AVL Trees and RBT)
-            "leaves": None, # Number of leaves in the tree (AVL Trees and RBT)
-            "promotions": [], # Number of promotions for insertion (Skip Lists)
-            "levels": None, # Number of levels in the Skip List
-        }
+    def __init__(self, streaming=False, keep_samples=False):
+        self.streaming = streaming # Whether the series are summarised in constant memory
+        self.keep_samples = keep_samples # Whether streaming series also keep their raw samples
+        self.reset() # Create the data dictionary
 
     # Calculate the statistics  
     def calc_stats(self, data):
@@ -21,26 +332,14 @@ class Statistics:
         Helper function to calculate the statistics for a given list of data.
 
         Parameters:
-            data (list): The list of data for which statistics are to be calculated.
+            data (list or Running_Stats): The list of data for which statistics are to be calculated.
         
         """
 
-        if data:  # Checks if the list is not empty
-            return { # If the list is not empty
-                "min": np.min(data), # Calculate the minimum value
-                "max": np.max(data), # Calculate the maximum value
-                "avg": np.mean(data), # Calculate the average value
-                "median": np.median(data), # Calculate the median value
-                "std": np.std(data, ddof=1)  # Calculate the standard deviation
-            }
-        else: # If the list is empty
-            return { # Return None as a default value
-                "min": None,
-                "max": None,
-                "avg": None,
-                "median": None,
-                "std": None
-            }
+        if isinstance(data, Running_Stats): # Streaming series summarise themselves
+            return data.summary()
+
+        return summarise_list(data)
 
     def calculate_statistics(self):
 
@@ -57,6 +356,11 @@ class Statistics:
         stats["steps"] = self.calc_stats(self.data["steps"]) # Calculate the statistics for the number of steps
         stats["rotations"] = self.calc_stats(self.data["rotations"]) # Calculate the statistics for the number of rotations
         stats["promotions"] = self.calc_stats(self.data["promotions"]) # Calculate the statistics for the number of promotions
+        stats["search_steps"] = self.calc_stats(self.data["search_steps"]) # Calculate the statistics for the number of search steps
+        stats["delete_steps"] = self.calc_stats(self.data["delete_steps"]) # Calculate the statistics for the number of deletion steps
+        stats["delete_rotations"] = self.calc_stats(self.data["delete_rotations"]) # Calculate the statistics for the number of deletion rotations
+        stats["demotions"] = self.calc_stats(self.data["demotions"]) # Calculate the statistics for the number of demotions
+        stats["saved_steps"] = self.calc_stats(self.data["saved_steps"]) # Calculate the statistics for the number of steps saved by the finger
 
         stats["height"] = self.data["height"] # Get the height of the tree
         stats["leaves"] = self.data["leaves"] # Get the number of leaves in the tree
@@ -149,6 +453,90 @@ class Statistics:
 
         self.data["levels"] = levels # Set the number of levels
 
+    # Add the number of search steps
+    def add_search_step(self, step):
+
+        """
+
+        Function to add the number of steps of a search to the statistics.
+
+        Parameters:
+            step (int): The number of steps to be added.
+
+        """
+
+        self.data["search_steps"].append(step) # Append the number of steps to the list
+
+    # Add the number of deletion steps
+    def add_delete_step(self, step):
+
+        """
+
+        Function to add the number of steps of a deletion to the statistics.
+
+        Parameters:
+            step (int): The number of steps to be added.
+
+        """
+
+        self.data["delete_steps"].append(step) # Append the number of steps to the list
+
+    # Add the number of deletion rotations
+    def add_delete_rotation(self, rotation):
+
+        """
+
+        Function to add the number of rotations of a deletion to the statistics.
+
+        Parameters:
+            rotation (int): The number of rotations to be added.
+
+        """
+
+        self.data["delete_rotations"].append(rotation) # Append the number of rotations to the list
+
+    # Add the number of demotions
+    def add_demotion(self, demotion):
+
+        """
+
+        Function to add the number of demotions of a deletion to the statistics.
+
+        Parameters:
+            demotion (int): The number of demotions to be added.
+
+        """
+
+        self.data["demotions"].append(demotion) # Append the number of demotions to the list
+
+    # Add the number of steps of a batch of searches
+    def add_search_steps(self, steps):
+
+        """
+
+        Function to add the number of steps of every search in a batch to the statistics at once.
+
+        Parameters:
+            steps (numpy.ndarray): The number of steps of each search.
+
+        """
+
+        self.extend_series("search_steps", steps) # Append the numbers of steps to the list
+
+    # Add the number of steps saved by a finger search
+    def add_saved_step(self, step):
+
+        """
+
+        Function to add the number of steps a search saved by starting from the finger instead of the head.
+
+        Parameters:
+            step (int): The number of steps saved (negative if the finger cost more).
+
+        """
+
+        self.data["saved_steps"].append(step) # Append the number of steps to the list
+
     # Reset the statistics
     def reset(self):
 
@@ -158,11 +546,273 @@ class Statistics:
 
         """
 
+        # Data dictionary to store the statistics
         self.data = {
-            "steps": [],
-            "rotations": [],
-            "height": None,
-            "leaves": None,
-            "promotions": [],
-            "levels": None,
-        }
\ No newline at end of file
+            "steps": self.new_series(), # Number of steps for insertion
+            "rotations": self.new_series(), # Number of rotations for insertion (AVL Trees and RBT)
+            "height": None, # Height of the tree (AVL Trees and RBT)
+            "leaves": None, # Number of leaves in the tree (AVL Trees and RBT)
+            "promotions": self.new_series(), # Number of promotions for insertion (Skip Lists)
+            "levels": None, # Number of levels in the Skip List
+            "search_steps": self.new_series(), # Number of steps for search
+            "delete_steps": self.new_series(), # Number of steps for deletion
+            "delete_rotations": self.new_series(), # Number of rotations for deletion (AVL Trees and RBT)
+            "demotions": self.new_series(), # Number of levels removed by a deletion (Skip Lists)
+            "saved_steps": self.new_series(), # Number of steps saved by starting from the finger (Skip Lists)
+        }
+
+    def extend_series(self, name, values):
+
+        """
+
+        Function to add an array of samples to a series.
+
+        Parameters:
+            name (str): The name of the series.
+            values (numpy.ndarray): The samples to be added.
+
+        """
+
+        series = self.data[name]
+        if isinstance(series, Running_Stats): # Streaming series merge the whole array at once
+            series.extend(values)
+        else: # Raw samples are kept as Python numbers, like the ones added one at a time
+            series.extend(np.asarray(values).tolist())
+
+    def merge(self, other):
+
+        """
+
+        Function to add the statistics collected by another Statistics object, for example in another process.
+
+        Streaming series are combined from their summaries in O(number of distinct values), so a
+        shard never has to send its raw samples. If either side is streaming, the merged series
+        is streaming. The height, leaves and levels describe one structure each, so the largest
+        value is kept.
+
+        Parameters:
+            other (Statistics): The statistics to be merged in.
+
+        Returns:
+            Statistics: This object.
+
+        """
+
+        for name, value in other.data.items():
+            series = self.data[name]
+            if isinstance(series, Running_Stats): # Streaming: merge the summary
+                if isinstance(value, Running_Stats):
+                    series.merge(value)
+                else:
+                    series.extend(value)
+            elif isinstance(value, Running_Stats): # The other side is streaming: summarise this side first
+                running = Running_Stats(self.keep_samples)
+                running.extend(series)
+                self.data[name] = running.merge(value)
+                self.streaming = True
+            elif isinstance(series, list): # Both sides kept the raw samples
+                series.extend(value)
+            elif value is not None: # Height, leaves or levels
+                self.data[name] = value if series is None else max(series, value)
+        return self
+
+    def to_dict(self):
+
+        """
+
+        Function to convert the statistics to a dictionary that can be written as JSON.
+
+        Every series is written as a summary (see Running_Stats.to_dict), so the size does not
+        grow with the number of operations.
+
+        Returns:
+            dict: The summaries of the series and the height, leaves and levels.
+
+        """
+
+        result = {}
+        for name, value in self.data.items():
+            if isinstance(value, Running_Stats):
+                result[name] = value.to_dict()
+            elif isinstance(value, list): # Summarise the raw samples
+                running = Running_Stats()
+                running.extend(value)
+                result[name] = running.to_dict()
+            else:
+                result[name] = value
+        return result
+
+    @classmethod
+    def from_dict(cls, data):
+
+        """
+
+        Function to rebuild streaming statistics from the dictionary of to_dict.
+
+        Parameters:
+            data (dict): The dictionary returned by to_dict.
+
+        Returns:
+            Statistics: The statistics, in streaming mode.
+
+        """
+
+        statistics = cls(streaming=True)
+        for name, value in data.items():
+            statistics.data[name] = Running_Stats.from_dict(value) if isinstance(value, dict) else value
+        return statistics
+
+    def __getstate__(self):
+
+        """
+
+        Function to get the state of the statistics for pickling, with the raw series as compact NumPy arrays.
+
+        Returns:
+            dict: The state of the statistics.
+
+        """
+
+        state = self.__dict__.copy()
+        state["data"] = {name: compact_array(value) if isinstance(value, list) else value
+                         for name, value in self.data.items()}
+        return state
+
+    def __setstate__(self, state):
+
+        """
+
+        Function to restore the state of the statistics after unpickling.
+
+        Parameters:
+            state (dict): The state returned by __getstate__.
+
+        """
+
+        state["data"] = {name: value.tolist() if isinstance(value, np.ndarray) else value
+                         for name, value in state["data"].items()}
+        self.__dict__.update(state)
+
+    def new_series(self):
+
+        """
+
+        Function to create an empty series of samples.
+
+        Returns:
+            list or Running_Stats: A list of raw samples, or a streaming accumulator in streaming mode.
+
+        """
+
+        if self.streaming: # Constant-memory accumulator
+            return Running_Stats(self.keep_samples)
+        return [] # Raw samples
+
+# Does nothing with a sample
+def ignore_sample(self, value):
+
+    """
+
+    Function used in place of the add_* methods when a sample is not recorded.
+
+    Parameters:
+        value (int): The sample, which is ignored.
+
+    """
+
+# Statistics that record nothing, for structures used without measurements
+class Null_Statistics(Statistics):
+    # Every add_* call is a no-op, so the only cost left in the hot paths is the method call
+    add_step = ignore_sample
+    add_rotation = ignore_sample
+    add_promotion = ignore_sample
+    add_search_step = ignore_sample
+    add_search_steps = ignore_sample
+    add_delete_step = ignore_sample
+    add_delete_rotation = ignore_sample
+    add_demotion = ignore_sample
+    add_saved_step = ignore_sample
+
+# Statistics that record one operation in every N
+class Sampled_Statistics(Statistics):
+    def __init__(self, every, streaming=False, keep_samples=False):
+        self.every = every # Record one sample in every N calls of each add_* method
+        self.countdowns = {} # Number of calls left before the next sample of each series
+        super().__init__(streaming, keep_samples)
+
+    def sample(self, name, value):
+
+        """
+
+        Function to record a sample of a series if it is its turn.
+
+        Every operation calls each of its add_* methods once, so the samples of different series
+        (for example the steps and rotations of an insertion) come from the same operations.
+
+        Parameters:
+            name (str): The name of the series.
+            value (int): The sample.
+
+        """
+
+        countdown = self.countdowns.get(name, 0) # The first call of every series is recorded
+        if countdown == 0: # It is the turn of this call
+            self.data[name].append(value)
+            countdown = self.every
+        self.countdowns[name] = countdown - 1
+
+    def sample_many(self, name, values):
+
+        """
+
+        Function to record the samples of an array whose turn it is, as if each one was added with sample.
+
+        Parameters:
+            name (str): The name of the series.
+            values (numpy.ndarray): The samples.
+
+        """
+
+        values = np.asarray(values)
+        countdown = self.countdowns.get(name, 0) # Index of the first sample to be recorded
+        self.extend_series(name, values[countdown::self.every]) # Every N-th sample from there
+        self.countdowns[name] = (countdown - values.size) % self.every # Calls left after the array
+
+    # The add_* methods only record the calls whose turn it is
+    def add_step(self, step):
+        self.sample("steps", step)
+
+    def add_rotation(self, rotation):
+        self.sample("rotations", rotation)
+
+    def add_promotion(self, promotion):
+        self.sample("promotions", promotion)
+
+    def add_search_step(self, step):
+        self.sample("search_steps", step)
+
+    def add_search_steps(self, steps):
+        self.sample_many("search_steps", steps)
+
+    def add_delete_step(self, step):
+        self.sample("delete_steps", step)
+
+    def add_delete_rotation(self, rotation):
+        self.sample("delete_rotations", rotation)
+
+    def add_demotion(self, demotion):
+        self.sample("demotions", demotion)
+
+    def add_saved_step(self, step):
+        self.sample("saved_steps", step)
+
+    def reset(self):
+
+        """
+
+        Function to reset the statistics and the sampling counters.
+
+        """
+
+        super().reset()
+        self.countdowns = {}
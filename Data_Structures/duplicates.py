@@ -0,0 +1,72 @@
+"""
+
+    Contains the policies for keys that are inserted while they are already in a data structure.
+
+    ALLOW keeps every copy (the trees put a new copy to the right of the old ones), IGNORE keeps
+    the node that is already there and its value, and REPLACE keeps that node but gives it the
+    new value. The trees allow duplicates and the Skip List ignores them unless another policy
+    is passed to their constructors; __setitem__ always replaces and setdefault always ignores.
+    insert_many takes no values, so under REPLACE it leaves the values of stored keys alone.
+
+"""
+
+ALLOW = "allow" # Insert another node with the same key
+IGNORE = "ignore" # Leave the node that holds the key as it is
+REPLACE = "replace" # Update the value of the node that holds the key in place
+POLICIES = (ALLOW, IGNORE, REPLACE)
+
+# Checks a policy
+def check_policy(duplicates):
+
+    """
+
+    Function to check the name of a duplicate policy.
+
+    Parameters:
+        duplicates (str): The policy.
+
+    Returns:
+        str: The policy.
+
+    Raises:
+        ValueError: If the policy is unknown.
+
+    """
+
+    if duplicates not in POLICIES:
+        raise ValueError(f"unknown duplicate policy: {duplicates} (expected one of {', '.join(POLICIES)})")
+    return duplicates
+
+# Applies a policy to sorted keys
+def drop_duplicates(keys, values, duplicates):
+
+    """
+
+    Function to apply a duplicate policy to keys in ascending order before a bulk load.
+
+    Parameters:
+        keys (list): The keys in ascending order.
+        values (list): The value of each key, or None if there are no values.
+        duplicates (str): The policy: ALLOW keeps every key, IGNORE keeps the first copy of each
+        key and REPLACE keeps the first copy with the value of the last one.
+
+    Returns:
+        list: The keys that are kept.
+        list: Their values, or None if there are no values.
+
+    """
+
+    if duplicates == ALLOW or len(keys) < 2:
+        return keys, values
+
+    kept_keys = [] # Keys that are kept
+    kept_values = [] if values is not None else None # Their values
+    for index, key in enumerate(keys):
+        if kept_keys and kept_keys[-1] == key: # Another copy of the last key
+            if duplicates == REPLACE and values is not None:
+                kept_values[-1] = values[index]
+            continue
+        kept_keys.append(key)
+        if values is not None:
+            kept_values.append(values[index])
+    return kept_keys, kept_values
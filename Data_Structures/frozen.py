@@ -0,0 +1,163 @@
+"""
+
+    Contains a read-only, flattened copy of a tree for vectorised batch lookups.
+
+    The keys are stored in a contiguous NumPy array in Eytzinger (breadth-first) order: the
+    children of slot k are slots 2k and 2k + 1, so the first levels of every search share a
+    few cache lines and a whole array of queries can walk down the tree together.
+
+"""
+
+import numpy as np
+
+# Read-only tree in Eytzinger layout
+class Frozen_Tree:
+    def __init__(self, keys):
+        keys = np.asarray(keys) # Keys in ascending order
+        self.size = len(keys) # Number of keys
+        self.depth = self.size.bit_length() # Number of levels of the implicit tree
+        self.ranks = self.in_order_ranks(self.size) # Position in sorted order of the key in each slot (slot 0 is unused)
+        self.layout = np.empty(self.size + 1, dtype=keys.dtype) # Keys in Eytzinger order (slot 0 is unused)
+        if self.size:
+            self.layout[0] = keys[0]
+            self.layout[1:] = keys[self.ranks[1:]]
+
+    def in_order_ranks(self, size):
+
+        """
+
+        Function to compute the in-order position of every slot of an implicit tree with a given number of slots.
+
+        The subtree sizes are computed level by level from the bottom up, and the positions level
+        by level from the top down, so the work is O(n) NumPy operations over O(log n) levels.
+
+        Parameters:
+            size (int): The number of slots.
+
+        Returns:
+            numpy.ndarray: The in-order position of each slot, indexed from 1.
+
+        """
+
+        sizes = np.zeros(2 * size + 2, dtype=np.int64) # Subtree size of each slot (0 past the last slot)
+        ranks = np.zeros(size + 1, dtype=np.int64)
+        if size == 0:
+            return ranks
+
+        levels = [np.arange(1 << level, min(1 << (level + 1), size + 1)) for level in range(self.depth)] # Slots of each level
+        for slots in reversed(levels): # Bottom up: a subtree is its root and its two child subtrees
+            sizes[slots] = 1 + sizes[2 * slots] + sizes[2 * slots + 1]
+
+        ranks[1] = sizes[2] # The root comes after its whole left subtree
+        for slots in levels[:-1]: # Top down: place the children around their parent
+            left = 2 * slots
+            right = left + 1
+            inside = left <= size
+            ranks[left[inside]] = ranks[slots[inside]] - 1 - sizes[2 * left[inside] + 1] # Before the parent and the left child's right subtree
+            inside = right <= size
+            ranks[right[inside]] = ranks[slots[inside]] + 1 + sizes[2 * right[inside]] # After the parent and the right child's left subtree
+        return ranks
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of keys in the frozen tree.
+
+        Returns:
+            int: The number of keys.
+
+        """
+
+        return self.size
+
+    def lower_slots(self, queries, side="left"):
+
+        """
+
+        Function to find, for every query, the slot of the first key not less than it (or greater than it).
+
+        All the queries walk down the implicit tree together, one level per NumPy operation, so the
+        loop runs O(log n) times whatever the number of queries.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for.
+            side (str): "left" for the first key >= the query, "right" for the first key > the query.
+
+        Returns:
+            numpy.ndarray: The slot of that key, or 0 if there is none.
+
+        """
+
+        slots = np.ones(queries.shape, dtype=np.int64) # Every search starts at the root
+        for _ in range(self.depth):
+            inside = slots <= self.size # Searches that have not fallen off the tree
+            keys = self.layout[np.where(inside, slots, 0)]
+            go_right = keys <= queries if side == "right" else keys < queries
+            slots = np.where(inside, 2 * slots + go_right, slots)
+
+        # The answer is the last slot where the search went left: drop the trailing right turns and that left turn
+        for _ in range(self.depth + 1):
+            right_turn = (slots & 1) == 1
+            if not right_turn.any():
+                break
+            slots = np.where(right_turn, slots >> 1, slots)
+        return slots >> 1
+
+    def searchsorted(self, queries, side="left"):
+
+        """
+
+        Function to find the sorted position of every query, like np.searchsorted on the sorted keys.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for.
+            side (str): "left" to count the keys less than each query, "right" to count the keys up to it.
+
+        Returns:
+            numpy.ndarray: The position at which each query would be inserted.
+
+        Raises:
+            ValueError: If side is not "left" or "right".
+
+        """
+
+        if side not in ("left", "right"):
+            raise ValueError("side must be 'left' or 'right'")
+        queries = np.asarray(queries)
+        slots = self.lower_slots(queries, side)
+        return np.where(slots == 0, self.size, self.ranks[slots]) # No such key means past the end
+
+    def rank(self, queries):
+
+        """
+
+        Function to count the keys less than every query, like rank on the live tree.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be ranked.
+
+        Returns:
+            numpy.ndarray: The number of keys less than each query.
+
+        """
+
+        return self.searchsorted(queries, "left")
+
+    def contains(self, queries):
+
+        """
+
+        Function to check whether every query is in the frozen tree.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for.
+
+        Returns:
+            numpy.ndarray: True for every query that is in the tree.
+
+        """
+
+        queries = np.asarray(queries)
+        slots = self.lower_slots(queries)
+        return (slots != 0) & (self.layout[slots] == queries) # Slot 0 never matches
@@ -4,26 +4,40 @@
 
 """
 
-import random
+import numpy as np
 
 # Implements the Knuth shuffle algorithm
-def knuth_shuffle(array):
+def knuth_shuffle(array, seed=None):
 
     """
 
-    Implements the Knuth shuffle algorithm to randomise the order of elements in an array.
+    Implements the Knuth shuffle algorithm to randomise the order of elements in an array, in place.
+
+    NumPy arrays are shuffled by the generator's compiled Fisher-Yates loop. Other sequences draw
+    all of their random indices in one batch and then swap the elements in a Python loop.
     
     Parameters:
-        array (list): An array of integeres to be shuffled.
+        array (list or numpy.ndarray): An array of integeres to be shuffled.
+        seed (int or numpy.random.Generator): Seed of the random number generator, or a generator
+            to draw from. The same seed always gives the same order.
 
     Returns:
-        array (list): The shuffled array.
+        array (list or numpy.ndarray): The shuffled array.
 
     """
 
+    rng = np.random.default_rng(seed) # Create the generator (or reuse the one given)
+
+    if isinstance(array, np.ndarray): # Shuffle NumPy buffers without a Python loop
+        rng.shuffle(array)
+        return array
+
+    # Generate a random index between 0 and i for every i from the end of the array down to 1
+    highs = np.arange(len(array), 1, -1) # Exclusive upper bounds of the random indices
+    random_indices = rng.integers(0, highs).tolist() if len(highs) else []
+
     # Iterate through the array in reverse order
-    for i in range(len(array)-1, 0, -1):
-        random_index = random.randint(0, i) # Generate a random index between 0 and i
+    for i, random_index in zip(range(len(array) - 1, 0, -1), random_indices):
         array[i], array[random_index] = array[random_index], array[i] # Swap the element at the current index with the random element
 
-    return array
\ No newline at end of file
+    return array
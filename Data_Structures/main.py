@@ -39,8 +39,7 @@ array_2 = np.random.randint(0, 10001, 1000)
 # Inserting the random array into the AVL tree
 for key in array_2:
     avl_tree.insert(key)
-avl_tree.statistics.set_height(avl_tree.root.height) # Set the height of the AVL tree
-avl_tree.statistics.set_leaves(avl_tree.get_leaves(avl_tree.root)) # Set the number of leaves in the AVL tree
+avl_tree.record_metrics() # Set the height and the number of leaves of the AVL tree
 avl_statistics = avl_tree.statistics.calculate_statistics() # Calculate the statistics of the AVL tree
 
 # Display the statistics of the AVL tree
@@ -53,8 +52,7 @@ print("Rotations:", avl_statistics["rotations"])
 # Inserting the random array into the Red-Black tree
 for key in array_2:
     rb_tree.insert(key)
-rb_tree.statistics.set_height(rb_tree.get_height()) # Set the height of the Red-Black tree
-rb_tree.statistics.set_leaves(rb_tree.get_leaves()) # Set the number of leaves in the Red-Black tree
+rb_tree.record_metrics() # Set the height and the number of leaves of the Red-Black tree
 rbt_statistics = rb_tree.statistics.calculate_statistics() # Calculate the statistics of the Red-Black tree
 
 # Display the statistics of the Red-Black tree
@@ -67,7 +65,7 @@ print("Rotations:", rbt_statistics["rotations"])
 # Inserting the random array into the Skip List
 for key in array_2:
     skip_list.insert(key)
-skip_list.statistics.set_levels(skip_list.head.level) # Set the number of levels in the Skip List
+skip_list.record_metrics() # Set the number of levels in the Skip List
 skip_list_statistics = skip_list.statistics.calculate_statistics() # Calculate the statistics of the Skip List
 
 # Display the statistics of the Skip List
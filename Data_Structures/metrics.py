@@ -0,0 +1,132 @@
+"""
+
+    Contains a single-pass, iterative engine for the structural metrics of the data structures.
+
+    tree_metrics walks an AVL Tree or a Red-Black Tree once, in post-order with an explicit
+    stack (so deep trees cannot overflow the recursion limit), and returns the number of nodes,
+    the height, the number of leaves, the black height and the distribution of the balance
+    factors. skip_list_metrics walks the bottom level of a Skip List once and returns the number
+    of nodes on every level.
+
+    The structures also keep their leaves, black height and level histogram up to date on every
+    insert and delete, so their record_metrics methods can fill in the statistics without a walk;
+    the engine is used after bulk loads and to check those counters.
+
+"""
+
+# Metrics of a binary search tree
+def tree_metrics(root, nil=None):
+
+    """
+
+    Function to measure a binary search tree in one iterative post-order traversal.
+
+    Parameters:
+        root (object): The root of the tree (AVL_Node or RB_Node).
+        nil (object): The node that marks a missing child: None for an AVL Tree, the sentinel for a Red-Black Tree.
+
+    Returns:
+        dict: The number of nodes, the height (number of nodes on the longest path from the
+        root to a leaf, 0 if the tree is empty), the number of leaves, the black height
+        (number of black nodes on every path from the root to nil, None for an AVL Tree) and the number of nodes with each balance factor (left height minus right height).
+
+    """
+
+    result = {"nodes": 0, "height": 0, "leaves": 0, "black_height": None, "balance_factors": {}}
+    if nil is not None: # Every path of a Red-Black Tree has the same number of black nodes, so follow the leftmost one
+        black = nil.color # The sentinel is always black
+        black_height = 0
+        node = root
+        while node is not nil:
+            if node.color == black:
+                black_height += 1
+            node = node.left
+        result["black_height"] = black_height
+    if root is nil: # An empty tree
+        return result
+
+    nodes = 0
+    leaves = 0
+    factors = {} # Number of nodes with each balance factor
+    heights = [] # Heights of the finished subtrees, the most recent last
+    stack = [(root, False)] # Node and whether its children have been visited
+
+    while stack:
+        node, visited = stack.pop()
+        left = node.left
+        right = node.right
+        if not visited: # Visit the children first, then come back to the node
+            stack.append((node, True))
+            if right is not nil:
+                stack.append((right, False))
+            if left is not nil:
+                stack.append((left, False))
+            continue
+
+        right_height = heights.pop() if right is not nil else 0 # The right subtree was finished last
+        left_height = heights.pop() if left is not nil else 0
+        nodes += 1
+        if left_height == 0 and right_height == 0: # Both children are missing
+            leaves += 1
+        factor = left_height - right_height
+        factors[factor] = factors.get(factor, 0) + 1
+        heights.append(1 + (left_height if factor >= 0 else right_height))
+
+    result["nodes"] = nodes
+    result["height"] = heights[0]
+    result["leaves"] = leaves
+    result["balance_factors"] = dict(sorted(factors.items()))
+    return result
+
+# Metrics of a Skip List
+def skip_list_metrics(skip_list):
+
+    """
+
+    Function to measure a Skip List in one walk along its bottom level.
+
+    Parameters:
+        skip_list (Skip_List): The Skip List to be measured.
+
+    Returns:
+        dict: The number of nodes, the highest level of a node, the number of nodes whose top
+        level is each level (level_histogram) and the number of nodes on each level
+        (level_counts), from level 0 up to the maximum level.
+
+    """
+
+    histogram = [0] * (skip_list.max_level + 1) # Number of nodes whose top level is each level
+    node = skip_list.head.forward[0]
+    while node is not None: # Walk along the bottom level
+        histogram[node.level] += 1
+        node = node.forward[0]
+    return {
+        "nodes": sum(histogram),
+        "levels": max((level for level, count in enumerate(histogram) if count), default=0),
+        "level_histogram": histogram,
+        "level_counts": level_counts(histogram),
+    }
+
+def level_counts(histogram):
+
+    """
+
+    Function to turn the number of nodes whose top level is each level into the number of nodes on each level.
+
+    A node is linked on every level up to its top level, so the count of a level is the sum of
+    the histogram from that level up.
+
+    Parameters:
+        histogram (list): The number of nodes whose top level is each level.
+
+    Returns:
+        list: The number of nodes on each level.
+
+    """
+
+    counts = [0] * len(histogram)
+    total = 0
+    for level in range(len(histogram) - 1, -1, -1): # Sum from the top level down
+        total += histogram[level]
+        counts[level] = total
+    return counts
@@ -0,0 +1,345 @@
+"""
+
+    Contains an opt-in profiler that times the phases of the data structures' operations.
+
+    Attaching a profiler to a structure replaces the phase methods (the descent in insert, the
+    rebalancing or fixup, the rotations, the statistics calls, ...) of its class and of the class
+    of its statistics with versions that time the calls made on that one structure, and
+    detaching puts the original methods back. The structure itself is never touched, so a
+    structure without a profiler, or after detach, runs exactly the same code as before:
+    profiling costs nothing when it is off.
+
+    Every phase records its number of calls, its total time, its self time (without the timed
+    phases it calls; for insert and delete, this is the descent) and a histogram of durations
+    in power-of-two nanosecond buckets. The results can be handed to exporter callbacks, for
+    example to append JSON lines to a file or to write a Prometheus text dump.
+
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+# Methods timed for each structure; the methods of the statistics are always timed
+PHASES = {
+    "AVL_Tree": ("insert", "attach_leaf", "rebalance_path", "left_rotation", "right_rotation",
+                 "left_right_rotation", "right_left_rotation", "search", "delete", "rebalance_after_delete"),
+    "RB_Tree": ("insert", "link_node", "fix_insert", "fix_red_uncle", "fix_black_uncle", "left_rotation",
+                "right_rotation", "search", "delete", "fix_delete"),
+    "Skip_List": ("insert", "random_level", "link_node", "search", "delete", "remove_node"),
+}
+
+STATISTICS_PHASE = "statistics" # Phase of every add_* and set_* call of the statistics
+
+PROFILED = set() # Classes whose methods are replaced by a profiler at the moment
+
+# Profiler of one structure
+class Profiler:
+    def __init__(self, exporters=None, clock=time.perf_counter_ns):
+        self.exporters = list(exporters or []) # Callbacks that receive the report in export
+        self.clock = clock # Clock in nanoseconds
+        self.structure = None # Structure the profiler is attached to
+        self.name = None # Class name of the last structure the profiler was attached to
+        self.patched = [] # Classes, names and original functions of the timed methods, to put them back in detach
+        self.stack = [] # Time spent in timed calls below each running timed call
+        self.reset() # Create the timings
+
+    def reset(self):
+
+        """
+
+        Function to reset the timings.
+
+        """
+
+        self.phases = {} # Calls, total time, self time and histogram of each phase
+
+    def attach(self, structure, phases=None):
+
+        """
+
+        Function to time the phases of a structure, until detach is called.
+
+        Parameters:
+            structure (object): The structure to be profiled.
+            phases (list): The names of the methods to be timed, or None for the ones in PHASES.
+
+        Returns:
+            Profiler: The profiler.
+
+        Raises:
+            RuntimeError: If the profiler is already attached, or another profiler is attached to a
+            structure of the same class or with statistics of the same class.
+            ValueError: If no phases are known for the structure.
+
+        """
+
+        if self.structure is not None:
+            raise RuntimeError("the profiler is already attached; call detach first")
+        if type(structure) in PROFILED or type(structure.statistics) in PROFILED:
+            raise RuntimeError("another profiler is attached to a structure of the same class or with the same class of statistics; detach it first")
+        name = type(structure).__name__
+        if phases is None:
+            if name not in PHASES:
+                raise ValueError(f"no phases are known for {name}; pass the names of the methods to be timed")
+            phases = PHASES[name]
+
+        self.structure = structure
+        self.name = name
+        self.patch(structure, {phase: phase for phase in phases})
+        statistics = structure.statistics
+        methods = [method for method in dir(type(statistics)) if method.startswith(("add_", "set_"))]
+        self.patch(statistics, {method: STATISTICS_PHASE for method in methods})
+        return self
+
+    def detach(self):
+
+        """
+
+        Function to stop timing the structure, which then runs its original methods again.
+
+        """
+
+        for owner_class, method, original in reversed(self.patched):
+            if original is None: # The method was inherited: the one of the base class is visible again
+                delattr(owner_class, method)
+            else:
+                setattr(owner_class, method, original)
+            PROFILED.discard(owner_class)
+        self.patched = []
+        self.structure = None
+
+    @contextmanager
+    def profiling(self, structure, phases=None):
+
+        """
+
+        Context manager that times the phases of a structure inside the block.
+
+        Parameters:
+            structure (object): The structure to be profiled.
+            phases (list): The names of the methods to be timed, or None for the ones in PHASES.
+
+        Yields:
+            Profiler: The profiler.
+
+        """
+
+        self.attach(structure, phases)
+        try:
+            yield self
+        finally:
+            self.detach()
+
+    def patch(self, owner, methods):
+
+        """
+
+        Function to replace methods of the class of an object with versions that time the calls on that object.
+
+        The class is patched rather than the object, because adding attributes to an object (or
+        changing its __class__) makes CPython fall back to slower attribute lookups on it for
+        the rest of its life, even once the profiler is gone. Methods that the object itself
+        overrides (such as the locked methods of Synchronised_Statistics) are not timed.
+
+        Parameters:
+            owner (object): The structure or its statistics.
+            methods (dict): The phase of each method to be timed.
+
+        """
+
+        owner_class = type(owner)
+        PROFILED.add(owner_class)
+        for method, phase in methods.items():
+            original = vars(owner_class).get(method) # None if the method is inherited
+            setattr(owner_class, method, self.timed(phase, getattr(owner_class, method), owner))
+            self.patched.append((owner_class, method, original))
+
+    def timed(self, phase, method, target):
+
+        """
+
+        Function to wrap a function of a class so that every call on one object is timed under a phase.
+
+        The stack holds, for every timed call that is running, the time spent in the timed calls
+        below it, so that each call can record its self time as well as its total time.
+
+        Parameters:
+            phase (str): The name of the phase.
+            method (callable): The function to be wrapped.
+            target (object): The object whose calls are timed; calls on other instances are passed straight through.
+
+        Returns:
+            callable: The timed method.
+
+        """
+
+        clock = self.clock
+        stack = self.stack
+        record = self.record
+
+        def call(instance, *args, **kwargs):
+            if instance is not target: # Another structure of the same class
+                return method(instance, *args, **kwargs)
+            stack.append(0) # No time below this call yet
+            start = clock()
+            try:
+                return method(instance, *args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                below = stack.pop()
+                if stack: # The caller spent this time in a timed call
+                    stack[-1] += elapsed
+                record(phase, elapsed, elapsed - below)
+        return call
+
+    def record(self, phase, elapsed, own):
+
+        """
+
+        Function to record one call of a phase.
+
+        Parameters:
+            phase (str): The name of the phase.
+            elapsed (int): The time of the call in nanoseconds.
+            own (int): The time of the call without the timed calls below it.
+
+        """
+
+        timing = self.phases.get(phase)
+        if timing is None:
+            timing = self.phases[phase] = {"calls": 0, "total_ns": 0, "self_ns": 0, "buckets": {}}
+        timing["calls"] += 1
+        timing["total_ns"] += elapsed
+        timing["self_ns"] += own
+        bucket = elapsed.bit_length() # The call took less than 2 ** bucket nanoseconds
+        timing["buckets"][bucket] = timing["buckets"].get(bucket, 0) + 1
+
+    def report(self):
+
+        """
+
+        Function to get the timings of every phase.
+
+        Returns:
+            dict: The structure's name and, for every phase, the number of calls, the total and
+            self time in nanoseconds, the mean time per call and the histogram of durations
+            (upper bound in nanoseconds and number of calls).
+
+        """
+
+        phases = {}
+        for phase, timing in self.phases.items():
+            phases[phase] = {
+                "calls": timing["calls"],
+                "total_ns": timing["total_ns"],
+                "self_ns": timing["self_ns"],
+                "mean_ns": timing["total_ns"] / timing["calls"],
+                "histogram": {2 ** bucket: count for bucket, count in sorted(timing["buckets"].items())},
+            }
+        return {"structure": self.name, "phases": phases}
+
+    def export(self):
+
+        """
+
+        Function to hand the report to every exporter.
+
+        Returns:
+            dict: The report.
+
+        """
+
+        report = self.report()
+        for exporter in self.exporters:
+            exporter(report)
+        return report
+
+# Exporter that appends one JSON line per report
+def json_lines_exporter(path):
+
+    """
+
+    Function to create an exporter that appends every report to a file as one line of JSON.
+
+    Parameters:
+        path (str): The path of the file.
+
+    Returns:
+        callable: The exporter.
+
+    """
+
+    def export(report):
+        line = {"time": time.time(), **report}
+        with open(path, "a") as file:
+            file.write(json.dumps(line) + "\n")
+    return export
+
+# Exporter that writes a Prometheus text dump
+def prometheus_exporter(path, prefix="ds_phase"):
+
+    """
+
+    Function to create an exporter that writes every report to a file in the Prometheus text format.
+
+    The file is replaced by each export, like a scrape of the latest values.
+
+    Parameters:
+        path (str): The path of the file.
+        prefix (str): The prefix of the metric names.
+
+    Returns:
+        callable: The exporter.
+
+    """
+
+    def export(report):
+        with open(path, "w") as file:
+            file.write(prometheus_text(report, prefix))
+    return export
+
+def prometheus_text(report, prefix="ds_phase"):
+
+    """
+
+    Function to format a report in the Prometheus text format.
+
+    Parameters:
+        report (dict): The report of a profiler.
+        prefix (str): The prefix of the metric names.
+
+    Returns:
+        str: The metrics, one per line.
+
+    """
+
+    structure = report["structure"] or ""
+    lines = [
+        f"# HELP {prefix}_calls_total Number of calls of each phase.",
+        f"# TYPE {prefix}_calls_total counter",
+    ]
+    for phase, timing in report["phases"].items():
+        lines.append(f'{prefix}_calls_total{{structure="{structure}",phase="{phase}"}} {timing["calls"]}')
+
+    lines += [
+        f"# HELP {prefix}_self_seconds_total Time spent in each phase, without the phases it calls.",
+        f"# TYPE {prefix}_self_seconds_total counter",
+    ]
+    for phase, timing in report["phases"].items():
+        lines.append(f'{prefix}_self_seconds_total{{structure="{structure}",phase="{phase}"}} {timing["self_ns"] / 1e9}')
+
+    lines += [
+        f"# HELP {prefix}_duration_seconds Duration of the calls of each phase.",
+        f"# TYPE {prefix}_duration_seconds histogram",
+    ]
+    for phase, timing in report["phases"].items():
+        labels = f'structure="{structure}",phase="{phase}"'
+        cumulative = 0 # Prometheus buckets count every call up to their bound
+        for bound, count in timing["histogram"].items():
+            cumulative += count
+            lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="{bound / 1e9}"}} {cumulative}')
+        lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="+Inf"}} {timing["calls"]}')
+        lines.append(f'{prefix}_duration_seconds_sum{{{labels}}} {timing["total_ns"] / 1e9}')
+        lines.append(f'{prefix}_duration_seconds_count{{{labels}}} {timing["calls"]}')
+    return "\n".join(lines) + "\n"
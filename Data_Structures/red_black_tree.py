@@ -1,154 +1,1497 @@
 import ds_statistics as ds_stats
-import unittest
+import numpy as np
+from bisect import bisect_left, bisect_right
+from bulk_load import sorted_keys, should_rebuild, merge_items
+from duplicates import ALLOW, IGNORE, REPLACE, check_policy, drop_duplicates
+import snapshot
+from frozen import Frozen_Tree
+from metrics import tree_metrics
 
 # Implementation of a Red-Black Tree
 
+# Colors of the nodes, stored as small integers instead of strings
+RED = 0
+BLACK = 1
+
 # Node for Red-Black Tree
 class RB_Node:
-    def __init__(self, key, color): # Constructor
+    def __init__(self, key, color, nil, value=None): # Constructor
         self.key = key # Key of the node
-        self.left = Nil # Left child
-        self.right = Nil # Right child
-        self.parent = Nil # Parent of the node
+        self.value = value # Value stored with the key
+        self.left = nil # Left child
+        self.right = nil # Right child
+        self.parent = nil # Parent of the node
         self.color = color # Color of the node
+        self.size = 1 # Number of nodes in the subtree (only kept up to date with order statistics)
+
+# Slotted node for the compact storage mode of the Red-Black Tree
+class Compact_RB_Node:
+    __slots__ = ("key", "value", "left", "right", "parent", "color", "size") # No per-instance dictionary
+    __init__ = RB_Node.__init__ # Same constructor as RB_Node
+
+# Leaf (NIL) node for Red-Black Tree
+class NIL_Node:
+    __slots__ = ("key", "left", "right", "parent", "color", "size")
+
+    def __init__(self):
+        self.key = None
+        self.left = None
+        self.right = None
+        self.parent = None
+        self.color = BLACK
+        self.size = 0
+
+# Red-Black Tree
+class RB_Tree:
+    def __init__(self, order_statistics=False, compact=False, statistics=None, append_mode=False, duplicates=ALLOW):
+        self.nil = NIL_Node() # Sentinel for the leaves and the parent of the root, compared by identity
+        self.root = self.nil
+        self.count = 0 # Number of keys in the tree
+        self.leaves = 0 # Number of leaves, kept up to date by every insert, delete and rotation
+        self.black_height = 0 # Number of black nodes on every path from the root to nil, kept up to date by the fixups
+        self.statistics = ds_stats.Statistics() if statistics is None else statistics # Keeps track of the statistics
+        self.order_statistics = order_statistics # Whether subtree sizes are kept for rank and select
+        self.node_class = Compact_RB_Node if compact else RB_Node # Slotted nodes use less memory per key
+        self.append_mode = append_mode # Whether keys at or above the maximum are attached below it directly
+        self.maximum = None # Node with the largest key, None when it has to be found again
+        self.duplicates = check_policy(duplicates) # What insert does with a key that is already in the tree (see duplicates.py)
+
+    # Bulk-load constructors
+    @classmethod
+    def from_sorted(cls, iterable, **options):
+
+        """
+
+        Function to build a balanced Red-Black Tree from keys in ascending order in O(n).
+
+        Parameters:
+            iterable (iterable): The keys in ascending order (list, generator or NumPy array).
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            RB_Tree: The new Red-Black Tree.
+
+        """
+
+        tree = cls(**options) # Create an empty tree
+        tree.build_from_sorted(sorted_keys(iterable, presorted=True)) # Build the tree from the sorted keys
+        return tree
+
+    @classmethod
+    def from_iterable(cls, iterable, **options):
+
+        """
+
+        Function to build a balanced Red-Black Tree from keys in any order.
+
+        The keys are sorted once in O(n log n) and the tree is then built in O(n).
+
+        Parameters:
+            iterable (iterable): The keys to be inserted (list, generator or NumPy array).
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            RB_Tree: The new Red-Black Tree.
+
+        """
+
+        tree = cls(**options) # Create an empty tree
+        tree.build_from_sorted(sorted_keys(iterable)) # Sort the keys once and build the tree
+        return tree
+
+    def build_from_sorted(self, keys, values=None):
+
+        """
+
+        Function to replace the contents of the tree with a balanced tree of sorted keys.
+
+        Splitting at the middle key puts every leaf on the last two levels, so colouring the
+        deepest level red and every other node black gives the same black height on every path.
+        Duplicate keys are kept or dropped following the duplicate policy. The height and the
+        number of leaves are recorded in the statistics.
+
+        Parameters:
+            keys (list): The keys in ascending order.
+            values (list): The value of each key, or None to store no values.
+
+        """
+
+        keys, values = drop_duplicates(keys, values, self.duplicates) # Apply the duplicate policy
+        height = max(len(keys).bit_length() - 1, 0) # Depth of the deepest level of the balanced tree
+        self.root = self.build_balanced(keys, 0, len(keys) - 1, self.nil, 0, height, values) # Build the tree from the middle outwards
+        self.root.color = BLACK # The root is always black
+        self.count = len(keys) # Number of keys in the tree
+        self.maximum = None # The old maximum is gone
+        self.count_metrics() # Count the leaves and the black height of the new tree once
+        self.statistics.set_height(height) # Set the height of the tree
+        self.statistics.set_leaves(self.leaves) # Set the number of leaves in the tree
+
+    def build_balanced(self, keys, low, high, parent, depth, red_depth, values=None):
+
+        """
+
+        Recursive function to build a balanced subtree from a slice of sorted keys.
+
+        Parameters:
+            keys (list): The keys in ascending order.
+            low (int): The index of the first key in the subtree.
+            high (int): The index of the last key in the subtree.
+            parent (RB_Node): The parent of the root of the subtree.
+            depth (int): The depth of the root of the subtree.
+            red_depth (int): The depth at which nodes are coloured red.
+            values (list): The value of each key, or None to store no values.
+
+        Returns:
+            RB_Node: The root of the subtree.
+
+        """
+
+        if low > high: # If the slice is empty, there is no subtree
+            return self.nil
+
+        middle = (low + high) // 2 # The middle key becomes the root of the subtree
+        color = RED if depth == red_depth and depth > 0 else BLACK # Only the deepest level is red
+        node = self.node_class(keys[middle], color, self.nil, None if values is None else values[middle]) # Create the root of the subtree
+        node.parent = parent # Set the parent of the root
+        node.left = self.build_balanced(keys, low, middle - 1, node, depth + 1, red_depth, values) # Build the left subtree
+        node.right = self.build_balanced(keys, middle + 1, high, node, depth + 1, red_depth, values) # Build the right subtree
+        node.size = high - low + 1 # Number of nodes in the subtree
+
+        return node
+
+    # Snapshots
+    def save(self, path):
+
+        """
+
+        Function to save the Red-Black Tree to a snapshot file (see snapshot.py).
+
+        The keys are stored in order with the colour, the depth and the value of each node.
+
+        Parameters:
+            path (str): The path of the file.
+
+        """
+
+        nil = self.nil
+        keys = [] # Keys in order
+        values = [] # Value of each node
+        colors = [] # Color of each node
+        depths = [] # Depth of each node
+        stack = [] # Nodes whose left subtree is being visited, with their depths
+        node = self.root
+        depth = 0
+        while stack or node is not nil: # In-order traversal without recursion
+            while node is not nil: # Go down to the leftmost node
+                stack.append((node, depth))
+                node = node.left
+                depth += 1
+            node, depth = stack.pop()
+            keys.append(node.key)
+            values.append(node.value)
+            colors.append(node.color)
+            depths.append(depth)
+            node = node.right # Visit the right subtree next
+            depth += 1
+
+        snapshot.write_snapshot(path, "RB_Tree", keys, colors, depths, values=values, duplicates=self.duplicates)
+
+    @classmethod
+    def load(cls, path, mmap=True, **options):
+
+        """
+
+        Function to load a Red-Black Tree from a snapshot file in O(n), without calling insert.
+
+        The tree gets the duplicate policy it was saved with, unless duplicates is passed.
+
+        Parameters:
+            path (str): The path of the file.
+            mmap (bool): If True, the file is memory-mapped while the tree is rebuilt.
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            RB_Tree: The Red-Black Tree saved in the file.
+
+        Raises:
+            ValueError: If the file is not a snapshot of a Red-Black Tree.
+
+        """
+
+        data = snapshot.read_snapshot(path, "RB_Tree", mmap)
+        if data.duplicates is not None: # Keep the policy the tree was saved with
+            options.setdefault("duplicates", data.duplicates)
+        tree = cls(**options) # Create an empty tree
+        tree.build_from_snapshot(data)
+        return tree
+
+    def build_from_snapshot(self, data):
+
+        """
+
+        Function to replace the contents of the tree with the nodes of a snapshot.
+
+        Parameters:
+            data (snapshot.Snapshot): The snapshot of a Red-Black Tree.
+
+        """
+
+        nil = self.nil
+        values = data.value_list()
+        if values is None: # No key has a value
+            nodes = [self.node_class(key, color, nil) for key, color in zip(data.keys.tolist(), data.aux.tolist())] # Create the nodes in order
+        else:
+            nodes = [self.node_class(key, color, nil, value) for key, color, value in zip(data.keys.tolist(), data.aux.tolist(), values)]
+        depths = data.depths.tolist()
+        self.root = snapshot.link_tree(nodes, depths, nil, self.order_statistics) # Link the nodes
+        self.count = len(nodes) # Number of keys in the tree
+        self.maximum = None # The old maximum is gone
+        self.count_metrics() # Count the leaves and the black height of the loaded tree once
+        self.statistics.set_height(max(depths, default=0)) # The height is the depth of the deepest node
+        self.statistics.set_leaves(self.leaves) # Set the number of leaves in the tree
+
+    def freeze(self):
+
+        """
+
+        Function to make a read-only copy of the Red-Black Tree for vectorised batch lookups.
+
+        The copy does not follow later changes to the tree.
+
+        Returns:
+            Frozen_Tree: The keys of the tree in Eytzinger layout (see frozen.py).
+
+        """
+
+        return Frozen_Tree(np.asarray(list(self))) # The in-order walk gives the keys in ascending order
+
+    # Insert
+    def insert(self, key, value=None, duplicates=None):
+
+        """
+
+        Function to insert a key into the Red-Black Tree.
+
+        In append mode, a key at or above the current maximum is attached below the maximum
+        directly (see append).
+
+        Parameters:
+            key (int): The key to be inserted.
+            value (object): The value stored with the key.
+            duplicates (str): The policy for a key that is already in the tree, or None for the tree's policy.
+
+        Returns:
+            RB_Node: The node holding the key.
+
+        """
+
+        if duplicates is None: # Use the policy of the tree
+            duplicates = self.duplicates
+        if self.append_mode and self.root is not self.nil: # Check for a key at or above the maximum
+            maximum = self.find_maximum()
+            if key >= maximum.key:
+                return self.append(key, maximum, value, duplicates)
+
+        steps = 0  # Initialise steps
+        nil = self.nil # Local reference to the sentinel for the identity checks in the loop
+        counting = self.order_statistics # Whether subtree sizes are kept
+
+        parent_node = nil # Keep track of the parent node when inserting
+        current_node = self.root # Start searching at the root 
+
+        # Search for the correct position to insert the new node
+        while current_node is not nil: # While a nil node is not reached
+            steps += 1 # Increment the number of steps
+            parent_node = current_node # Update the parent node
+            if counting: # The subtree gains one node
+                current_node.size += 1
+            if key < current_node.key: # If the new node's key is less than the current node's key
+                current_node = current_node.left # Move to the left
+            else:
+                current_node = current_node.right # Move to the right
+
+        if duplicates != ALLOW: # Check whether the key is in the tree already
+            existing = self.find_duplicate(parent_node, key)
+            if existing is not None:
+                if counting: # The walk counted a new node that is not linked
+                    ancestor = parent_node
+                    while ancestor is not nil:
+                        ancestor.size -= 1
+                        ancestor = ancestor.parent
+                return self.keep_duplicate(existing, value, duplicates, steps)
+
+        new_node = self.link_node(parent_node, key, value) # Attach the new node and fix the tree
+
+        self.statistics.add_step(steps)
+        return new_node
+
+    def find_duplicate(self, parent_node, key):
+
+        """
+
+        Function to find the node that already holds a key, from the parent of the key's new position.
+
+        The copies of the key on the path are ancestors of the new position where the walk
+        went right. The first of them from the root is the node that search returns, so that
+        is the copy IGNORE and REPLACE act on. No copy can be above an ancestor with a smaller
+        key, so the climb stops there.
+
+        Parameters:
+            parent_node (RB_Node): The parent of the new node's position.
+            key (int): The key to be inserted.
+
+        Returns:
+            RB_Node: The node holding the key, or None if the key is not in the tree.
+
+        """
+
+        found = None # Highest copy of the key seen so far
+        node = parent_node
+        while node is not self.nil and node.key >= key: # Climb until a smaller key
+            if node.key == key:
+                found = node
+            node = node.parent
+        return found
+
+    def keep_duplicate(self, node, value, duplicates, steps):
+
+        """
+
+        Function to apply the IGNORE or REPLACE policy to the node that already holds a key.
+
+        Parameters:
+            node (RB_Node): The node holding the key.
+            value (object): The value that was to be inserted.
+            duplicates (str): The duplicate policy.
+            steps (int): The number of steps of the insertion.
+
+        Returns:
+            RB_Node: The node.
+
+        """
+
+        if duplicates == REPLACE: # Update the value in place
+            node.value = value
+        self.statistics.add_step(steps) # Add the number of steps
+        self.statistics.add_rotation(0) # Nothing was linked, so nothing was rotated
+        return node
+
+    def find_maximum(self):
+
+        """
+
+        Function to get the node with the largest key in the Red-Black Tree.
+
+        The node is cached: rotations move it but never replace it, so it only has to be found
+        again in O(log n) after it is deleted or the tree is rebuilt.
+
+        Returns:
+            RB_Node: The node with the largest key, or nil if the tree is empty.
+
+        """
+
+        if self.maximum is None: # Walk down the right spine again
+            node = self.root
+            while node.right is not self.nil:
+                node = node.right
+            self.maximum = node
+        return self.maximum
+
+    def append(self, key, maximum, value=None, duplicates=ALLOW):
+
+        """
+
+        Function to insert a key at or above the maximum of the Red-Black Tree without a search from the root.
+
+        The new node is attached as the right child of the maximum and fix_insert only walks up
+        from there, recoloring and rotating along the right spine.
+
+        Parameters:
+            key (int): The key to be inserted.
+            maximum (RB_Node): The node with the largest key, from find_maximum.
+            value (object): The value stored with the key.
+            duplicates (str): The policy for a key equal to the maximum.
+
+        Returns:
+            RB_Node: The node holding the key.
+
+        """
+
+        if duplicates != ALLOW and maximum.key == key: # The maximum holds the key already
+            return self.keep_duplicate(self.find_duplicate(maximum, key), value, duplicates, 1) # The right spine is the path of the key
+
+        if self.order_statistics: # Every node on the right spine gains one node in its subtree
+            ancestor = maximum
+            while ancestor is not self.nil:
+                ancestor.size += 1
+                ancestor = ancestor.parent
+
+        new_node = self.link_node(maximum, key, value) # Attach the new node and fix the tree
+        self.statistics.add_step(1) # Only the maximum was visited
+        return new_node
+
+    def link_node(self, parent_node, key, value=None):
+
+        """
+
+        Function to attach a new red node below a parent and fix the Red-Black Tree.
+
+        Parameters:
+            parent_node (RB_Node): The parent of the new node, or nil if the tree is empty.
+            key (int): The key to be inserted.
+            value (object): The value stored with the key.
+
+        Returns:
+            RB_Node: The new node.
+
+        """
+
+        # Create a new node and default color it to red
+        new_node = self.node_class(key, RED, self.nil, value)
+
+        # Set the parent of the new node
+        new_node.parent = parent_node
+
+        if parent_node is self.nil: # If the tree is empty
+            self.root = new_node # Set the new node as the root
+            self.leaves = 1 # The root is the only leaf
+        elif key >= parent_node.key: # If the new node's key is greater than or equal to the parent node's key
+            if parent_node.left is not self.nil: # The parent was not a leaf, so there is one more leaf
+                self.leaves += 1
+            parent_node.right = new_node # Set the new node as the right child
+        else:
+            if parent_node.right is not self.nil: # The parent was not a leaf, so there is one more leaf
+                self.leaves += 1
+            parent_node.left = new_node # Set the new node as the left child
+        self.count += 1 # One more key in the tree
+        if self.maximum is not None and key >= self.maximum.key: # The new node is the new maximum
+            self.maximum = new_node
+
+        self.fix_insert(new_node) # Fix the tree after insertion
+
+        return new_node
+
+    def insert_many(self, keys, rebuild=None):
+
+        """
+
+        Function to insert a batch of keys into the Red-Black Tree.
+
+        The batch is sorted once. Small batches are inserted in ascending order, and each key
+        starts its search from the node of the previous key instead of from the root: the walk
+        climbs the parent pointers only until it reaches a subtree whose range holds the key.
+        The steps and rotations of every key are recorded as for insert, so the steps count only
+        the nodes actually visited. Large batches (see bulk_load.REBUILD_FRACTION) are merged
+        with the keys and values of the tree and the tree is rebuilt in O(n + m) without per-key statistics.
+
+        The batch has no values: new keys hold None, and under REPLACE (as under IGNORE) a key
+        that is already stored keeps its value. Use [] or insert to change values.
+
+        Parameters:
+            keys (iterable): The keys to be inserted (list, generator or NumPy array).
+            rebuild (bool): True to always rebuild, False to never rebuild, None to decide from the sizes.
+
+        """
+
+        keys = sorted_keys(keys) # Sort the batch once
+        if should_rebuild(len(keys), self.count, rebuild): # Merge the batch in and rebuild the tree
+            self.build_from_sorted(*merge_items(self, keys))
+            return
+
+        nil = self.nil # Local reference to the sentinel for the identity checks in the loops
+        finger = nil # Node of the previous key
+
+        for key in keys:
+            steps = 0 # Initialise the number of steps
+            current_node = self.root # Start searching at the root unless the finger is closer
+
+            if finger is not nil:
+                # Climb until the node is a left child whose parent is greater than the key:
+                # its subtree then holds every key between the previous key and the parent
+                current_node = finger
+                while current_node.parent is not nil:
+                    if current_node is current_node.parent.left and key < current_node.parent.key:
+                        break
+                    current_node = current_node.parent
+                    steps += 1 # Increment the number of steps
+
+            parent_node = nil # Keep track of the parent node when inserting
+
+            # Search for the correct position to insert the new node
+            while current_node is not nil: # While a nil node is not reached
+                steps += 1 # Increment the number of steps
+                parent_node = current_node # Update the parent node
+                if key < current_node.key: # If the new node's key is less than the current node's key
+                    current_node = current_node.left # Move to the left
+                else:
+                    current_node = current_node.right # Move to the right
+
+            if self.duplicates != ALLOW: # Check whether the key is in the tree already
+                existing = self.find_duplicate(parent_node, key)
+                if existing is not None:
+                    finger = self.keep_duplicate(existing, None, IGNORE, steps) # The batch has no value to replace the stored one with
+                    continue
+
+            if self.order_statistics: # Every ancestor of the new node gains one node in its subtree
+                ancestor = parent_node
+                while ancestor is not nil:
+                    ancestor.size += 1
+                    ancestor = ancestor.parent
+
+            finger = self.link_node(parent_node, key) # Attach the new node and fix the tree
+
+            self.statistics.add_step(steps)
+
+
+    # Fixing the Red-Black Tree after insertion     
+    def fix_insert(self, node):
+
+        """
+
+        Function to fix the Red-Black Tree after insertion.
+
+        Parameters:
+            node (RB_Node): The node to start fixing the tree from.
+
+        """
+
+        rotations = 0 # Initialise the number of rotations
+
+        while node.parent.color == RED and node is not self.root:  # While the parent of the node is red and the node is not the root
+            grandparent = node.parent.parent # The grandparent exists because a red parent is never the root
+            if node.parent is grandparent.left:  # If the parent of the node is a left child
+                uncle = grandparent.right  # Get the right uncle of the node
+            else: 
+                uncle = grandparent.left  # Get the left uncle of the node
+
+            if uncle.color == RED:  # If the uncle of the node is red
+                self.fix_red_uncle(node, uncle)  # Fix the tree
+                node = node.parent.parent # Move up the tree
+            else: 
+                node = self.fix_black_uncle(node) # Fix the tree and continue from the node it returns
+                rotations += 1 # Increment the number of rotations
+
+        self.statistics.add_rotation(rotations) # Add the number of rotations
+        if self.root.color == RED: # Blackening a red root adds one black node to every path
+            self.black_height += 1
+        self.root.color = BLACK  # Set the root to black
+
+
+       # Fixing the tree when the uncle of a node is red
+    def fix_red_uncle(self, node, uncle):
+                
+        """
+    
+        Function to fix the tree when the uncle of a node is red.
+    
+        Parameters:
+            node (RB_Node): The node to fix the tree from.
+            uncle (RB_Node): The uncle of the node.
+    
+        """
+    
+        node.parent.color = BLACK # Set the parent to black
+        uncle.color = BLACK # Set the uncle to black
+        node.parent.parent.color = RED # Set the grandparent to red
+
+    # Fixing the tree when the uncle of a node is black
+    def fix_black_uncle(self, node):
+                    
+        """
+
+        Function to fix the tree when the uncle of a node is black.
+
+        Parameters:
+            node (RB_Node): The node to fix the tree from.
+
+        Returns:
+            RB_Node: The red node whose parent is now black, where the fixing continues.
+
+        """
+
+        if node.parent is node.parent.parent.left: # If the parent of the node is a left child
+            if node is node.parent.right: # If the node is a right child
+                node = node.parent # Move up the tree
+                self.left_rotation(node) # Perform a left rotation
+            node.parent.color = BLACK # Set the parent to black
+            node.parent.parent.color = RED  # Set the grandparent to red
+            self.right_rotation(node.parent.parent) # Perform a right rotation
+        else: 
+            if node is node.parent.left: # If the node is a left child
+                node = node.parent # Move up the tree
+                self.right_rotation(node) # Perform a right rotation
+            node.parent.color = BLACK # Set the parent to black
+            node.parent.parent.color = RED # Set the grandparent to red
+            self.left_rotation(node.parent.parent) # Perform a left rotation
+
+        return node
+
+
+    # Search
+    def search(self, key):
+
+        """
+
+        Function to search for a key in the Red-Black Tree.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            RB_Node: The node holding the key, or None if the key is not in the tree.
+
+        """
+
+        node, steps = self.find_node(key) # Search for the node
+        self.statistics.add_search_step(steps) # Add the number of steps
+        return None if node is self.nil else node
+
+    def __contains__(self, key):
+
+        """
+
+        Function to check whether a key is in the Red-Black Tree.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            bool: True if the key is in the tree.
+
+        """
+
+        return self.search(key) is not None
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of keys in the Red-Black Tree.
+
+        Returns:
+            int: The number of keys.
+
+        """
+
+        return self.count
+
+    # Ordered map
+    def __getitem__(self, key):
+
+        """
+
+        Function to get the value stored with a key.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            object: The value of the key.
+
+        Raises:
+            KeyError: If the key is not in the tree.
+
+        """
+
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
+    def __setitem__(self, key, value):
+
+        """
+
+        Function to store a value with a key, updating it in place if the key is in the tree already.
+
+        Parameters:
+            key (int): The key.
+            value (object): The value to be stored.
+
+        """
+
+        self.insert(key, value, REPLACE)
+
+    def __delitem__(self, key):
+
+        """
+
+        Function to delete a key and its value.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Raises:
+            KeyError: If the key is not in the tree.
+
+        """
+
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+
+        """
+
+        Function to get the value stored with a key, or a default if the key is not in the tree.
+
+        Parameters:
+            key (int): The key to be searched for.
+            default (object): The value returned if the key is not in the tree.
+
+        Returns:
+            object: The value of the key, or the default.
+
+        """
+
+        node = self.search(key)
+        return default if node is None else node.value
+
+    def setdefault(self, key, default=None):
+
+        """
+
+        Function to get the value stored with a key, inserting the key with a default value first if it is not in the tree.
+
+        Only one walk down the tree is needed in both cases.
+
+        Parameters:
+            key (int): The key.
+            default (object): The value stored if the key is not in the tree.
+
+        Returns:
+            object: The value of the key.
+
+        """
+
+        return self.insert(key, default, IGNORE).value
+
+    def items(self, low=None, high=None):
+
+        """
+
+        Function to iterate over the keys between two bounds and their values in ascending order of key.
+
+        Parameters:
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+
+        Returns:
+            generator: The (key, value) pairs.
+
+        """
+
+        return self.walk(low, high, False, True)
+
+    def values(self):
+
+        """
+
+        Function to iterate over the values in ascending order of key.
+
+        Returns:
+            generator: The values.
+
+        """
+
+        return (value for _, value in self.items())
+
+    # Batch lookups
+    def search_many(self, queries):
+
+        """
+
+        Function to search for every key of an array in the Red-Black Tree.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: The node holding each key, or None if the key is not in the tree (object array).
+
+        """
+
+        nodes, _ = self.find_many(queries)
+        return nodes
+
+    def contains_many(self, queries):
+
+        """
+
+        Function to check whether every key of an array is in the Red-Black Tree.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: True for every key that is in the tree.
+
+        """
+
+        _, found = self.find_many(queries)
+        return found
+
+    def find_many(self, queries):
+
+        """
+
+        Function to search for a batch of keys with one traversal of the tree.
+
+        The queries are sorted once and walk down together: every node splits the sorted
+        queries that reach it into the ones below, equal to and above its key, so each node is
+        visited at most once for the whole batch. Each query still records the number of nodes
+        on its own path, as search would, and the steps are added to the statistics as one array.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: The node holding each key, or None (object array).
+            numpy.ndarray: True for every key that is in the tree.
+
+        """
+
+        queries = np.asarray(queries).ravel()
+        order = np.argsort(queries, kind="stable") # Position of each query in sorted order
+        sorted_queries = queries[order].tolist() # Python scalars are faster to bisect
+        count = len(sorted_queries)
+        sorted_nodes = [None] * count # Node found for each query, in sorted order
+        sorted_steps = [0] * count # Number of steps of each query, in sorted order
+
+        stack = [(self.root, 0, count, 1)] # Subtree, range of sorted queries that reach it, and its depth
+        while stack:
+            node, low, high, depth = stack.pop()
+            if node is self.nil: # The queries fell off the tree after depth - 1 nodes
+                sorted_steps[low:high] = [depth - 1] * (high - low)
+                continue
+
+            first = bisect_left(sorted_queries, node.key, low, high) # First query not less than the key
+            last = bisect_right(sorted_queries, node.key, first, high) # First query greater than the key
+            if first < last: # The queries equal to the key stop here
+                sorted_nodes[first:last] = [node] * (last - first)
+                sorted_steps[first:last] = [depth] * (last - first)
+            if low < first: # The smaller queries continue on the left
+                stack.append((node.left, low, first, depth + 1))
+            if last < high: # The larger queries continue on the right
+                stack.append((node.right, last, high, depth + 1))
+
+        # Put the results back in the order of the queries
+        nodes = np.empty(count, dtype=object)
+        nodes[order] = sorted_nodes
+        steps = np.empty(count, dtype=np.int64)
+        steps[order] = sorted_steps
+        self.statistics.add_search_steps(steps) # Add the number of steps of every query
+        return nodes, np.not_equal(nodes, None)
+
+    def find_node(self, key):
+
+        """
+
+        Function to find the node holding a key without recording any statistics.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            RB_Node: The node holding the key, or the nil sentinel if the key is not in the tree.
+            int: The number of steps taken.
+
+        """
+
+        steps = 0 # Initialise the number of steps
+        node = self.root # Start searching at the root
+
+        while node is not self.nil: # While a nil node is not reached
+            steps += 1 # Increment the number of steps
+            if key == node.key: # If the key is found
+                break
+            elif key < node.key: # If the key is less than the current node's key
+                node = node.left # Move to the left
+            else: # If the key is greater than the current node's key
+                node = node.right # Move to the right
+
+        return node, steps
+
+    # Deletion
+    def delete(self, key):
+
+        """
+
+        Function to delete one occurrence of a key from the Red-Black Tree.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Returns:
+            bool: True if the key was found and deleted.
+
+        """
+
+        node, steps = self.find_node(key) # Search for the node
+
+        if node is self.nil: # If the key is not in the tree
+            self.statistics.add_delete_step(steps) # Add the number of steps
+            self.statistics.add_delete_rotation(0) # Add the number of rotations
+            return False
+
+        extra_steps, rotations = self.delete_node(node) # Remove the node and fix the tree
+        self.statistics.add_delete_step(steps + extra_steps) # Add the number of steps
+        self.statistics.add_delete_rotation(rotations) # Add the number of rotations
+        return True
+
+    def pop_min(self):
+
+        """
+
+        Function to remove and return the smallest key in the Red-Black Tree.
+
+        Returns:
+            int: The smallest key.
+
+        Raises:
+            KeyError: If the tree is empty.
+
+        """
+
+        return self.pop_end("left")
+
+    def pop_max(self):
+
+        """
+
+        Function to remove and return the largest key in the Red-Black Tree.
+
+        Returns:
+            int: The largest key.
 
-# Leaf (NIL) node for Red-Black Tree
-class NIL_Node:
-    def __init__(self):
-        self.key = None
-        self.left = None
-        self.right = None
-        self.parent = None
-        self.color = "Black"
+        Raises:
+            KeyError: If the tree is empty.
 
-# Global NIL node
-Nil = NIL_Node()
+        """
 
-# Red-Black Tree
-class RB_Tree:
-    def __init__(self):
-        self.root = Nil 
-        self.statistics = ds_stats.Statistics() # Keeps track of the statistics
+        return self.pop_end("right")
 
-    # Insert
-    def insert(self, key):
+    def pop_end(self, side):
 
         """
 
-        Function to insert a key into the Red-Black Tree.
+        Function to remove and return the key at the far left or far right of the Red-Black Tree.
 
         Parameters:
-            key (int): The key to be inserted.
+            side (str): "left" for the smallest key or "right" for the largest key.
+
+        Returns:
+            int: The key that was removed.
+
+        Raises:
+            KeyError: If the tree is empty.
 
         """
 
-        steps = 0  # Initialise steps
+        if self.root is self.nil: # If the tree is empty, there is nothing to remove
+            raise KeyError("pop from an empty tree")
 
-        # Create a new node and default color it to red
-        new_node = RB_Node(key, "Red")
+        steps = 1 # Initialise the number of steps
+        node = self.root # Start at the root
+        while getattr(node, side) is not self.nil: # Follow the left or right spine down
+            steps += 1 # Increment the number of steps
+            node = getattr(node, side)
 
-        parent_node = Nil # Keep track of the parent node when inserting
-        current_node = self.root # Start searching at the root 
+        extra_steps, rotations = self.delete_node(node) # Remove the node and fix the tree
+        self.statistics.add_delete_step(steps + extra_steps) # Add the number of steps
+        self.statistics.add_delete_rotation(rotations) # Add the number of rotations
+        return node.key
 
-        # Search for the correct position to insert the new node
-        while current_node != Nil: # While a nil node is not reached
+    def delete_node(self, node):
+
+        """
+
+        Function to unlink a node from the Red-Black Tree and fix the tree.
+
+        A node with two children is replaced by its in-order successor.
+
+        Parameters:
+            node (RB_Node): The node to be removed.
+
+        Returns:
+            int: The number of extra steps taken to find the successor.
+            int: The number of rotations performed.
+
+        """
+
+        steps = 0 # Initialise the number of extra steps
+        removed_color = node.color # Color of the node that leaves its position
+
+        if self.order_statistics: # Every ancestor of the position that disappears loses one node
+            ancestor = node.parent
+            if node.left is not self.nil and node.right is not self.nil: # The successor's position disappears instead
+                ancestor = node.right
+                while ancestor.left is not self.nil:
+                    ancestor = ancestor.left
+                ancestor = ancestor.parent
+            while ancestor is not self.nil:
+                ancestor.size -= 1
+                ancestor = ancestor.parent
+
+        if node.left is self.nil: # If the node has no left child
+            child = node.right # The right child takes its place
+            self.transplant(node, node.right)
+        elif node.right is self.nil: # If the node has no right child
+            child = node.left # The left child takes its place
+            self.transplant(node, node.left)
+        else: # If the node has two children
+            successor = node.right # The successor is the leftmost node of the right subtree
             steps += 1 # Increment the number of steps
-            parent_node = current_node # Update the parent node
-            if new_node.key < current_node.key: # If the new node's key is less than the current node's key
-                current_node = current_node.left # Move to the left
+            while successor.left is not self.nil:
+                successor = successor.left
+                steps += 1 # Increment the number of steps
+
+            removed_color = successor.color # The successor leaves its position
+            child = successor.right # The right child of the successor takes its place
+
+            if successor.parent is node: # If the successor is the right child of the node
+                child.parent = successor # Set the parent of the child (even if it is nil)
             else:
-                current_node = current_node.right # Move to the right
+                self.transplant(successor, successor.right) # Replace the successor with its right child
+                successor.right = node.right # The successor takes the right subtree of the node
+                successor.right.parent = successor
 
-        # Set the parent of the new node
-        new_node.parent = parent_node
+            self.transplant(node, successor) # Replace the node with the successor
+            successor.left = node.left # The successor takes the left subtree of the node
+            successor.left.parent = successor
+            successor.color = node.color # The successor takes the color of the node
+            successor.size = node.size # The successor takes the size of the node
 
-        if parent_node == Nil: # If the tree is empty
-            self.root = new_node # Set the new node as the root
-        elif new_node.key > parent_node.key: # If the new node's key is greater than the parent node's key
-            parent_node.right = new_node # Set the new node as the right child
-        else:
-            parent_node.left = new_node # Set the new node as the left child
+        if child is self.nil: # The node that left its position was a leaf
+            self.leaves -= 1
+            parent = child.parent # The transplants point nil at the parent of the empty position
+            if parent is not self.nil and parent.left is self.nil and parent.right is self.nil: # Its parent is a leaf now
+                self.leaves += 1
 
-        self.fix_insert(new_node) # Fix the tree after insertion
+        self.count -= 1 # One key less in the tree
+        if node is self.maximum: # The maximum has to be found again
+            self.maximum = None
 
-        self.statistics.add_step(steps)
+        rotations = 0 # Initialise the number of rotations
+        if removed_color == BLACK: # Removing a black node breaks the black height
+            rotations = self.fix_delete(child)
 
+        return steps, rotations
 
-    # Fixing the Red-Black Tree after insertion     
-    def fix_insert(self, node):
+    def transplant(self, node, replacement):
 
         """
 
-        Function to fix the Red-Black Tree after insertion.
+        Function to replace the subtree rooted at a node with another subtree.
 
         Parameters:
-            node (RB_Node): The node to start fixing the tree from.
+            node (RB_Node): The root of the subtree to be replaced.
+            replacement (RB_Node): The root of the replacement subtree (may be nil).
+
+        """
+
+        if node.parent is self.nil: # If the node is the root
+            self.root = replacement
+        elif node is node.parent.left: # If the node is a left child
+            node.parent.left = replacement
+        else: # If the node is a right child
+            node.parent.right = replacement
+        replacement.parent = node.parent # Set the parent of the replacement (even if it is nil)
+
+    # Fixing the Red-Black Tree after deletion
+    def fix_delete(self, node):
+
+        """
+
+        Function to fix the Red-Black Tree after deletion.
+
+        Parameters:
+            node (RB_Node): The node that took the place of the removed node (may be nil).
+
+        Returns:
+            int: The number of rotations performed.
 
         """
 
         rotations = 0 # Initialise the number of rotations
+        fixed = False # Whether case 4 has taken the extra black
 
-        while node.parent.color == "Red" and node != self.root:  # While the parent of the node is red and the node is not the root
-            if node.parent == node.parent.parent.left:  # If the parent of the node is a left child
-                uncle = node.parent.parent.right  # Get the right uncle of the node
-            else: 
-                uncle = node.parent.parent.left  # Get the left uncle of the node
+        while node is not self.root and node.color == BLACK: # While the node carries an extra black
+            if node is node.parent.left: # If the node is a left child
+                sibling = node.parent.right # Get the sibling of the node
+                if sibling.color == RED: # Case 1: the sibling is red
+                    sibling.color = BLACK
+                    node.parent.color = RED
+                    self.left_rotation(node.parent)
+                    rotations += 1 # Increment the number of rotations
+                    sibling = node.parent.right
+                if sibling.left.color == BLACK and sibling.right.color == BLACK: # Case 2: both nephews are black
+                    sibling.color = RED
+                    node = node.parent # Move the extra black up the tree
+                else:
+                    if sibling.right.color == BLACK: # Case 3: the far nephew is black
+                        sibling.left.color = BLACK
+                        sibling.color = RED
+                        self.right_rotation(sibling)
+                        rotations += 1 # Increment the number of rotations
+                        sibling = node.parent.right
+                    sibling.color = node.parent.color # Case 4: the far nephew is red
+                    node.parent.color = BLACK
+                    sibling.right.color = BLACK
+                    self.left_rotation(node.parent)
+                    rotations += 1 # Increment the number of rotations
+                    node = self.root # The tree is fixed
+                    fixed = True
+            else: # If the node is a right child
+                sibling = node.parent.left # Get the sibling of the node
+                if sibling.color == RED: # Case 1: the sibling is red
+                    sibling.color = BLACK
+                    node.parent.color = RED
+                    self.right_rotation(node.parent)
+                    rotations += 1 # Increment the number of rotations
+                    sibling = node.parent.left
+                if sibling.right.color == BLACK and sibling.left.color == BLACK: # Case 2: both nephews are black
+                    sibling.color = RED
+                    node = node.parent # Move the extra black up the tree
+                else:
+                    if sibling.left.color == BLACK: # Case 3: the far nephew is black
+                        sibling.right.color = BLACK
+                        sibling.color = RED
+                        self.left_rotation(sibling)
+                        rotations += 1 # Increment the number of rotations
+                        sibling = node.parent.left
+                    sibling.color = node.parent.color # Case 4: the far nephew is red
+                    node.parent.color = BLACK
+                    sibling.left.color = BLACK
+                    self.right_rotation(node.parent)
+                    rotations += 1 # Increment the number of rotations
+                    node = self.root # The tree is fixed
+                    fixed = True
 
-            if uncle.color == "Red":  # If the uncle of the node is red
-                self.fix_red_uncle(node, uncle)  # Fix the tree
-                node = node.parent.parent # Move up the tree
-            else: 
-                self.fix_black_uncle(node) # Fix the tree
-                rotations += 1 # Increment the number of rotations
+        if not fixed and node is self.root and node.color == BLACK: # The extra black is dropped at the root
+            self.black_height -= 1
+        node.color = BLACK # Absorb the extra black
+        return rotations
 
-        self.statistics.add_rotation(rotations) # Add the number of rotations
-        self.root.color = "Black"  # Set the root to black
+    # Ordered iteration
+    def __iter__(self):
 
+        """
+
+        Function to iterate over the keys in ascending order.
+
+        Returns:
+            generator: The keys in ascending order.
 
-       # Fixing the tree when the uncle of a node is red
-    def fix_red_uncle(self, node, uncle):
-                
         """
-    
-        Function to fix the tree when the uncle of a node is red.
-    
+
+        return self.range()
+
+    def __reversed__(self):
+
+        """
+
+        Function to iterate over the keys in descending order.
+
+        Returns:
+            generator: The keys in descending order.
+
+        """
+
+        return self.walk(None, None, True)
+
+    def range(self, low=None, high=None):
+
+        """
+
+        Function to iterate over the keys between two bounds in ascending order.
+
+        The keys are produced lazily in O(log n + k) time and with O(log n) memory.
+
         Parameters:
-            node (RB_Node): The node to fix the tree from.
-            uncle (RB_Node): The uncle of the node.
-    
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+
+        Returns:
+            generator: The keys between the bounds in ascending order.
+
         """
-    
-        node.parent.color = "Black" # Set the parent to black
-        uncle.color = "Black" # Set the uncle to black
-        node.parent.parent.color = "Red" # Set the grandparent to red
 
-    # Fixing the tree when the uncle of a node is black
-    def fix_black_uncle(self, node):
-                    
+        return self.walk(low, high, False)
+
+    def walk(self, low, high, reverse, items=False):
+
         """
 
-        Function to fix the tree when the uncle of a node is black.
+        Generator for an in-order walk of the keys between two bounds, using a stack instead of recursion.
+
+        Only the nodes on the path to the first key are pushed, so a consumer that stops early
+        does not pay for the rest of the tree.
 
         Parameters:
-            node (RB_Node): The node to fix the tree from.
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+            reverse (bool): If True, the keys are produced in descending order.
+            items (bool): If True, (key, value) pairs are produced instead of keys.
+
+        Yields:
+            int: The next key, or the next (key, value) pair.
 
         """
 
-        if node.parent == node.parent.parent.left: # If the parent of the node is a left child
-            if node == node.parent.right: # If the node is a right child
-                node = node.parent # Move up the tree
-                self.left_rotation(node) # Perform a left rotation
-            node.parent.color = "Black" # Set the parent to black
-            node.parent.parent.color = "Red"  # Set the grandparent to red
-            self.right_rotation(node.parent.parent) # Perform a right rotation
-        else: 
-            if node == node.parent.left: # If the node is a left child
-                node = node.parent # Move up the tree
-                self.right_rotation(node) # Perform a right rotation
-            node.parent.color = "Black" # Set the parent to black
-            node.parent.parent.color = "Red" # Set the grandparent to red
-            self.left_rotation(node.parent.parent) # Perform a left rotation
+        if reverse: # Walk from the largest key, swapping the roles of the children and bounds
+            first_side, second_side, start, stop = "right", "left", high, low
+            before = lambda key: start is not None and key > start # The key comes before the start of the walk
+            after = lambda key: stop is not None and key < stop # The key comes after the end of the walk
+        else:
+            first_side, second_side, start, stop = "left", "right", low, high
+            before = lambda key: start is not None and key < start
+            after = lambda key: stop is not None and key > stop
+
+        stack = [] # Nodes whose key and second subtree are still to be produced
+        node = self.root
+
+        while True:
+            # Go down towards the start of the walk, remembering the nodes that are inside it
+            while node is not self.nil:
+                if before(node.key): # The node and its first subtree come before the start
+                    node = getattr(node, second_side)
+                else:
+                    stack.append(node)
+                    node = getattr(node, first_side)
+
+            if not stack: # Every key has been produced
+                return
+
+            node = stack.pop() # The next node in order
+            if after(node.key): # The walk has gone past its end
+                return
+            yield (node.key, node.value) if items else node.key
+            node = getattr(node, second_side) # Continue with the second subtree of the node
+
+    def floor(self, key):
+
+        """
+
+        Function to find the largest key less than or equal to a key.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The largest key less than or equal to the key, or None if there is none.
+
+        """
+
+        best = None # Best key found so far
+        node = self.root # Start searching at the root
+        while node is not self.nil:
+            if node.key <= key: # The node is a candidate, look for a larger one on the right
+                best = node.key
+                node = node.right
+            else: # The node is too large, look on the left
+                node = node.left
+        return best
+
+    def ceiling(self, key):
+
+        """
+
+        Function to find the smallest key greater than or equal to a key.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The smallest key greater than or equal to the key, or None if there is none.
+
+        """
+
+        best = None # Best key found so far
+        node = self.root # Start searching at the root
+        while node is not self.nil:
+            if node.key >= key: # The node is a candidate, look for a smaller one on the left
+                best = node.key
+                node = node.left
+            else: # The node is too small, look on the right
+                node = node.right
+        return best
+
+    # Order statistics
+    def rank(self, key):
+
+        """
+
+        Function to count the keys less than a key in O(log n).
+
+        Parameters:
+            key (int): The key to be ranked.
+
+        Returns:
+            int: The number of keys less than the key.
+
+        """
+
+        return self.count_below(key, False)
+
+    def select(self, k):
+
+        """
+
+        Function to find the k-th smallest key in O(log n).
+
+        Parameters:
+            k (int): The position of the key in ascending order, starting from 0.
+
+        Returns:
+            int: The k-th smallest key.
+
+        Raises:
+            IndexError: If k is out of range.
+
+        """
+
+        self.check_order_statistics()
+        if k < 0 or k >= self.root.size: # If there is no k-th key
+            raise IndexError("select index out of range")
+
+        node = self.root # Start searching at the root
+        while True:
+            left_size = node.left.size # Number of keys smaller than the node in its subtree
+            if k < left_size: # The key is in the left subtree
+                node = node.left
+            elif k == left_size: # The key is in the node
+                return node.key
+            else: # The key is in the right subtree
+                k -= left_size + 1
+                node = node.right
+
+    def count_range(self, low, high):
+
+        """
+
+        Function to count the keys between two bounds in O(log n).
+
+        Parameters:
+            low (int): The smallest key to be counted (inclusive).
+            high (int): The largest key to be counted (inclusive).
+
+        Returns:
+            int: The number of keys between the bounds.
+
+        """
+
+        return max(self.count_below(high, True) - self.count_below(low, False), 0)
+
+    def count_below(self, key, inclusive):
+
+        """
+
+        Function to count the keys less than (or equal to) a key using the subtree sizes.
+
+        Parameters:
+            key (int): The key to be compared against.
+            inclusive (bool): If True, keys equal to the key are counted too.
+
+        Returns:
+            int: The number of keys below the key.
+
+        """
+
+        self.check_order_statistics()
+        count = 0 # Number of keys below the key found so far
+        node = self.root # Start searching at the root
+        while node is not self.nil:
+            if node.key < key or (inclusive and node.key == key): # The node and its left subtree are below the key
+                count += node.left.size + 1
+                node = node.right
+            else: # Only keys in the left subtree can be below the key
+                node = node.left
+        return count
+
+    def check_order_statistics(self):
+
+        """
+
+        Function to check that the tree keeps subtree sizes.
+
+        Raises:
+            RuntimeError: If the tree was created without order statistics.
+
+        """
+
+        if not self.order_statistics:
+            raise RuntimeError("order statistics are disabled; create the tree with order_statistics=True")
+
+    # Invariants
+    def check_invariants(self):
+
+        """
+
+        Function to check that the Red-Black Tree is a valid Red-Black binary search tree.
+
+        The keys must be in order, the parent pointers must match the children, the root must be
+        black, no red node may have a red child, every path must have the same number of black
+        nodes, the subtree sizes must be right (with order statistics) and the number of nodes,
+        the number of leaves and the black height must match the counters.
+
+        Raises:
+            RuntimeError: If an invariant does not hold.
+
+        """
+
+        if self.root.color != BLACK:
+            raise RuntimeError("the root is red")
+        if self.root is not self.nil and self.root.parent is not self.nil:
+            raise RuntimeError("the root has a parent")
+        black, size = self.check_subtree(self.root, None, None)
+        if size != self.count:
+            raise RuntimeError(f"the tree has {size} nodes but counts {self.count} keys")
+        if black - 1 != self.black_height: # check_subtree counts the nil leaves as well
+            raise RuntimeError(f"the black height is {black - 1} but the tree counts {self.black_height}")
+        leaves = tree_metrics(self.root, self.nil)["leaves"]
+        if leaves != self.leaves:
+            raise RuntimeError(f"the tree has {leaves} leaves but counts {self.leaves}")
+
+    def check_subtree(self, node, low, high):
+
+        """
+
+        Recursive function to check the invariants of a subtree.
+
+        Parameters:
+            node (RB_Node): The root of the subtree.
+            low (int): The smallest key allowed in the subtree, or None.
+            high (int): The largest key allowed in the subtree, or None.
+
+        Returns:
+            int: The number of black nodes on every path from the node down to a leaf.
+            int: The number of nodes in the subtree.
+
+        Raises:
+            RuntimeError: If an invariant does not hold.
+
+        """
+
+        if node is self.nil: # The nil leaves are black
+            return 1, 0
+
+        if (low is not None and node.key < low) or (high is not None and node.key > high):
+            raise RuntimeError(f"key {node.key} is out of order")
+        for child in (node.left, node.right):
+            if child is not self.nil and child.parent is not node:
+                raise RuntimeError(f"wrong parent pointer below key {node.key}")
+            if node.color == RED and child.color == RED:
+                raise RuntimeError(f"red node with a red child at key {node.key}")
+        left_black, left_size = self.check_subtree(node.left, low, node.key) # Check the left subtree
+        right_black, right_size = self.check_subtree(node.right, node.key, high) # Check the right subtree
 
+        if left_black != right_black:
+            raise RuntimeError(f"different black heights at key {node.key}")
+        if self.order_statistics and node.size != 1 + left_size + right_size:
+            raise RuntimeError(f"wrong subtree size at key {node.key}")
+
+        return left_black + (node.color == BLACK), 1 + left_size + right_size
 
     # Rotations
     def left_rotation(self, node):
@@ -164,15 +1507,17 @@ class RB_Tree:
 
         new_root = node.right # The right child becomes the new root of the subtree
         node.right = new_root.left # The left child of the new root becomes the right child of the node
+        if node.right is self.nil: # The node may become a leaf, and the new root may stop being one
+            self.leaves += (node.left is self.nil) - (new_root.right is self.nil)
 
-        if new_root.left != Nil: # If the left child of the new root is not nil
+        if new_root.left is not self.nil: # If the left child of the new root is not nil
             new_root.left.parent = node # Set the parent of the left child of the new root to the node
 
         new_root.parent = node.parent # Set the parent of the new root to the parent of the node
 
-        if node.parent == Nil: # If the parent of the node is nil
+        if node.parent is self.nil: # If the parent of the node is nil
             self.root = new_root # Set the new root as the root of the tree
-        elif node == node.parent.left: # If the node is a left child
+        elif node is node.parent.left: # If the node is a left child
             node.parent.left = new_root # Set the new root as the left child of the parent
         else: # If the node is a right child
             node.parent.right = new_root # Set the new root as the right child of the parent
@@ -180,6 +1525,10 @@ class RB_Tree:
         new_root.left = node # The previous root becomes the left child of the new root
         node.parent = new_root # Set the parent of the node to the new root
 
+        if self.order_statistics: # The new root takes over the subtree, the node keeps what is left
+            new_root.size = node.size
+            node.size = 1 + node.left.size + node.right.size
+
     def right_rotation(self, node):
 
         """
@@ -193,15 +1542,17 @@ class RB_Tree:
 
         new_root = node.left # The left child becomes the new root of the subtree
         node.left = new_root.right # The right child of the new root becomes the left child of the node
+        if node.left is self.nil: # The node may become a leaf, and the new root may stop being one
+            self.leaves += (node.right is self.nil) - (new_root.left is self.nil)
 
-        if new_root.right != Nil: # If the right child of the new root is not nil
+        if new_root.right is not self.nil: # If the right child of the new root is not nil
             new_root.right.parent = node # Set the parent of the right child of the new root to the node
 
         new_root.parent = node.parent # Set the parent of the new root to the parent of the node
 
-        if node.parent == Nil: # If the parent of the node is nil
+        if node.parent is self.nil: # If the parent of the node is nil
             self.root = new_root # Set the new root as the root of the tree
-        elif node == node.parent.right: # If the node is a right child
+        elif node is node.parent.right: # If the node is a right child
             node.parent.right = new_root
         else: # If the node is a left child
             node.parent.left = new_root # Set the new root as the left child of the parent
@@ -209,6 +1560,10 @@ class RB_Tree:
         new_root.right = node # The previous root becomes the right child of the new root
         node.parent = new_root # Set the parent of the node to the new root
 
+        if self.order_statistics: # The new root takes over the subtree, the node keeps what is left
+            new_root.size = node.size
+            node.size = 1 + node.left.size + node.right.size
+
     # Utility functions
         
     # Get the height of the tree
@@ -216,14 +1571,29 @@ class RB_Tree:
             
         """
     
-        Function to get the height of the tree.
+        Function to get the height of the tree with an iterative traversal.
     
         Returns:
             int: The height of the tree.
     
         """
     
-        return self.get_height_recursive(self.root) # Get the height recursively
+        nil = self.nil
+        if self.root is nil: # If the tree is empty
+            return 0
+
+        height = -1 # Depth of the deepest level found so far
+        level = [self.root] # Nodes on the current level
+        while level: # Visit the tree level by level, without recursion
+            height += 1
+            next_level = [] # Children of the nodes on the current level
+            for node in level:
+                if node.left is not nil:
+                    next_level.append(node.left)
+                if node.right is not nil:
+                    next_level.append(node.right)
+            level = next_level
+        return height
     
     def get_height_recursive(self, node):
 
@@ -240,9 +1610,9 @@ class RB_Tree:
         """
     
         # Base case
-        if node == Nil: # If the node is nil,
+        if node is self.nil: # If the node is nil,
             return 0 # Return 0
-        elif node.left == Nil and node.right == Nil: # If the node is a leaf,
+        elif node.left is self.nil and node.right is self.nil: # If the node is a leaf,
             return 0
         # Recursive case
         else: # Otherwise,
@@ -255,14 +1625,32 @@ class RB_Tree:
             
         """
     
-        Function to get the number of leaves in the tree.
+        Function to get the number of leaves in the tree with an iterative traversal.
     
         Returns:
             int: The number of leaves in the tree.
     
         """
     
-        return self.get_leaves_recursive(self.root) # Get the number of leaves recursively
+        nil = self.nil
+        if self.root is nil: # If the tree is empty
+            return 0
+
+        leaves = 0 # Number of leaves found so far
+        level = [self.root] # Nodes on the current level
+        while level: # Visit the tree level by level, without recursion
+            next_level = [] # Children of the nodes on the current level
+            for node in level:
+                if node.left is not nil:
+                    next_level.append(node.left)
+                    if node.right is not nil:
+                        next_level.append(node.right)
+                elif node.right is not nil:
+                    next_level.append(node.right)
+                else: # If the node is a leaf
+                    leaves += 1
+            level = next_level
+        return leaves
     
     def get_leaves_recursive(self, node):
 
@@ -279,11 +1667,57 @@ class RB_Tree:
         """
     
         # Base case
-        if node == Nil: # If the node is nil,
+        if node is self.nil: # If the node is nil,
             return 0 # Return 0
-        elif node.left == Nil and node.right == Nil: # If the node is a leaf,
+        elif node.left is self.nil and node.right is self.nil: # If the node is a leaf,
             return 1 # Return 1
         
         # Recursive case
         else:
-            return self.get_leaves_recursive(node.left) + self.get_leaves_recursive(node.right) # Return the sum of the leaves in the left and right subtrees
\ No newline at end of file
+            return self.get_leaves_recursive(node.left) + self.get_leaves_recursive(node.right) # Return the sum of the leaves in the left and right subtrees
+
+    # Structural metrics
+    def metrics(self):
+
+        """
+
+        Function to measure the tree in one iterative traversal (see metrics.tree_metrics).
+
+        The height is given as the number of edges on the longest path, like get_height.
+
+        Returns:
+            dict: The number of nodes, the height, the number of leaves, the black height and
+            the distribution of the balance factors.
+
+        """
+
+        result = tree_metrics(self.root, self.nil)
+        result["height"] = max(result["height"] - 1, 0) # Edges rather than nodes
+        return result
+
+    def count_metrics(self):
+
+        """
+
+        Function to count the leaves and the black height again after the whole tree was replaced.
+
+        """
+
+        result = tree_metrics(self.root, self.nil)
+        self.leaves = result["leaves"]
+        self.black_height = result["black_height"]
+
+    def record_metrics(self):
+
+        """
+
+        Function to set the height and the number of leaves in the statistics.
+
+        The number of leaves is kept up to date by every change to the tree, so it is set in
+        O(1). The nodes do not store their heights, so the height still takes one iterative
+        walk (get_height).
+
+        """
+
+        self.statistics.set_height(self.get_height()) # Set the height of the tree
+        self.statistics.set_leaves(self.leaves) # Set the number of leaves in the tree
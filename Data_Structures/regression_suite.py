@@ -0,0 +1,354 @@
+"""
+
+Performance regression suite for the data structures.
+
+Every case builds one structure from one seeded workload and measures insert throughput and
+memory per key, bulk-load throughput, lookup throughput and range-scan throughput, next to
+the average steps, rotations, promotions and search steps. The structure is checked with
+check_invariants (trees) after the inserts.
+
+The results of a run are saved as JSON under the commit they were measured at, and compared
+with the newest saved run of a different commit (or with --baseline): a case is flagged when
+a throughput drops, the memory per key grows or a steps/rotations/promotions average grows by
+more than the tolerances. The exit status is 1 when anything is flagged, so the suite can run
+between commits in a hook or a CI job.
+
+Run `python regression_suite.py` for the full suite (n from 10^3 to 10^6), or for example
+`python regression_suite.py --sizes 1000 10000 --structures RB_Tree` for a quick check.
+
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from avl_tree import AVL_Tree
+from red_black_tree import RB_Tree
+from skip_list import Skip_List
+from benchmark_runner import run_trial, STRUCTURES
+from benchmarks import best_time, print_results
+import workloads
+
+SIZES = (1000, 10000, 100000, 1000000) # Numbers of keys of the full suite
+SHAPES = ("random", "sorted", "zipf") # Workloads of the full suite: random, sorted and duplicate-heavy
+LOOKUPS = 100000 # Largest number of lookups per case
+
+# Metrics that get worse when they go down, and metrics that get worse when they go up
+THROUGHPUTS = ("insert ops/sec", "bulk load keys/sec", "lookup ops/sec", "range scan keys/sec")
+COSTS = ("bytes/key", "avg steps", "avg rotations", "avg promotions", "avg search steps")
+
+# Runs one case
+def run_case(structure, size, shape, seed, repeat=3):
+
+    """
+
+    Function to measure every metric of one structure on one workload.
+
+    Parameters:
+        structure (str): One of STRUCTURES.
+        size (int): The number of keys.
+        shape (str): The shape of the workload (see workloads.WORKLOADS).
+        seed (int): The seed of the workload, of the lookups and of the Skip List levels.
+        repeat (int): The number of runs of each timing, of which the fastest is kept.
+
+    Returns:
+        dict: The metrics of the case.
+
+    Raises:
+        RuntimeError: If the tree is invalid after the inserts.
+
+    """
+
+    random.seed(seed) # The Skip List draws its levels from the random module
+    row, _ = run_trial(structure, size, seed, shape) # Key-by-key inserts, with the peak memory
+    insert_seconds = row["seconds"]
+    for _ in range(repeat - 1): # The same inserts again, without measuring the memory
+        random.seed(seed)
+        insert_seconds = min(insert_seconds, run_trial(structure, size, seed, shape, memory=False)[0]["seconds"])
+
+    keys = workloads.make_workload(shape, size, seed)
+    classes = {"AVL_Tree": AVL_Tree, "RB_Tree": RB_Tree, "Skip_List": Skip_List}
+    bulk_seconds, built = best_time(lambda: classes[structure].from_iterable(keys), repeat) # Bulk load
+    if hasattr(built, "check_invariants"):
+        built.check_invariants()
+
+    queries = np.random.default_rng(seed).permutation(keys)[:LOOKUPS].tolist() # Hits in random order
+    def lookup():
+        built.statistics.reset() # Only keep the steps of one run
+        for key in queries:
+            built.search(key)
+    lookup_seconds, _ = best_time(lookup, repeat)
+    search_steps = built.statistics.calculate_statistics()["search_steps"]["avg"]
+
+    scan_seconds, scanned = best_time(lambda: sum(1 for _ in built.range()), repeat) # Every key in order
+
+    return {
+        "insert ops/sec": size / insert_seconds,
+        "bytes/key": row["peak bytes"] / max(row["keys"], 1), # Per key stored, as the Skip List drops duplicate keys
+        "bulk load keys/sec": size / bulk_seconds,
+        "lookup ops/sec": len(queries) / lookup_seconds,
+        "range scan keys/sec": scanned / scan_seconds,
+        "avg steps": row["avg steps"],
+        "avg rotations": row["avg rotations"],
+        "avg promotions": row["avg promotions"],
+        "avg search steps": float(search_steps),
+    }
+
+# Runs one case from a tuple of arguments
+def run_case_arguments(arguments):
+
+    """
+
+    Function to run a case from a tuple, for ProcessPoolExecutor.map.
+
+    Parameters:
+        arguments (tuple): The arguments of run_case.
+
+    Returns:
+        dict: The result of run_case.
+
+    """
+
+    return run_case(*arguments)
+
+# Names a case
+def case_name(structure, size, shape):
+
+    """
+
+    Function to name a case in the saved results.
+
+    Parameters:
+        structure (str): The structure.
+        size (int): The number of keys.
+        shape (str): The shape of the workload.
+
+    Returns:
+        str: The name of the case.
+
+    """
+
+    return f"{structure}/{shape}/{size}"
+
+# Runs the whole suite
+def run_suite(structures=STRUCTURES, sizes=SIZES, shapes=SHAPES, seed=2024, workers=None, repeat=3):
+
+    """
+
+    Function to run every case of the suite on a process pool.
+
+    Parameters:
+        structures (list): The structures to be measured.
+        sizes (list): The numbers of keys.
+        shapes (list): The shapes of the workloads.
+        seed (int): The seed of every case.
+        workers (int): The number of processes, or None for one per CPU.
+        repeat (int): The number of runs of each timing, of which the fastest is kept.
+
+    Returns:
+        dict: The metrics of each case, by case name.
+
+    """
+
+    cases = [(structure, size, shape, seed, repeat)
+             for size in sorted(sizes, reverse=True) # Largest cases first so that the pool stays busy
+             for structure in structures
+             for shape in shapes]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_case_arguments, cases))
+    return {case_name(structure, size, shape): metrics
+            for (structure, size, shape, _, _), metrics in sorted(zip(cases, results), key=lambda item: item[0][:3])}
+
+# Gets the current commit
+def current_commit():
+
+    """
+
+    Function to get the hash of the commit the suite runs on.
+
+    Returns:
+        str: The short hash, ending in "-dirty" if there are uncommitted changes, or "unknown" outside a git repository.
+
+    """
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        changes = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if changes.strip() else "")
+
+# Compares a run with a baseline
+def compare(results, baseline, throughput_tolerance=0.2, cost_tolerance=0.01):
+
+    """
+
+    Function to flag the metrics of a run that got worse than in a baseline.
+
+    The counts (steps, rotations, promotions) are deterministic for a given seed, so they have
+    a small tolerance; the throughputs and the memory depend on the machine, so they have a
+    large one.
+
+    Parameters:
+        results (dict): The metrics of each case of the run.
+        baseline (dict): The metrics of each case of the baseline.
+        throughput_tolerance (float): The fraction a throughput may drop by, or the memory per key grow by.
+        cost_tolerance (float): The fraction a steps/rotations/promotions average may grow by.
+
+    Returns:
+        list: One row per flagged metric.
+
+    """
+
+    flagged = []
+    for case, metrics in results.items():
+        old_metrics = baseline.get(case)
+        if old_metrics is None: # A new case has nothing to be compared with
+            continue
+        for metric, value in metrics.items():
+            old = old_metrics.get(metric)
+            if old is None or value is None:
+                continue
+            if metric in THROUGHPUTS:
+                worse = value < old * (1 - throughput_tolerance)
+            elif metric == "bytes/key":
+                worse = value > old * (1 + throughput_tolerance)
+            elif metric in COSTS:
+                worse = value > old * (1 + cost_tolerance) + 1e-9
+            else:
+                continue
+            if worse:
+                flagged.append({
+                    "case": case,
+                    "metric": metric,
+                    "baseline": old,
+                    "now": value,
+                    "change %": 100 * (value / old - 1) if old else math.inf,
+                })
+    return flagged
+
+# Saves a run
+def save_results(results, directory, commit):
+
+    """
+
+    Function to save the results of a run as <commit>.json and as latest.json in a directory.
+
+    Parameters:
+        results (dict): The metrics of each case.
+        directory (str): The directory of the saved runs.
+        commit (str): The commit the run was measured at.
+
+    Returns:
+        str: The path of the file of the commit.
+
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    document = {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    path = os.path.join(directory, f"{commit}.json")
+    for target in (path, os.path.join(directory, "latest.json")):
+        with open(target, "w") as file:
+            json.dump(document, file, indent=2)
+    return path
+
+# Finds the run to compare with
+def find_baseline(directory, commit):
+
+    """
+
+    Function to find the newest saved run of a commit other than the current one.
+
+    Runs of the same commit are skipped, so that running the suite twice does not compare a
+    commit with itself.
+
+    Parameters:
+        directory (str): The directory of the saved runs.
+        commit (str): The commit the suite runs on (see current_commit).
+
+    Returns:
+        dict: The saved document, or None if there is no run of another commit.
+
+    """
+
+    if not os.path.isdir(directory):
+        return None
+    newest = None
+    for name in os.listdir(directory):
+        if not name.endswith(".json") or name == "latest.json": # latest.json is a copy of another file
+            continue
+        document = load_results(os.path.join(directory, name))
+        if document["commit"] != commit and (newest is None or document["time"] > newest["time"]):
+            newest = document
+    return newest
+
+# Loads a saved run
+def load_results(path):
+
+    """
+
+    Function to load a saved run.
+
+    Parameters:
+        path (str): The path of the file.
+
+    Returns:
+        dict: The saved document, or None if the file does not exist.
+
+    """
+
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the performance regression suite and compare it with the last saved run.")
+    parser.add_argument("--structures", nargs="+", default=list(STRUCTURES), help="Structures: " + ", ".join(STRUCTURES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="Numbers of keys")
+    parser.add_argument("--workloads", nargs="+", default=list(SHAPES), help="Workloads: " + ", ".join(workloads.WORKLOADS))
+    parser.add_argument("--seed", type=int, default=2024, help="Seed of every case")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (default: one per CPU)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each timing, of which the fastest is kept")
+    parser.add_argument("--results", default="regression_results", help="Directory of the saved runs")
+    parser.add_argument("--baseline", help="Saved run to compare with (default: the newest run of another commit in the results directory)")
+    parser.add_argument("--throughput-tolerance", type=float, default=0.2, help="Fraction a throughput may drop by")
+    parser.add_argument("--cost-tolerance", type=float, default=0.01, help="Fraction a steps/rotations average may grow by")
+    parser.add_argument("--no-save", action="store_true", help="Compare without saving the run")
+    arguments = parser.parse_args()
+
+    for structure in arguments.structures: # Check the names before starting the processes
+        if structure not in STRUCTURES:
+            parser.error(f"unknown structure: {structure}")
+    for shape in arguments.workloads:
+        if shape not in workloads.WORKLOADS:
+            parser.error(f"unknown workload: {shape}")
+
+    commit = current_commit()
+    baseline = load_results(arguments.baseline) if arguments.baseline else find_baseline(arguments.results, commit)
+    results = run_suite(arguments.structures, arguments.sizes, arguments.workloads, arguments.seed, arguments.workers, arguments.repeat)
+    print_results([{"case": case, **metrics} for case, metrics in results.items()])
+
+    flagged = []
+    if baseline is None:
+        print("\nNo saved run of another commit to compare with.")
+    else:
+        flagged = compare(results, baseline["results"], arguments.throughput_tolerance, arguments.cost_tolerance)
+        print(f"\nCompared with {baseline['commit']}: {len(flagged)} regression(s).")
+        print_results(flagged)
+
+    if not arguments.no_save:
+        print("Saved", save_results(results, arguments.results, commit))
+    raise SystemExit(1 if flagged else 0)
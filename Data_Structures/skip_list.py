@@ -1,49 +1,295 @@
 # Implementation of a Skip List
+import math
 import random
+import numpy as np
 import ds_statistics as ds_stats
+from bulk_load import sorted_keys, should_rebuild, merge_items
+from duplicates import ALLOW, IGNORE, REPLACE, check_policy
+import snapshot
+from metrics import skip_list_metrics, level_counts
+
+LEVEL_BATCH = 1024 # Number of levels drawn from NumPy at once (about 8 KB of list per Skip List)
 
 class Skip_Node:
     # Node for Skip List
-    def __init__(self, key, level): # Constructor
+    def __init__(self, key, level, indexed=False, value=None): # Constructor
         self.key = key # Key of the node
+        self.value = value # Value stored with the key
         self.level = level # Level of the node
         self.forward = [None] * (level + 1) # Forward pointers for the node
+        self.width = [1] * (level + 1) if indexed else None # Number of bottom-level nodes each forward pointer skips
+
+class Compact_Skip_Node:
+    # Slotted node for the compact storage mode of the Skip List
+    __slots__ = ("key", "value", "level", "forward", "width") # No per-instance dictionary
+    __init__ = Skip_Node.__init__ # Same constructor as Skip_Node
 
 class Skip_List:
     # Skip List class
-    def __init__(self, max_level, probability):
+    def __init__(self, max_level, probability, order_statistics=False, compact=False, statistics=None, finger=False, duplicates=IGNORE, grow=False):
         self.max_level = max_level # Maximum level of the Skip List
         self.probability = probability # Probability of a node having a higher level
+        self.grow = grow # Whether the maximum level is raised when the list outgrows it
+        self.base = max(round(1 / probability), 2) if probability > 0 else 2 # Number of nodes per node on the level above
+        self.capacity = self.base ** max_level # Number of keys the maximum level is sized for
+        self.level_batch = [] # Levels drawn in advance, used from the end
+        self.level = 0 # Current level of the Skip List
+        self.count = 0 # Number of keys in the Skip List
+        self.level_histogram = [0] * (max_level + 1) # Number of nodes whose top level is each level
+        self.order_statistics = order_statistics # Whether forward pointers keep widths for rank and select
+        self.node_class = Compact_Skip_Node if compact else Skip_Node # Slotted nodes use less memory per key
+        self.head = self.node_class(None, self.max_level, order_statistics) # Head node of the Skip List
+        self.statistics = ds_stats.Statistics() if statistics is None else statistics # Keeps track of the statistics
+        self.use_finger = finger # Whether searches start from the update array of the previous operation
+        self.duplicates = check_policy(duplicates) # What insert does with a key that is already in the list (see duplicates.py)
+        self.reset_finger() # Create the finger
+
+    # Bulk-load constructors
+    @classmethod
+    def from_sorted(cls, iterable, max_level=None, probability=0.5, **options):
+
+        """
+
+        Function to build a Skip List from keys in ascending order in O(n).
+
+        Parameters:
+            iterable (iterable): The keys in ascending order (list, generator or NumPy array).
+            max_level (int): Maximum level of the Skip List. Defaults to log base 1/probability of the number of keys.
+            probability (float): Probability of a node having a higher level.
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            Skip_List: The new Skip List.
+
+        """
+
+        keys = sorted_keys(iterable, presorted=True) # Check the order of the keys
+        return cls.build_new(keys, max_level, probability, **options)
+
+    @classmethod
+    def from_iterable(cls, iterable, max_level=None, probability=0.5, **options):
+
+        """
+
+        Function to build a Skip List from keys in any order.
+
+        The keys are sorted once in O(n log n) and the list is then built in O(n).
+
+        Parameters:
+            iterable (iterable): The keys to be inserted (list, generator or NumPy array).
+            max_level (int): Maximum level of the Skip List. Defaults to log base 1/probability of the number of keys.
+            probability (float): Probability of a node having a higher level.
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            Skip_List: The new Skip List.
+
+        """
+
+        keys = sorted_keys(iterable) # Sort the keys once
+        return cls.build_new(keys, max_level, probability, **options)
+
+    @classmethod
+    def build_new(cls, keys, max_level, probability, **options):
+
+        """
+
+        Function to create a Skip List sized for the given sorted keys and fill it.
+
+        Parameters:
+            keys (list): The keys in ascending order.
+            max_level (int): Maximum level of the Skip List, or None to size it from the keys.
+            probability (float): Probability of a node having a higher level.
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            Skip_List: The new Skip List.
+
+        """
+
+        if max_level is None: # If no maximum level is given, size the list for the number of keys
+            base = max(round(1 / probability), 2) # Number of nodes per node on the level above
+            max_level = max(math.ceil(math.log(max(len(keys), 2), base)), 1)
+        skip_list = cls(max_level, probability, **options) # Create an empty Skip List
+        skip_list.build_from_sorted(keys) # Fill it with the sorted keys
+        return skip_list
+
+    def build_from_sorted(self, keys, levels=None, values=None):
+
+        """
+
+        Function to replace the contents of the Skip List with a deterministic layout of sorted keys.
+
+        Every (1 / probability)-th node of a level is promoted to the level above, like the
+        levels of a perfectly balanced tree, unless the levels are given. Duplicate keys are
+        kept or dropped following the duplicate policy, as in insert. The number of levels is
+        recorded in the statistics.
+
+        Parameters:
+            keys (list): The keys in ascending order.
+            levels (list): The level of each key (for example from a snapshot), or None to compute them.
+            values (list): The value of each key, or None to store no values.
+
+        """
+
+        if self.grow: # Make room for the keys before the head is created
+            self.grow_levels(len(keys))
+        base = self.base # Number of nodes per node on the level above
+        indexed = self.order_statistics
+        self.head = self.node_class(None, self.max_level, indexed) # Start from an empty list
         self.level = 0 # Current level of the Skip List
-        self.head = Skip_Node(None, self.max_level) # Head node of the Skip List
-        self.statistics = ds_stats.Statistics() # Keeps track of the statistics
+        self.level_histogram = [0] * (self.max_level + 1) # Number of nodes whose top level is each level
+        last = [self.head] * (self.max_level + 1) # Last node on each level
+        last_positions = [0] * (self.max_level + 1) # Position of the last node on each level
+        position = 0 # Position of the node in the bottom level
+
+        duplicates = self.duplicates
+        for index, key in enumerate(keys):
+            if position > 0 and duplicates != ALLOW and last[0].key == key: # Another copy of the last key
+                if duplicates == REPLACE and values is not None:
+                    last[0].value = values[index]
+                continue
+            position += 1
+
+            if levels is not None: # The level is given
+                level = levels[index]
+            else: # The level of the node is the number of times the position is divisible by the base
+                level = 0
+                rest = position
+                while rest % base == 0 and level < self.max_level:
+                    rest //= base
+                    level += 1
+
+            # Append the node to the end of each of its levels
+            new_node = self.node_class(key, level, indexed, None if values is None else values[index])
+            for i in range(level + 1):
+                last[i].forward[i] = new_node
+                if indexed: # The previous node on this level skips to this position
+                    last[i].width[i] = position - last_positions[i]
+                    last_positions[i] = position
+                last[i] = new_node
+            self.level_histogram[level] += 1
+            if level > self.level: # Update the level of the list
+                self.level = level
+
+        if indexed: # The last node on each level skips to the end of the list
+            for i in range(self.max_level + 1):
+                last[i].width[i] = position + 1 - last_positions[i]
+
+        self.count = position # Number of keys in the Skip List
+        self.reset_finger() # The finger pointed into the old list
+        self.statistics.set_levels(self.level) # Set the number of levels in the Skip List
+
+    # Snapshots
+    def save(self, path):
+
+        """
+
+        Function to save the Skip List to a snapshot file (see snapshot.py).
+
+        The keys are stored in order with the level and the value of each node, the maximum
+        level and the probability.
+
+        Parameters:
+            path (str): The path of the file.
+
+        """
+
+        keys = [] # Keys in order
+        values = [] # Value of each node
+        levels = [] # Level of each node
+        node = self.head.forward[0]
+        while node is not None: # Walk along the bottom level
+            keys.append(node.key)
+            values.append(node.value)
+            levels.append(node.level)
+            node = node.forward[0]
+
+        snapshot.write_snapshot(path, "Skip_List", keys, levels, None, self.max_level, self.probability, values, self.duplicates)
+
+    @classmethod
+    def load(cls, path, mmap=True, **options):
+
+        """
+
+        Function to load a Skip List from a snapshot file in O(n), without calling insert.
+
+        The nodes keep the levels they had when the list was saved, and the list gets the
+        duplicate policy it was saved with, unless duplicates is passed.
+
+        Parameters:
+            path (str): The path of the file.
+            mmap (bool): If True, the file is memory-mapped while the list is rebuilt.
+            **options: Keyword arguments passed to the constructor.
+
+        Returns:
+            Skip_List: The Skip List saved in the file.
+
+        Raises:
+            ValueError: If the file is not a snapshot of a Skip List.
+
+        """
+
+        data = snapshot.read_snapshot(path, "Skip_List", mmap)
+        if data.duplicates is not None: # Keep the policy the list was saved with
+            options.setdefault("duplicates", data.duplicates)
+        skip_list = cls(data.max_level, data.probability, **options) # Create an empty Skip List
+        skip_list.build_from_sorted(data.keys.tolist(), data.aux.tolist(), data.value_list()) # Link the nodes with their saved levels
+        return skip_list
 
     # Insertion
-    def insert(self, key):
+    def insert(self, key, value=None, duplicates=None):
 
         """
 
         Function to insert a key-value pair into the Skip List.
 
+        With the ALLOW policy, a copy of a key is linked in after the nodes that already hold
+        it, like in the trees.
+
         Parameters:
             key (int): The key to be inserted.
+            value (object): The value stored with the key.
+            duplicates (str): The policy for a key that is already in the list, or None for the list's policy.
+
+        Returns:
+            Skip_Node: The node holding the key.
 
         """
 
-        steps = 1 # Initialise the number of steps
+        if duplicates is None: # Use the policy of the list
+            duplicates = self.duplicates
+        if self.grow and self.count >= self.capacity: # One more key would outgrow the maximum level
+            self.grow_levels(self.count + 1)
+
         promotions = 0 # Initialise the number of promotions
 
-         # Create an array to hold pointers to the nodes that need to be updated at each level
-        update = [None] * (self.max_level + 1)
-        current = self.head
+        if self.use_finger: # Start from the update array of the previous operation
+            steps = self.search_from_finger(key)
+            update = self.finger # The finger is the update array of this key now
+            positions = self.finger_positions
+            current = update[0]
+        else:
+            steps = 1 # Initialise the number of steps
+
+             # Create an array to hold pointers to the nodes that need to be updated at each level
+            update = [None] * (self.max_level + 1)
+            current = self.head
+            indexed = self.order_statistics
+            position = 0 # Position of the current node in the bottom level (only kept with order statistics)
+            positions = [0] * (self.max_level + 1) if indexed else None # Position of the node remembered at each level
     
-        # Start from the highest level of the Skip List and move downwards
-        for i in range(self.level, -1, -1):
-            # Move forward while the next node's key is less than the key to be inserted
-            while current.forward[i] and current.forward[i].key < key:
-                current = current.forward[i]
-                steps += 1
-            update[i] = current  # Remember the node at this level
+            # Start from the highest level of the Skip List and move downwards
+            for i in range(self.level, -1, -1):
+                # Move forward while the next node's key is less than the key to be inserted
+                while current.forward[i] and current.forward[i].key < key:
+                    if indexed:
+                        position += current.width[i]
+                    current = current.forward[i]
+                    steps += 1
+                update[i] = current  # Remember the node at this level
+                if indexed:
+                    positions[i] = position
     
         # Move to the level 0 node before the position where the new node will be inserted
         current = current.forward[0]
@@ -51,45 +297,1084 @@ class Skip_List:
     
         # If the current node is the end of the list or its key is not equal to the key to be inserted,
         # then we can proceed with the insertion
-        if current is None or current.key != key: 
-            # Determine the level for the new node and the number of promotions
-            new_level, promotions = self.random_level()
-
-        
-            # If the new node's level is greater than the current level of the list,
-            # Update the list level and the update array with the head node
-            if new_level > self.level:
-                for i in range(self.level + 1, new_level + 1): 
-                    update[i] = self.head
-                self.level = new_level
-        
-            # Create the new node
-            new_node = Skip_Node(key, new_level)
-        
-            # Insert the new node and update the forward pointers
-            for i in range(new_level + 1):
-                new_node.forward[i] = update[i].forward[i]
-                update[i].forward[i] = new_node
+        if current is None or current.key != key or duplicates == ALLOW:
+            if current is not None and current.key == key: # Move past the copies of the key
+                steps += self.pass_duplicates(update, positions, key, self.finger_moves if self.use_finger else None)
+            promotions = self.link_node(update, positions, key, value) # Insert the new node
+            current = update[0].forward[0] # The new node
+        elif duplicates == REPLACE: # Update the value in place
+            current.value = value
 
         # Update the statistics
         self.statistics.add_step(steps)
         self.statistics.add_promotion(promotions)
-        
-    # Utility functions
-    def random_level(self):
+        return current
+
+    def pass_duplicates(self, update, positions, key, moves=None):
 
         """
 
-        Function to generate a random level for a node.
+        Function to move an update array past the nodes that hold a key, so that a copy is linked in after them.
+
+        When the update array is the finger, the moves of a search from the head are kept in
+        step: such a search comes down at the finger node of the level above, so if a level
+        passes that node, its moves start again from there.
+
+        Parameters:
+            update (list): The last node before the key on each level of the list.
+            positions (list): The position of each node in update (only used with order statistics).
+            key (int): The key to be inserted.
+            moves (list): The moves of a search from the head on each level (the finger's), or None.
 
         Returns:
-            int: Random level for the node.
+            int: The number of nodes passed.
+
+        """
+
+        steps = 0 # Initialise the number of steps
+        above = None # Node of the level above, where a search from the head comes down
+        for i in range(self.level, -1, -1):
+            current = update[i]
+            moved = moves[i] if moves is not None else 0
+            while current.forward[i] is not None and current.forward[i].key == key:
+                if positions is not None:
+                    positions[i] += current.width[i]
+                current = current.forward[i]
+                steps += 1
+                moved = 0 if current is above else moved + 1
+            update[i] = current
+            if moves is not None:
+                moves[i] = moved
+            above = current
+        return steps
+
+    def link_node(self, update, positions, key, value=None):
+
+        """
+
+        Function to link a new node with a random level in after the nodes of an update array.
+
+        Parameters:
+            update (list): The node before the new node on each level of the list.
+            positions (list): The position of each node in update (only used with order statistics).
+            key (int): The key to be inserted.
+            value (object): The value stored with the key.
+
+        Returns:
+            int: The number of promotions of the new node.
+
+        """
+
+        # Determine the level for the new node and the number of promotions
+        new_level, promotions = self.random_level()
+
+        # If the new node's level is greater than the current level of the list,
+        # Update the list level and the update array with the head node
+        if new_level > self.level:
+            for i in range(self.level + 1, new_level + 1): 
+                update[i] = self.head
+                if positions is not None:
+                    positions[i] = 0
+            self.level = new_level
+
+        # Create the new node
+        new_node = self.node_class(key, new_level, self.order_statistics, value)
+
+        # Insert the new node and update the forward pointers
+        for i in range(new_level + 1):
+            new_node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = new_node
+
+        if self.order_statistics: # Update the widths of the forward pointers around the new node
+            self.link_widths(update, positions, new_node)
+        self.count += 1 # One more key in the list
+        self.level_histogram[new_level] += 1
+
+        return promotions
+
+    def insert_many(self, keys, rebuild=None):
+
+        """
+
+        Function to insert a batch of keys into the Skip List.
+
+        The batch is sorted once. Small batches are inserted in ascending order, and the update
+        array of each key is the starting point of the next search: on every level the search
+        continues from whichever is further along, the node it came down to or the node it
+        stopped at on that level for the previous key. The steps and promotions of every key are
+        recorded as for insert, so the steps count only the nodes actually visited. Large
+        batches (see bulk_load.REBUILD_FRACTION) are merged with the keys and values of the list and the
+        list is rebuilt with the deterministic layout of from_sorted, without per-key statistics.
+
+        The batch has no values: new keys hold None, and under REPLACE (as under IGNORE) a key
+        that is already stored keeps its value. Use [] or insert to change values.
+
+        Parameters:
+            keys (iterable): The keys to be inserted (list, generator or NumPy array).
+            rebuild (bool): True to always rebuild, False to never rebuild, None to decide from the sizes.
+
+        """
+
+        keys = sorted_keys(keys) # Sort the batch once
+        if should_rebuild(len(keys), self.count, rebuild): # Merge the batch in and rebuild the list
+            keys, values = merge_items(self, keys)
+            self.build_from_sorted(keys, None, values)
+            return
+
+        if self.grow: # Make room for the whole batch before the update array is created
+            self.grow_levels(self.count + len(keys))
+        head = self.head
+        indexed = self.order_statistics
+        update = [head] * (self.max_level + 1) # Node before the previous key on each level
+        positions = [0] * (self.max_level + 1) if indexed else None # Position of each node in update
+
+        for key in keys:
+            steps = 1 # Initialise the number of steps
+            promotions = 0 # Initialise the number of promotions
+            current = head
+            position = 0 # Position of the current node in the bottom level (only kept with order statistics)
+
+            # Start from the highest level of the Skip List and move downwards
+            for i in range(self.level, -1, -1):
+                finger = update[i] # Node before the previous key on this level
+                if finger is not head and (current is head or finger.key > current.key): # Skip ahead to the finger
+                    current = finger
+                    if indexed:
+                        position = positions[i]
+                # Move forward while the next node's key is less than the key to be inserted
+                while current.forward[i] and current.forward[i].key < key:
+                    if indexed:
+                        position += current.width[i]
+                    current = current.forward[i]
+                    steps += 1
+                update[i] = current # Remember the node at this level
+                if indexed:
+                    positions[i] = position
+
+            current = current.forward[0] # The only node that can hold the key
+            if current is None or current.key != key or self.duplicates == ALLOW: # If the key is not in the list yet
+                if current is not None and current.key == key: # Move past the copies of the key
+                    steps += self.pass_duplicates(update, positions, key)
+                promotions = self.link_node(update, positions, key) # Insert the new node
+
+            # Update the statistics
+            self.statistics.add_step(steps)
+            self.statistics.add_promotion(promotions)
+
+        self.reset_finger() # The batch used its own update array
         
+    # Search
+    def search(self, key):
+
         """
 
-        level = 0 # Count the level of the node
-        promotions = 0 # Count the number of promotions
-        while random.random() < self.probability and level < self.max_level:
-            level += 1
-            promotions += 1
-        return level, promotions
\ No newline at end of file
+        Function to search for a key in the Skip List.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            Skip_Node: The node holding the key, or None if the key is not in the list.
+
+        """
+
+        if self.use_finger: # Start from the update array of the previous operation
+            steps = self.search_from_finger(key)
+            current = self.finger[0]
+        else:
+            steps = 1 # Initialise the number of steps
+            current = self.head
+
+            # Start from the highest level of the Skip List and move downwards
+            for i in range(self.level, -1, -1):
+                # Move forward while the next node's key is less than the key
+                while current.forward[i] and current.forward[i].key < key:
+                    current = current.forward[i]
+                    steps += 1
+
+        current = current.forward[0] # The only node that can hold the key
+        self.statistics.add_search_step(steps) # Add the number of steps
+        if current is not None and current.key == key:
+            return current
+        return None
+
+    # Batch lookups
+    def search_many(self, queries):
+
+        """
+
+        Function to search for every key of an array in the Skip List.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: The node holding each key, or None if the key is not in the list (object array).
+
+        """
+
+        nodes, _ = self.find_many(queries)
+        return nodes
+
+    def contains_many(self, queries):
+
+        """
+
+        Function to check whether every key of an array is in the Skip List.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: True for every key that is in the list.
+
+        """
+
+        _, found = self.find_many(queries)
+        return found
+
+    def find_many(self, queries):
+
+        """
+
+        Function to search for a batch of keys with one sweep along the Skip List.
+
+        The queries are sorted once and searched in ascending order. The nodes where the search
+        for one query stopped on each level are the finger for the next one, so a query d nodes
+        after the previous one costs O(log d) and the whole batch moves forward along each level
+        only once. Each query
+        records the number of steps it actually took, and the steps are added to the
+        statistics as one array.
+
+        Parameters:
+            queries (numpy.ndarray): The keys to be searched for (one-dimensional).
+
+        Returns:
+            numpy.ndarray: The node holding each key, or None (object array).
+            numpy.ndarray: True for every key that is in the list.
+
+        """
+
+        queries = np.asarray(queries).ravel()
+        order = np.argsort(queries, kind="stable") # Position of each query in sorted order
+        nodes = np.full(len(queries), None, dtype=object) # Node found for each query
+        found = np.zeros(len(queries), dtype=bool) # Whether each query was found
+        steps = np.zeros(len(queries), dtype=np.int64) # Number of steps of each query
+
+        head = self.head
+        fingers = [head] * (self.max_level + 1) # Node before the previous query on each level
+        for index, key in zip(order.tolist(), queries[order].tolist()):
+            count = 1 # Initialise the number of steps
+
+            # Climb while the next node on the level above is still before the key, as in search_from_finger
+            level = 0
+            while level < self.level:
+                after = fingers[level + 1].forward[level + 1]
+                if after is None or after.key >= key:
+                    break
+                level += 1
+                count += 1
+
+            # Move downwards from there; the levels above keep their nodes
+            current = fingers[level]
+            for i in range(level, -1, -1):
+                # Move forward while the next node's key is less than the key
+                while current.forward[i] and current.forward[i].key < key:
+                    current = current.forward[i]
+                    count += 1
+                fingers[i] = current # Remember the node at this level
+
+            current = current.forward[0] # The only node that can hold the key
+            if current is not None and current.key == key:
+                nodes[index] = current
+                found[index] = True
+            steps[index] = count
+
+        self.statistics.add_search_steps(steps) # Add the number of steps of every query
+        return nodes, found
+
+    def __contains__(self, key):
+
+        """
+
+        Function to check whether a key is in the Skip List.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            bool: True if the key is in the list.
+
+        """
+
+        return self.search(key) is not None
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of keys in the Skip List.
+
+        Returns:
+            int: The number of keys.
+
+        """
+
+        return self.count
+
+    # Ordered map
+    def __getitem__(self, key):
+
+        """
+
+        Function to get the value stored with a key.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            object: The value of the key.
+
+        Raises:
+            KeyError: If the key is not in the list.
+
+        """
+
+        node = self.search(key)
+        if node is None:
+            raise KeyError(key)
+        return node.value
+
+    def __setitem__(self, key, value):
+
+        """
+
+        Function to store a value with a key, updating it in place if the key is in the list already.
+
+        Parameters:
+            key (int): The key.
+            value (object): The value to be stored.
+
+        """
+
+        self.insert(key, value, REPLACE)
+
+    def __delitem__(self, key):
+
+        """
+
+        Function to delete a key and its value.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Raises:
+            KeyError: If the key is not in the list.
+
+        """
+
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+
+        """
+
+        Function to get the value stored with a key, or a default if the key is not in the list.
+
+        Parameters:
+            key (int): The key to be searched for.
+            default (object): The value returned if the key is not in the list.
+
+        Returns:
+            object: The value of the key, or the default.
+
+        """
+
+        node = self.search(key)
+        return default if node is None else node.value
+
+    def setdefault(self, key, default=None):
+
+        """
+
+        Function to get the value stored with a key, inserting the key with a default value first if it is not in the list.
+
+        Only one search is needed in both cases.
+
+        Parameters:
+            key (int): The key.
+            default (object): The value stored if the key is not in the list.
+
+        Returns:
+            object: The value of the key.
+
+        """
+
+        return self.insert(key, default, IGNORE).value
+
+    def items(self, low=None, high=None):
+
+        """
+
+        Function to iterate over the keys between two bounds and their values in ascending order of key.
+
+        Parameters:
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+
+        Yields:
+            tuple: The next (key, value) pair.
+
+        """
+
+        if low is None: # Start at the first node of the bottom level
+            node = self.head.forward[0]
+        else: # Start at the first node whose key is at least the lower bound
+            node = self.find_before(low).forward[0]
+
+        while node is not None and (high is None or node.key <= high): # Walk along the bottom level
+            yield node.key, node.value
+            node = node.forward[0]
+
+    def values(self):
+
+        """
+
+        Function to iterate over the values in ascending order of key.
+
+        Returns:
+            generator: The values.
+
+        """
+
+        return (value for _, value in self.items())
+
+    # Ordered iteration
+    def __iter__(self):
+
+        """
+
+        Function to iterate over the keys in ascending order.
+
+        Returns:
+            generator: The keys in ascending order.
+
+        """
+
+        return self.range()
+
+    def __reversed__(self):
+
+        """
+
+        Function to iterate over the keys in descending order.
+
+        The bottom level only has forward pointers, so each key is found with a search for the
+        last node below the previous key: O(k log n) time for k keys and constant memory. With
+        the ALLOW policy, that search lands before every copy of the key, so the copies between
+        it and the current node are produced too before moving on.
+
+        Returns:
+            generator: The keys in descending order.
+
+        """
+
+        node = self.find_before(None) # The last node of the bottom level
+        while node is not self.head:
+            yield node.key
+            before = self.find_before(node.key) # The last node before every copy of the key
+            current = before.forward[0]
+            while current is not node: # The other copies of the key, linked in before this node
+                yield current.key
+                current = current.forward[0]
+            node = before
+
+    def range(self, low=None, high=None):
+
+        """
+
+        Function to iterate over the keys between two bounds in ascending order.
+
+        The keys are produced lazily in O(log n + k) time and with constant memory.
+
+        Parameters:
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+
+        Yields:
+            int: The next key.
+
+        """
+
+        if low is None: # Start at the first node of the bottom level
+            node = self.head.forward[0]
+        else: # Start at the first node whose key is at least the lower bound
+            node = self.find_before(low).forward[0]
+
+        while node is not None and (high is None or node.key <= high): # Walk along the bottom level
+            yield node.key
+            node = node.forward[0]
+
+    def floor(self, key):
+
+        """
+
+        Function to find the largest key less than or equal to a key.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The largest key less than or equal to the key, or None if there is none.
+
+        """
+
+        node = self.find_before(key) # The last node whose key is less than the key
+        if node.forward[0] is not None and node.forward[0].key == key: # If the key itself is in the list
+            return key
+        return None if node is self.head else node.key
+
+    def ceiling(self, key):
+
+        """
+
+        Function to find the smallest key greater than or equal to a key.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The smallest key greater than or equal to the key, or None if there is none.
+
+        """
+
+        node = self.find_before(key).forward[0] # The first node whose key is at least the key
+        return None if node is None else node.key
+
+    def find_before(self, key):
+
+        """
+
+        Function to find the last node whose key is less than a key, without recording any statistics.
+
+        Parameters:
+            key (int): The key to be compared against, or None to find the last node of the list.
+
+        Returns:
+            Skip_Node: The last node whose key is less than the key, or the head if there is none.
+
+        """
+
+        current = self.head
+
+        # Start from the highest level of the Skip List and move downwards
+        for i in range(self.level, -1, -1):
+            while current.forward[i] and (key is None or current.forward[i].key < key):
+                current = current.forward[i]
+
+        return current
+
+    # Order statistics
+    def rank(self, key):
+
+        """
+
+        Function to count the keys less than a key in O(log n).
+
+        Parameters:
+            key (int): The key to be ranked.
+
+        Returns:
+            int: The number of keys less than the key.
+
+        """
+
+        return self.count_below(key, False)
+
+    def select(self, k):
+
+        """
+
+        Function to find the k-th smallest key in O(log n).
+
+        Parameters:
+            k (int): The position of the key in ascending order, starting from 0.
+
+        Returns:
+            int: The k-th smallest key.
+
+        Raises:
+            IndexError: If k is out of range.
+
+        """
+
+        self.check_order_statistics()
+        if k < 0 or k >= self.indexed_length(): # If there is no k-th key
+            raise IndexError("select index out of range")
+
+        target = k + 1 # Position of the key in the bottom level
+        position = 0 # Position of the current node
+        current = self.head
+
+        # Start from the highest level of the Skip List and move downwards
+        for i in range(self.level, -1, -1):
+            # Move forward while the next node is not past the target
+            while current.forward[i] and position + current.width[i] <= target:
+                position += current.width[i]
+                current = current.forward[i]
+
+        return current.key
+
+    def count_range(self, low, high):
+
+        """
+
+        Function to count the keys between two bounds in O(log n).
+
+        Parameters:
+            low (int): The smallest key to be counted (inclusive).
+            high (int): The largest key to be counted (inclusive).
+
+        Returns:
+            int: The number of keys between the bounds.
+
+        """
+
+        return max(self.count_below(high, True) - self.count_below(low, False), 0)
+
+    def count_below(self, key, inclusive):
+
+        """
+
+        Function to count the keys less than (or equal to) a key using the widths of the forward pointers.
+
+        Parameters:
+            key (int): The key to be compared against.
+            inclusive (bool): If True, a key equal to the key is counted too.
+
+        Returns:
+            int: The number of keys below the key.
+
+        """
+
+        self.check_order_statistics()
+        position = 0 # Position of the current node
+        current = self.head
+
+        # Start from the highest level of the Skip List and move downwards
+        for i in range(self.level, -1, -1):
+            while current.forward[i] and (current.forward[i].key < key or (inclusive and current.forward[i].key == key)):
+                position += current.width[i]
+                current = current.forward[i]
+
+        return position
+
+    def indexed_length(self):
+
+        """
+
+        Function to get the number of keys from the widths of the top level.
+
+        Returns:
+            int: The number of keys in the Skip List.
+
+        """
+
+        position = 0 # Position of the current node
+        current = self.head
+        while current.forward[self.level]: # Walk along the top level
+            position += current.width[self.level]
+            current = current.forward[self.level]
+        return position + current.width[self.level] - 1 # The last pointer skips to one past the end
+
+    def check_order_statistics(self):
+
+        """
+
+        Function to check that the Skip List keeps widths.
+
+        Raises:
+            RuntimeError: If the list was created without order statistics.
+
+        """
+
+        if not self.order_statistics:
+            raise RuntimeError("order statistics are disabled; create the skip list with order_statistics=True")
+
+    def link_widths(self, update, positions, node):
+
+        """
+
+        Function to update the widths of the forward pointers after a node is linked in.
+
+        Parameters:
+            update (list): The node before the new node on each level.
+            positions (list): The position of each node in update.
+            node (Skip_Node): The new node.
+
+        """
+
+        position = positions[0] + 1 # Position of the new node
+        for i in range(self.max_level + 1):
+            before = update[i] or self.head # Levels above the list level only hold the head
+            if i <= node.level: # The pointer is split in two by the new node
+                node.width[i] = positions[i] + before.width[i] + 1 - position
+                before.width[i] = position - positions[i]
+            else: # The pointer skips over one more node
+                before.width[i] += 1
+
+    # Deletion
+    def delete(self, key):
+
+        """
+
+        Function to delete a key from the Skip List.
+
+        Parameters:
+            key (int): The key to be deleted.
+
+        Returns:
+            bool: True if the key was found and deleted.
+
+        """
+
+        steps = 1 # Initialise the number of steps
+        update = [None] * (self.max_level + 1) # Nodes whose forward pointers may need to be updated
+        current = self.head
+
+        # Start from the highest level of the Skip List and move downwards
+        for i in range(self.level, -1, -1):
+            # Move forward while the next node's key is less than the key to be deleted
+            while current.forward[i] and current.forward[i].key < key:
+                current = current.forward[i]
+                steps += 1
+            update[i] = current # Remember the node at this level
+
+        current = current.forward[0] # The only node that can hold the key
+
+        if current is None or current.key != key: # If the key is not in the list
+            self.statistics.add_delete_step(steps) # Add the number of steps
+            self.statistics.add_demotion(0) # Add the number of demotions
+            return False
+
+        self.remove_node(update, current) # Unlink the node
+        self.statistics.add_delete_step(steps) # Add the number of steps
+        self.statistics.add_demotion(current.level) # Every level above the bottom one is a demotion
+        return True
+
+    def pop_min(self):
+
+        """
+
+        Function to remove and return the smallest key in the Skip List.
+
+        Returns:
+            int: The smallest key.
+
+        Raises:
+            KeyError: If the list is empty.
+
+        """
+
+        first = self.head.forward[0] # The first node of the bottom level
+        if first is None: # If the list is empty, there is nothing to remove
+            raise KeyError("pop from an empty skip list")
+
+        self.remove_node([self.head] * (self.max_level + 1), first) # The head precedes the first node on every level
+        self.statistics.add_delete_step(1) # Add the number of steps
+        self.statistics.add_demotion(first.level) # Add the number of demotions
+        return first.key
+
+    def pop_max(self):
+
+        """
+
+        Function to remove and return the largest key in the Skip List.
+
+        Returns:
+            int: The largest key.
+
+        Raises:
+            KeyError: If the list is empty.
+
+        """
+
+        if self.head.forward[0] is None: # If the list is empty, there is nothing to remove
+            raise KeyError("pop from an empty skip list")
+
+        steps = 1 # Initialise the number of steps
+        update = [None] * (self.max_level + 1) # Nodes whose forward pointers may need to be updated
+        current = self.head
+
+        # On each level, stop at the node before the last one
+        for i in range(self.level, -1, -1):
+            while current.forward[i] and current.forward[i].forward[i]:
+                current = current.forward[i]
+                steps += 1
+            update[i] = current # Remember the node at this level
+
+        last = current.forward[0] # The last node of the bottom level
+        for i in range(last.level + 1, self.level + 1): # Above the last node, the pointer past it belongs to the last node of the level
+            if update[i].forward[i] is not None:
+                update[i] = update[i].forward[i]
+        self.remove_node(update, last) # Unlink the node
+        self.statistics.add_delete_step(steps) # Add the number of steps
+        self.statistics.add_demotion(last.level) # Add the number of demotions
+        return last.key
+
+    def remove_node(self, update, node):
+
+        """
+
+        Function to unlink a node from every level of the Skip List.
+
+        Parameters:
+            update (list): The node before the node to be removed on each of its levels.
+            node (Skip_Node): The node to be removed.
+
+        """
+
+        for i in range(node.level + 1): # Bypass the node on each of its levels
+            update[i].forward[i] = node.forward[i]
+        self.count -= 1 # One key less in the list
+        self.level_histogram[node.level] -= 1
+        self.reset_finger() # The finger may hold the removed node
+
+        if self.order_statistics: # Every pointer that skipped over the node now skips one node less
+            for i in range(self.max_level + 1):
+                before = update[i] or self.head # Levels above the list level only hold the head
+                if i <= node.level:
+                    before.width[i] += node.width[i] - 1
+                else:
+                    before.width[i] -= 1
+
+        # Lower the level of the list while its top level is empty
+        while self.level > 0 and self.head.forward[self.level] is None:
+            self.level -= 1
+
+    # Finger search
+    def reset_finger(self):
+
+        """
+
+        Function to point the finger back at the head of the Skip List.
+
+        The finger is the update array of the last search: the last node before the key on each
+        level, with its position (order statistics only) and the number of moves a search from
+        the head makes on that level to reach it, which is used to count the steps saved.
+
+        """
+
+        self.finger = [self.head] * (self.max_level + 1) # Last node before the previous key on each level
+        self.finger_positions = [0] * (self.max_level + 1) if self.order_statistics else None # Position of each finger node
+        self.finger_moves = [0] * (self.max_level + 1) # Moves of a search from the head on each level
+
+    def search_from_finger(self, key):
+
+        """
+
+        Function to move the finger to the nodes before a key, starting from the previous finger.
+
+        If the key is after the previous one, the search climbs while the next node on the level
+        above is still before the key, so a key d nodes away costs O(log d) steps. Otherwise it
+        climbs until the finger node is before the key, or falls back to the head. The search
+        from the head and the search from the finger end on the same node of the starting level
+        and take the same path below it, so the steps saved are recorded in the statistics
+        without running the search from the head.
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            int: The number of steps taken.
+
+        """
+
+        head = self.head
+        finger = self.finger
+        moves = self.finger_moves
+        indexed = self.order_statistics
+        steps = 1 # Initialise the number of steps
+        level = 0 # Level where the search starts
+
+        if finger[0] is not head and finger[0].key < key: # The key is after the finger
+            # Climb while the next node on the level above is still before the key
+            while level < self.level:
+                after = finger[level + 1].forward[level + 1]
+                if after is None or after.key >= key:
+                    break
+                level += 1
+                steps += 1
+        else: # The key is at or before the finger
+            # Climb until the finger node is before the key
+            while level < self.level and finger[level] is not head and finger[level].key >= key:
+                level += 1
+                steps += 1
+
+        current = finger[level] # Start from the finger node of that level
+        if current is head or current.key >= key: # No finger node is before the key, start from the head
+            level = self.level
+            current = head
+            moved = 0
+            position = 0
+        else:
+            moved = moves[level] # Moves of the search from the head on this level before the finger node
+            position = self.finger_positions[level] if indexed else 0
+
+        # Move downwards from the starting level like a search from the head
+        for i in range(level, -1, -1):
+            # Move forward while the next node's key is less than the key
+            while current.forward[i] and current.forward[i].key < key:
+                if indexed:
+                    position += current.width[i]
+                current = current.forward[i]
+                moved += 1
+                steps += 1
+            finger[i] = current # Remember the node at this level
+            moves[i] = moved
+            moved = 0
+            if indexed:
+                self.finger_positions[i] = position
+
+        # The levels above the starting level keep their finger nodes, so a search from the head
+        # makes the same moves there as for the previous key
+        head_steps = 1 + sum(moves[:self.level + 1])
+        self.statistics.add_saved_step(head_steps - steps) # Add the number of steps saved
+
+        return steps
+
+    # Utility functions
+    def random_level(self):
+
+        """
+
+        Function to generate a random level for a node.
+
+        The level is at least i with probability probability ** i, capped at the maximum level,
+        as if a coin were flipped until it failed. The levels are drawn from NumPy LEVEL_BATCH
+        at a time (see fill_level_batch), so a node costs one pop instead of one call of
+        random.random() per promotion.
+
+        Returns:
+            int: Random level for the node.
+            int: Number of promotions of the node (the same as its level).
+
+        """
+
+        levels = self.level_batch
+        if not levels: # Draw the next batch of levels
+            levels = self.fill_level_batch()
+        level = levels.pop()
+        return level, level
+
+    def random_level_loop(self):
+
+        """
+
+        Function to generate a random level for a node by flipping a coin for every promotion.
+
+        This is the original generator, which calls random.random() once per level; it is kept
+        as a reference for random_level (see benchmarks.benchmark_levels).
+
+        Returns:
+            int: Random level for the node.
+            int: Number of promotions of the node.
+
+        """
+
+        level = 0 # Count the level of the node
+        promotions = 0 # Count the number of promotions
+        while random.random() < self.probability and level < self.max_level:
+            level += 1
+            promotions += 1
+        return level, promotions
+
+    def fill_level_batch(self):
+
+        """
+
+        Function to draw the next LEVEL_BATCH levels from a geometric distribution, capped at the maximum level.
+
+        The NumPy generator of each batch is seeded from the random module, so random.seed
+        still makes the levels of the list reproducible.
+
+        Returns:
+            list: The new batch.
+
+        """
+
+        if self.probability >= 1: # Every node reaches the maximum level
+            self.level_batch = [self.max_level] * LEVEL_BATCH
+            return self.level_batch
+        generator = np.random.default_rng(random.getrandbits(64))
+        levels = generator.geometric(1 - self.probability, LEVEL_BATCH) - 1 # Failed flips before the first success
+        self.level_batch = np.minimum(levels, self.max_level).tolist()
+        return self.level_batch
+
+    def grow_levels(self, count):
+
+        """
+
+        Function to raise the maximum level until the Skip List is sized for a number of keys.
+
+        The list is sized like build_new: base ** max_level keys, where base is 1 / probability.
+        The head gets a forward pointer for each new level (with a width that skips the whole
+        list when order statistics are kept) and the finger is reset, since it is one node per
+        level. Existing nodes keep their levels.
+
+        Parameters:
+            count (int): The number of keys the list has to hold.
+
+        """
+
+        if count <= self.capacity: # Already large enough
+            return
+        head = self.head
+        while self.capacity < count:
+            self.max_level += 1
+            self.capacity *= self.base
+            head.forward.append(None)
+            if self.order_statistics: # Nothing is linked on the new level, so the head skips to the end
+                head.width.append(self.count + 1)
+            self.level_histogram.append(0)
+        head.level = self.max_level
+        self.level_batch = [] # The levels drawn so far are capped at the old maximum level
+        self.reset_finger() # The finger has one node per level
+
+    # Structural metrics
+    def metrics(self):
+
+        """
+
+        Function to measure the Skip List in one walk along its bottom level (see metrics.skip_list_metrics).
+
+        Returns:
+            dict: The number of nodes, the number of levels, the level histogram and the number of nodes on each level.
+
+        """
+
+        return skip_list_metrics(self)
+
+    def level_counts(self):
+
+        """
+
+        Function to get the number of nodes on each level from the level histogram, without a walk.
+
+        Returns:
+            list: The number of nodes on each level, from level 0 up to the maximum level.
+
+        """
+
+        return level_counts(self.level_histogram)
+
+    def record_metrics(self):
+
+        """
+
+        Function to set the number of levels in the statistics in O(1).
+
+        """
+
+        self.statistics.set_levels(self.level) # Set the number of levels in the Skip List
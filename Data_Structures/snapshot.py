@@ -0,0 +1,443 @@
+"""
+
+    Contains the binary snapshot format used by the save/load methods of the data structures,
+    and a read-only view that answers queries straight from a memory-mapped snapshot.
+
+    Layout (little-endian):
+        header (64 bytes): magic, version, kind, key type, number of keys, max level, probability,
+        value type, duplicate policy
+        keys (8 bytes per key): the keys in ascending order, as int64 or float64
+        aux (1 byte per key): the AVL height, the Red-Black colour or the Skip List level of each key
+        depths (1 byte per key, trees only): the depth of each node, root at depth 0
+        values (only if a key has a value, from an offset aligned to 8 bytes): the value of each
+        key, as int64 or float64 if they are all integers or all floats, otherwise a pickled list
+
+    Pickled values are unpickled when the file is read, so only load snapshots you trust.
+    Files of version 1 have no values, and files before version 3 do not record the duplicate
+    policy of the structure.
+
+"""
+
+import pickle
+import struct
+import numpy as np
+from duplicates import POLICIES
+
+MAGIC = b"ICS2210S" # First bytes of every snapshot file
+VERSION = 3 # Version of the layout
+HEADER = struct.Struct("<8sHBBQIdBB") # Magic, version, kind, key type, number of keys, max level, probability, value type, policy
+HEADER_SIZE = 64 # The header is padded so that the keys start on an aligned offset
+
+KINDS = {"AVL_Tree": 0, "RB_Tree": 1, "Skip_List": 2} # Structure stored in the file
+KEY_TYPES = {0: np.dtype("<i8"), 1: np.dtype("<f8")} # Type of the keys stored in the file
+
+# Type of the values stored in the file (the padding byte of version 1 headers reads as NO_VALUES)
+NO_VALUES = 0 # Every value is None
+INT_VALUES = 1 # One int64 per key
+FLOAT_VALUES = 2 # One float64 per key
+OBJECT_VALUES = 3 # A pickled list of the values
+VALUE_TYPES = {INT_VALUES: np.dtype("<i8"), FLOAT_VALUES: np.dtype("<f8")} # Values stored as an array
+
+# Duplicate policy of the structure, stored as its index in POLICIES plus one (0 in older files: not recorded)
+POLICY_CODES = {policy: code for code, policy in enumerate(POLICIES, 1)}
+
+# Snapshot read from a file
+class Snapshot:
+    def __init__(self, kind, keys, aux, depths, max_level, probability, values=None, duplicates=None):
+        self.kind = kind # Name of the structure that was saved
+        self.keys = keys # Keys in ascending order (NumPy array, possibly memory-mapped)
+        self.aux = aux # Height, colour or level of each key
+        self.depths = depths # Depth of each node, or None for a Skip List
+        self.max_level = max_level # Maximum level of a Skip List (0 for the trees)
+        self.probability = probability # Probability of a Skip List (0 for the trees)
+        self.values = values # Value of each key (NumPy array or list), or None if no key has a value
+        self.duplicates = duplicates # Duplicate policy of the structure that was saved, or None if not recorded
+
+    def value_list(self):
+
+        """
+
+        Function to get the values of the keys as Python objects.
+
+        Returns:
+            list: The value of each key, or None if no key has a value.
+
+        """
+
+        if self.values is None:
+            return None
+        return self.values.tolist() if isinstance(self.values, np.ndarray) else list(self.values)
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of keys in the snapshot.
+
+        Returns:
+            int: The number of keys.
+
+        """
+
+        return len(self.keys)
+
+# Writes a snapshot file
+def write_snapshot(path, kind, keys, aux, depths=None, max_level=0, probability=0.0, values=None, duplicates=None):
+
+    """
+
+    Function to write a structure to a snapshot file.
+
+    Parameters:
+        path (str): The path of the file.
+        kind (str): The name of the structure, one of the keys of KINDS.
+        keys (list): The keys in ascending order.
+        aux (list): The height, colour or level of each key.
+        depths (list): The depth of each node, or None for a Skip List.
+        max_level (int): The maximum level of a Skip List.
+        probability (float): The probability of a Skip List.
+        values (list): The value of each key, or None if there are no values.
+        duplicates (str): The duplicate policy of the structure (see duplicates.py), or None.
+
+    Raises:
+        TypeError: If the keys are not integers or floating-point numbers.
+        ValueError: If a height, colour, level or depth does not fit in one byte.
+
+    """
+
+    keys = np.asarray(keys) # Convert the keys to one array
+    if keys.size == 0: # An empty structure is stored with integer keys
+        keys = keys.astype(np.int64)
+    if keys.dtype.kind in "iub": # Integer keys
+        key_type = 0
+    elif keys.dtype.kind == "f": # Floating-point keys
+        key_type = 1
+    else:
+        raise TypeError("snapshots only store integer or floating-point keys")
+
+    arrays = [keys.astype(KEY_TYPES[key_type])]
+    for column in (aux, depths): # One byte per key for the heights, colours, levels and depths
+        if column is None:
+            continue
+        column = np.asarray(column, dtype=np.int64)
+        if column.size and (column.min() < 0 or column.max() > 255):
+            raise ValueError("heights, colours, levels and depths must fit in one byte")
+        arrays.append(column.astype(np.uint8))
+
+    value_type, value_data = encode_values(values)
+    policy = POLICY_CODES[duplicates] if duplicates is not None else 0
+    header = HEADER.pack(MAGIC, VERSION, KINDS[kind], key_type, keys.size, max_level, probability, value_type, policy)
+    with open(path, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0")) # Pad the header
+        for array in arrays:
+            array.tofile(file)
+        if value_type != NO_VALUES:
+            file.write(b"\0" * (-file.tell() % 8)) # Align the values
+            if value_type == OBJECT_VALUES:
+                file.write(value_data)
+            else:
+                value_data.tofile(file)
+
+# Encodes the values of a snapshot
+def encode_values(values):
+
+    """
+
+    Function to choose how the values of a snapshot are stored.
+
+    Parameters:
+        values (list): The value of each key, or None.
+
+    Returns:
+        int: The value type (NO_VALUES, INT_VALUES, FLOAT_VALUES or OBJECT_VALUES).
+        object: The array of the values, the pickled list or None.
+
+    """
+
+    if values is None or all(value is None for value in values):
+        return NO_VALUES, None
+    if all(type(value) is int for value in values): # Exactly int, so that booleans keep their type
+        try:
+            return INT_VALUES, np.asarray(values, dtype=VALUE_TYPES[INT_VALUES])
+        except OverflowError: # Too large for int64
+            pass
+    elif all(type(value) is float for value in values):
+        return FLOAT_VALUES, np.asarray(values, dtype=VALUE_TYPES[FLOAT_VALUES])
+    return OBJECT_VALUES, pickle.dumps(list(values), protocol=pickle.HIGHEST_PROTOCOL)
+
+# Reads a snapshot file
+def read_snapshot(path, kind=None, mmap=True):
+
+    """
+
+    Function to read a snapshot file.
+
+    Parameters:
+        path (str): The path of the file.
+        kind (str): The name of the structure expected in the file, or None to accept any.
+        mmap (bool): If True, the arrays are memory-mapped instead of read into memory.
+
+    Returns:
+        Snapshot: The contents of the file.
+
+    Raises:
+        ValueError: If the file is not a snapshot, or holds a different structure than expected.
+
+    """
+
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a snapshot file")
+
+    _, version, kind_code, key_type, count, max_level, probability, value_type, policy = HEADER.unpack_from(header)
+    if not 1 <= version <= VERSION or key_type not in KEY_TYPES or value_type > OBJECT_VALUES or policy > len(POLICIES):
+        raise ValueError(f"{path} has an unsupported snapshot version")
+    names = {code: name for name, code in KINDS.items()}
+    if kind_code not in names:
+        raise ValueError(f"{path} holds an unknown structure")
+    if kind is not None and names[kind_code] != kind:
+        raise ValueError(f"{path} holds {names[kind_code]}, expected {kind}")
+
+    dtypes = [KEY_TYPES[key_type], np.dtype(np.uint8)] # Keys and aux
+    if names[kind_code] != "Skip_List": # Only the trees store depths
+        dtypes.append(np.dtype(np.uint8))
+
+    offset = HEADER_SIZE # Offset of the next array
+    arrays = []
+    for dtype in dtypes:
+        if count == 0: # np.memmap cannot map an empty array
+            arrays.append(np.empty(0, dtype=dtype))
+        elif mmap:
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,)))
+        else:
+            arrays.append(np.fromfile(path, dtype=dtype, count=count, offset=offset))
+        offset += count * dtype.itemsize
+
+    values = None
+    if value_type != NO_VALUES:
+        offset += -offset % 8 # The values are aligned
+        if value_type == OBJECT_VALUES:
+            with open(path, "rb") as file:
+                file.seek(offset)
+                values = pickle.load(file)
+        elif count and mmap:
+            values = np.memmap(path, dtype=VALUE_TYPES[value_type], mode="r", offset=offset, shape=(count,))
+        else:
+            values = np.fromfile(path, dtype=VALUE_TYPES[value_type], count=count, offset=offset)
+
+    depths = arrays[2] if len(arrays) == 3 else None
+    duplicates = POLICIES[policy - 1] if policy else None
+    return Snapshot(names[kind_code], arrays[0], arrays[1], depths, max_level, probability, values, duplicates)
+
+# Links the nodes of a tree from their in-order sequence and depths
+def link_tree(nodes, depths, nil=None, sizes=False):
+
+    """
+
+    Function to rebuild the links of a binary tree from its nodes in order and their depths in O(n).
+
+    Every node is the left child of the deepest node before it on the stack of unfinished
+    nodes that it pops, and the right child of the node left on top of the stack.
+
+    Parameters:
+        nodes (list): The nodes in order.
+        depths (list): The depth of each node, root at depth 0.
+        nil (object): The sentinel of a Red-Black Tree, or None for a tree without parent pointers.
+        sizes (bool): If True, the subtree size of every node is set too.
+
+    Returns:
+        object: The root of the tree, or nil if there are no nodes.
+
+    """
+
+    stack = [] # Indexes of the nodes whose right subtree is not finished yet
+    starts = [] # Index of the first node in the subtree of each node on the stack
+    for index, node in enumerate(nodes):
+        depth = depths[index]
+        child = None # Deepest node popped, which becomes the left child
+        start = index # Index of the first node in the subtree of the node
+        while stack and depths[stack[-1]] > depth: # Finish the deeper nodes
+            child = nodes[stack.pop()]
+            start = starts.pop()
+            if sizes:
+                child.size = index - start
+        if child is not None: # Link the left child
+            node.left = child
+            if nil is not None:
+                child.parent = node
+        if stack: # The node is the right child of the node on top of the stack
+            nodes[stack[-1]].right = node
+            if nil is not None:
+                node.parent = nodes[stack[-1]]
+        stack.append(index)
+        starts.append(start)
+
+    if not stack: # No nodes
+        return nil
+    root = nodes[stack[0]]
+    while stack: # Finish the nodes on the right spine
+        node = nodes[stack.pop()]
+        start = starts.pop()
+        if sizes:
+            node.size = len(nodes) - start
+    if nil is not None:
+        root.parent = nil
+    return root
+
+# Read-only view of a snapshot
+class Snapshot_View:
+    def __init__(self, path, mmap=True):
+        self.snapshot = read_snapshot(path, mmap=mmap) # Contents of the file
+        self.keys = self.snapshot.keys # Keys in ascending order, searched with binary search
+
+    def __len__(self):
+
+        """
+
+        Function to get the number of keys in the view.
+
+        Returns:
+            int: The number of keys.
+
+        """
+
+        return len(self.keys)
+
+    def __contains__(self, key):
+
+        """
+
+        Function to check whether a key is in the view in O(log n).
+
+        Parameters:
+            key (int): The key to be searched for.
+
+        Returns:
+            bool: True if the key is in the view.
+
+        """
+
+        index = int(np.searchsorted(self.keys, key, side="left")) # First key at least as large as the key
+        return index < len(self.keys) and bool(self.keys[index] == key)
+
+    def __iter__(self):
+
+        """
+
+        Function to iterate over the keys in ascending order.
+
+        Returns:
+            generator: The keys in ascending order.
+
+        """
+
+        return self.range()
+
+    def range(self, low=None, high=None):
+
+        """
+
+        Function to iterate over the keys between two bounds in ascending order.
+
+        Parameters:
+            low (int): The smallest key to be produced (inclusive), or None for no lower bound.
+            high (int): The largest key to be produced (inclusive), or None for no upper bound.
+
+        Yields:
+            int: The next key.
+
+        """
+
+        start = 0 if low is None else int(np.searchsorted(self.keys, low, side="left"))
+        stop = len(self.keys) if high is None else int(np.searchsorted(self.keys, high, side="right"))
+        for index in range(start, stop):
+            yield self.keys[index].item() # Python scalar, like the keys of the structures
+
+    def floor(self, key):
+
+        """
+
+        Function to find the largest key less than or equal to a key.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The largest key that is not greater than the key, or None if there is none.
+
+        """
+
+        index = int(np.searchsorted(self.keys, key, side="right")) - 1 # Last key not greater than the key
+        return self.keys[index].item() if index >= 0 else None
+
+    def ceiling(self, key):
+
+        """
+
+        Function to find the smallest key greater than or equal to a key.
+
+        Parameters:
+            key (int): The key to be compared against.
+
+        Returns:
+            int: The smallest key that is not less than the key, or None if there is none.
+
+        """
+
+        index = int(np.searchsorted(self.keys, key, side="left")) # First key not less than the key
+        return self.keys[index].item() if index < len(self.keys) else None
+
+    def rank(self, key):
+
+        """
+
+        Function to count the keys less than a key in O(log n).
+
+        Parameters:
+            key (int): The key to be ranked.
+
+        Returns:
+            int: The number of keys less than the key.
+
+        """
+
+        return int(np.searchsorted(self.keys, key, side="left"))
+
+    def select(self, k):
+
+        """
+
+        Function to find the k-th smallest key (0-based) in O(1).
+
+        Parameters:
+            k (int): The rank of the key.
+
+        Returns:
+            int: The k-th smallest key.
+
+        Raises:
+            IndexError: If k is out of range.
+
+        """
+
+        if not 0 <= k < len(self.keys):
+            raise IndexError("select index out of range")
+        return self.keys[k].item()
+
+    def count_range(self, low, high):
+
+        """
+
+        Function to count the keys between two bounds in O(log n).
+
+        Parameters:
+            low (int): The smallest key to be counted (inclusive).
+            high (int): The largest key to be counted (inclusive).
+
+        Returns:
+            int: The number of keys in the range.
+
+        """
+
+        return max(int(np.searchsorted(self.keys, high, side="right")) - self.rank(low), 0)
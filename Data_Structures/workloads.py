@@ -0,0 +1,149 @@
+"""
+
+    Contains seedable generators for the key workloads that are replayed against the data structures.
+
+"""
+
+import numpy as np
+from knuth_shuffle import knuth_shuffle
+
+# Random order
+def shuffled(size, seed=None, start=1):
+
+    """
+
+    Function to generate the keys start..start + size - 1 in random order.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): Seed of the random number generator.
+        start (int): The smallest key.
+
+    Returns:
+        numpy.ndarray: The shuffled keys.
+
+    """
+
+    return knuth_shuffle(np.arange(start, start + size), seed)
+
+# Ascending order
+def ascending(size, seed=None, start=1):
+
+    """
+
+    Function to generate the keys start..start + size - 1 in ascending order.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): Unused, accepted so that every workload has the same signature.
+        start (int): The smallest key.
+
+    Returns:
+        numpy.ndarray: The sorted keys.
+
+    """
+
+    return np.arange(start, start + size)
+
+# Descending order
+def descending(size, seed=None, start=1):
+
+    """
+
+    Function to generate the keys start..start + size - 1 in descending order.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): Unused, accepted so that every workload has the same signature.
+        start (int): The smallest key.
+
+    Returns:
+        numpy.ndarray: The keys in reverse order.
+
+    """
+
+    return np.arange(start + size - 1, start - 1, -1)
+
+# Duplicate-heavy keys
+def zipfian(size, seed=None, exponent=1.2, distinct=None):
+
+    """
+
+    Function to generate keys with Zipf-distributed duplicates, where a few keys appear very often.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): Seed of the random number generator.
+        exponent (float): Exponent of the Zipf distribution (greater than 1). Larger values give more duplicates.
+        distinct (int): The largest key; larger draws are folded back into 1..distinct. Defaults to size.
+
+    Returns:
+        numpy.ndarray: The keys in random order.
+
+    """
+
+    rng = np.random.default_rng(seed)
+    distinct = size if distinct is None else distinct
+    return (rng.zipf(exponent, size) - 1) % distinct + 1 # Fold the unbounded tail back into range
+
+# Nearly sorted keys
+def nearly_sorted(size, seed=None, swaps=10, start=1):
+
+    """
+
+    Function to generate ascending keys with a number of random pairs of keys swapped.
+
+    Parameters:
+        size (int): The number of keys.
+        seed (int): Seed of the random number generator.
+        swaps (int): The number of random swaps.
+        start (int): The smallest key.
+
+    Returns:
+        numpy.ndarray: The nearly sorted keys.
+
+    """
+
+    rng = np.random.default_rng(seed)
+    keys = np.arange(start, start + size)
+    if size < 2: # Nothing to swap
+        return keys
+
+    first = rng.integers(0, size, swaps) # Positions of the first key of each pair
+    second = rng.integers(0, size, swaps) # Positions of the second key of each pair
+    for i, j in zip(first.tolist(), second.tolist()): # Apply the swaps in order
+        keys[i], keys[j] = keys[j], keys[i]
+    return keys
+
+# Available workloads
+WORKLOADS = {
+    "random": shuffled,
+    "sorted": ascending,
+    "reverse": descending,
+    "zipf": zipfian,
+    "nearly_sorted": nearly_sorted,
+}
+
+def make_workload(shape, size, seed=None, **parameters):
+
+    """
+
+    Function to generate a workload by name.
+
+    Parameters:
+        shape (str): One of "random", "sorted", "reverse", "zipf" or "nearly_sorted".
+        size (int): The number of keys.
+        seed (int): Seed of the random number generator.
+        **parameters: Extra arguments of the workload (exponent and distinct for "zipf", swaps for "nearly_sorted").
+
+    Returns:
+        numpy.ndarray: The keys.
+
+    Raises:
+        ValueError: If the shape is unknown.
+
+    """
+
+    if shape not in WORKLOADS:
+        raise ValueError(f"unknown workload: {shape} (expected one of {', '.join(WORKLOADS)})")
+    return WORKLOADS[shape](size, seed, **parameters)